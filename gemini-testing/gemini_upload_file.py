@@ -1,25 +1,24 @@
 from google import genai
 
+import asyncio
 import os
+import sys
+from pathlib import Path
 
 from dotenv import load_dotenv
 load_dotenv()
 
-client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
-
-print("Uploading file...")
-video_file = client.files.upload(file="GreatRedSpot.mp4")
-print(f"Completed upload: {video_file.uri}")
+# Shared upload helper of the Video Understanding and LaTeX Writing APIs
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "gemini_common"))
+from file_uploads import upload_files
 
-import time
-
-# Check whether the file is ready to be used.
-while video_file.state.name == "PROCESSING":
-    print('.', end='')
-    time.sleep(1)
-    video_file = client.files.get(name=video_file.name)
+client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
 
-if video_file.state.name == "FAILED":
-  raise ValueError(video_file.state.name)
+# Uploads the files given on the command line at once and waits until they are all processed
+paths = sys.argv[1:] or ["GreatRedSpot.mp4"]
+print(f"Uploading {len(paths)} file(s)...")
+uploaded_files, _ = asyncio.run(upload_files(client, paths))
+for uploaded_file in uploaded_files:
+    print(f"Completed upload: {uploaded_file.uri}")
 
 print('Done')
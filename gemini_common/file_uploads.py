@@ -0,0 +1,132 @@
+"""Concurrent uploads to the Gemini Files API.
+
+`upload_files` uploads every file at once through `client.aio` and waits
+for Gemini to finish processing them all together, polling each file with
+exponential backoff plus jitter instead of once a second, under one
+overall deadline. With a `RemoteFileRegistry`, files Gemini still holds
+from an earlier upload are reused. Each file gets a timing dict
+(seconds spent uploading and processing, number of polls, whether it was
+reused).
+
+The SDK keeps one async HTTP client per `genai.Client`, tied to the event
+loop it first ran on, so the blocking `generate()` functions go through
+`run_upload_files`, which schedules the uploads on a single long-lived
+loop thread.
+"""
+import asyncio
+import random
+import threading
+import time
+from pathlib import Path
+
+from remote_files import RemoteFileRegistry, file_sha256
+
+MAX_CONCURRENT_UPLOADS = 8
+POLL_INITIAL_SECONDS = 0.5
+POLL_MAX_SECONDS = 10
+POLL_BACKOFF = 1.6
+UPLOAD_DEADLINE_SECONDS = 15 * 60 # For all files together, uploads and processing included
+
+
+def _new_timing(path) -> dict:
+    return {"path": str(path), "name": None, "reused": False, "upload_seconds": 0.0, "processing_seconds": 0.0, "polls": 0}
+
+
+async def _get_active_file(client, registry: RemoteFileRegistry, sha256: str):
+    """The registered remote file for this content if Gemini still has it ready to use, else None."""
+    entry = registry.lookup(sha256)
+    if entry is None:
+        return None
+    try:
+        remote_file = await client.aio.files.get(name=entry["name"])
+    except Exception as e:
+        print(f"Registered file {entry['name']} is gone ({e}); uploading again")
+        registry.forget(sha256)
+        return None
+    if remote_file.state.name != "ACTIVE":
+        registry.forget(sha256)
+        return None
+    return remote_file
+
+
+async def _upload_one(client, path, registry, sha256, semaphore, timing: dict):
+    if registry is not None:
+        sha256 = sha256 or await asyncio.to_thread(file_sha256, path)
+        remote_file = await _get_active_file(client, registry, sha256)
+        if remote_file is not None:
+            timing.update(name=remote_file.name, reused=True)
+            return remote_file
+
+    async with semaphore:
+        started = time.perf_counter()
+        remote_file = await client.aio.files.upload(file=path)
+        timing["upload_seconds"] = round(time.perf_counter() - started, 3)
+    timing["name"] = remote_file.name
+
+    # Wait for processing; the delay grows so long videos aren't polled every second
+    started = time.perf_counter()
+    delay = POLL_INITIAL_SECONDS
+    while remote_file.state.name == "PROCESSING":
+        await asyncio.sleep(random.uniform(delay / 2, delay))
+        delay = min(delay * POLL_BACKOFF, POLL_MAX_SECONDS)
+        remote_file = await client.aio.files.get(name=remote_file.name)
+        timing["polls"] += 1
+    timing["processing_seconds"] = round(time.perf_counter() - started, 3)
+
+    if remote_file.state.name == "FAILED":
+        raise ValueError(f"Processing {Path(path).name} failed: {remote_file.state.name}")
+
+    if registry is not None:
+        registry.record(sha256, remote_file)
+    return remote_file
+
+
+async def upload_files(client, paths, registry: RemoteFileRegistry = None, sha256s=None,
+                       deadline: float = UPLOAD_DEADLINE_SECONDS):
+    """
+    Uploads `paths` concurrently and returns (active remote files, timings), both in input order.
+
+    `sha256s` (optional, parallel to `paths`) skips rehashing files whose hash
+    the caller already has. Raises TimeoutError when the files aren't all
+    ready within `deadline` seconds, or the first upload/processing error;
+    the remaining uploads are cancelled either way.
+    """
+    paths = list(paths)
+    sha256s = list(sha256s) if sha256s else [None] * len(paths)
+    timings = [_new_timing(path) for path in paths]
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+    tasks = [
+        asyncio.ensure_future(_upload_one(client, path, registry, sha256, semaphore, timing))
+        for path, sha256, timing in zip(paths, sha256s, timings)
+    ]
+    try:
+        remote_files = await asyncio.wait_for(asyncio.gather(*tasks), timeout=deadline)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    for timing in timings:
+        filename = Path(timing["path"]).name
+        if timing["reused"]:
+            print(f"{filename}: reused {timing['name']}")
+        else:
+            print(f"{filename}: uploaded as {timing['name']} in {timing['upload_seconds']:.1f}s, "
+                  f"processed in {timing['processing_seconds']:.1f}s ({timing['polls']} polls)")
+    return remote_files, timings
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="gemini-uploads", daemon=True).start()
+        return _loop
+
+def run_upload_files(client, paths, **kwargs):
+    """Blocking upload_files() for worker threads; runs on the shared upload loop."""
+    return asyncio.run_coroutine_threadsafe(upload_files(client, paths, **kwargs), _get_loop()).result()
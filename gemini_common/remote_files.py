@@ -0,0 +1,82 @@
+"""Registry of files already uploaded to the Gemini Files API.
+
+Uploading a lecture video (or a stack of scanned pages) and waiting for
+Gemini to finish processing it takes far longer than generating from it,
+and the same material is sent again and again. The registry maps the
+SHA-256 of a local file to the remote file it was uploaded as (name, URI,
+expiry) in a SQLite file shared by the Video Understanding and LaTeX
+Writing APIs. Before uploading, `file_uploads.upload_files` looks the
+content up and reuses the remote file while it is still active; expired or
+missing ones are uploaded again and the entry is refreshed.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+REGISTRY_PATH = Path(__file__).resolve().parent / "remote_files.sqlite3"
+REMOTE_FILE_TTL_SECONDS = 48 * 3600 # Gemini deletes uploaded files after 48 hours
+EXPIRY_MARGIN_SECONDS = 3600 # Don't hand out files that expire before a generation is likely done
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class RemoteFileRegistry:
+    """Content hash -> remote file name, URI, MIME type and expiry, persisted in SQLite."""
+
+    def __init__(self, path: Path = REGISTRY_PATH, expiry_margin: float = EXPIRY_MARGIN_SECONDS):
+        self.expiry_margin = expiry_margin
+        self._lock = threading.Lock()
+        # Both APIs open the same file, so wait on each other's writes instead of failing
+        self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS remote_files (
+                sha256 TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                uri TEXT NOT NULL,
+                mime_type TEXT,
+                expires_at REAL NOT NULL,
+                uploaded_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def lookup(self, sha256: str):
+        """Returns the entry for `sha256` as a dict, or None if unknown or (nearly) expired."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT name, uri, mime_type, expires_at, uploaded_at FROM remote_files WHERE sha256 = ?",
+                (sha256,)
+            ).fetchone()
+        if row is None or row[3] - self.expiry_margin < time.time():
+            return None
+        return dict(zip(("name", "uri", "mime_type", "expires_at", "uploaded_at"), row))
+
+    def record(self, sha256: str, remote_file):
+        """Remembers an uploaded (active) `types.File` for this content."""
+        now = time.time()
+        expiration = getattr(remote_file, "expiration_time", None)
+        expires_at = expiration.timestamp() if expiration else now + REMOTE_FILE_TTL_SECONDS
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO remote_files (sha256, name, uri, mime_type, expires_at, uploaded_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (sha256, remote_file.name, remote_file.uri, remote_file.mime_type, expires_at, now)
+            )
+            # Entries past their expiry can never be reused
+            self._db.execute("DELETE FROM remote_files WHERE expires_at < ?", (now,))
+            self._db.commit()
+
+    def forget(self, sha256: str):
+        with self._lock:
+            self._db.execute("DELETE FROM remote_files WHERE sha256 = ?", (sha256,))
+            self._db.commit()
+
@@ -1,6 +1,7 @@
 import os
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Dict, Any
 import logging
@@ -8,12 +9,21 @@ import shutil # For efficient file copying
 from pathlib import Path
 import uuid # For generating unique filenames (optional but recommended)
 
+import asyncio
 import base64
+import json
 import os
+import sys
+import threading
 import time
 from google import genai
 from google.genai import types
 
+# Modules shared with the Video Understanding API
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "gemini_common"))
+from remote_files import RemoteFileRegistry
+from file_uploads import run_upload_files
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -93,6 +103,7 @@ app.add_middleware(
 # --- Define where to save files ---
 SCRIPT_DIR = Path(__file__).resolve().parent # Get directory of the script
 UPLOAD_DIRECTORY = SCRIPT_DIR / "uploads"  # Create 'uploads' dir in script's directory
+REMOTE_FILE_REGISTRY_PATH = SCRIPT_DIR.parent / "gemini_common" / "remote_files.sqlite3" # Shared with the Video Understanding API
 
 # --- Create upload directory if it doesn't exist ---
 try:
@@ -102,6 +113,8 @@ except OSError as e:
     # Depending on requirements, you might want to exit or raise here
     # exit(1) # Or raise SystemExit()
 
+remote_files = RemoteFileRegistry(REMOTE_FILE_REGISTRY_PATH)
+
 # --- Helper Function for Unique Filenames (Optional but Recommended) ---
 def get_unique_filename(original_filename: str) -> str:
     """Generates a unique filename while preserving the extension."""
@@ -118,13 +131,17 @@ async def read_root():
 async def upload_multiple_files(
     files: List[UploadFile] = File(..., description="One or more files to upload (PDF, JPG, PNG, HEIC, etc.)"),
     language: str = Form(..., description="Target language code (e.g., 'en', 'fn', 'es', 'de', 'ro').", examples=["en", "fr", "es", "de", "ro"]),
-    task: str = Form(..., description="The specific task to be performed with the video (e.g., 'format', 'solve', 'help', 'explain').", examples=["format", "solve", "help", "explain"])
+    task: str = Form(..., description="The specific task to be performed with the video (e.g., 'format', 'solve', 'help', 'explain').", examples=["format", "solve", "help", "explain"]),
+    stream: bool = Form(False, description="Stream the generated LaTeX as server-sent events while it is written.")
 ):
 
     """
     Receives one or more files via POST request and saves them to the 'uploads' directory.
 
     Returns a JSON response confirming the saved files and their details.
+    With `stream`, the response is a server-sent event stream instead:
+    `files` (the saved files), `stage`, `text` for each generated piece and
+    finally `done` with the same fields as the JSON response (or `error`).
     """
     if not files:
         raise HTTPException(status_code=400, detail="No files were sent.")
@@ -178,21 +195,66 @@ async def upload_multiple_files(
             await file.close() # Ensure the file is closed after processing
             saved_files_info.append(file_info)
 
-    # SEND FILES TO GEMINI
-    generate_response = generate(mode="latex", task=task, files=file_paths, language=language)
+    def build_response(latex_code):
+        return {
+            "message": f"Successfully processed {len(saved_files_info)} file(s).",
+            "saved_files": saved_files_info,
+            "task": task,
+            "language": language,
+            "latex_code": latex_code,
+        }
+
+    if stream:
+        return StreamingResponse(
+            stream_generation(build_response, saved_files_info, mode="latex", task=task, files=file_paths, language=language),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
 
-    response_data = {
-        "message": f"Successfully processed {len(saved_files_info)} file(s).",
-        "saved_files": saved_files_info,
-        "task": task,
-        "language": language,
-        "latex_code": generate_response,
-    }
+    # SEND FILES TO GEMINI (in a worker thread, so other requests keep being served)
+    generate_response = await run_in_threadpool(generate, mode="latex", task=task, files=file_paths, language=language)
+
+    response_data = build_response(generate_response)
 
     logger.info(f"Sending response for filenames: {filenames}")
     return JSONResponse(content=response_data, status_code=200)
 
-def generate(mode = "latex", task = "format", files = None, language = "en"):
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_generation(build_response, saved_files_info, **generate_args):
+    """Runs generate() in a thread and yields its stages and text as server-sent events."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def emit(event, data):
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    def run():
+        try:
+            latex_code = generate(
+                **generate_args,
+                on_stage=lambda stage: emit("stage", {"stage": stage}),
+                on_text=lambda text: emit("text", {"text": text}),
+            )
+            # The assembled text goes out once more in the final event
+            emit("done", build_response(latex_code))
+        except Exception as e:
+            logger.error(f"Error generating LaTeX: {e}")
+            emit("error", {"error": str(e)})
+
+    yield sse_event("files", {"saved_files": saved_files_info})
+    threading.Thread(target=run, name="latex-generate", daemon=True).start()
+    while True:
+        event, data = await queue.get()
+        yield sse_event(event, data)
+        if event in ("done", "error"):
+            return
+
+def generate(mode = "latex", task = "format", files = None, language = "en", on_stage = None, on_text = None):
+    """Runs the Gemini pipeline (blocking). `on_stage(name)` and `on_text(chunk)` report progress."""
+    on_stage = on_stage or (lambda stage: None)
+    on_text = on_text or (lambda text: None)
 
     model = "gemini-2.0-flash-thinking-exp-01-21"
 
@@ -289,27 +351,11 @@ Macros, letterfonts și fișierele de preambul sunt deja incluse în template. L
 
     if mode == "latex" and files:
 
-        contents = []
-        for file in files:
-            # file_path = Path(file)
-
-            print("Uploading file...")
-            new_file = client.files.upload(file=file)
-            print(f"Completed upload: {new_file.uri}")
-
-            # Check whether the file is ready to be used.
-            while new_file.state.name == "PROCESSING":
-                print('.', end='')
-                time.sleep(1)
-                new_file = client.files.get(name=new_file.name)
-
-            if new_file.state.name == "FAILED":
-              raise ValueError(new_file.state.name)
-
-            contents.append(new_file)
-            print('Done')
-
-        contents.append(question)
+        # All pages upload and process at once; ones sent before (and not yet
+        # expired on Gemini's side) are not uploaded again
+        on_stage("uploading")
+        uploaded_files, _ = run_upload_files(client, files, registry=remote_files)
+        contents = [*uploaded_files, question]
 
     else:
         return "Invalid mode or missing file"
@@ -319,6 +365,7 @@ Macros, letterfonts și fișierele de preambul sunt deja incluse în template. L
         temperature=0,
     )
 
+    on_stage("generating")
     return_text = ""
     for chunk in client.models.generate_content_stream(
         model=model,
@@ -326,6 +373,7 @@ Macros, letterfonts și fișierele de preambul sunt deja incluse în template. L
         config=generate_content_config,
     ):
         return_text += str(chunk.text)
+        on_text(str(chunk.text))
         print(chunk.text, end="")
 
     return return_text
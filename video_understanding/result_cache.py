@@ -0,0 +1,65 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class ResultCache:
+    """
+    Persistent cache of generated responses in a SQLite file.
+
+    Entries are keyed by a caller-built string (video fingerprint, task,
+    language, model). The cache is bounded by the total size of the stored
+    responses; when a write goes over `max_bytes`, the least recently used
+    entries are evicted first.
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._db.commit()
+
+    def get(self, key: str):
+        """Returns (response, created_at) and marks the entry as used, or None on a miss."""
+        with self._lock:
+            row = self._db.execute("SELECT response, created_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return row[0], row[1]
+
+    def put(self, key: str, response: str):
+        """Stores a response, then evicts least recently used entries beyond `max_bytes`."""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, response, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now)
+            )
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                for old_key, old_size in self._db.execute(
+                    "SELECT key, size FROM results WHERE key != ? ORDER BY last_used", (key,)
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self._db.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                    total -= old_size
+                    evicted += 1
+                print(f"Result cache: evicted {evicted} entries")
+            self._db.commit()
@@ -6,16 +6,30 @@ from pathlib import Path
 from typing import Annotated # Use Annotated for FastAPI >= 0.95.0
 
 from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Body
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 # Import field_validator for Pydantic V2+
 from pydantic import BaseModel, HttpUrl, Field, field_validator
 
+import asyncio
 import base64
-import os
+import hashlib
+import json
+import sys
+import threading
 import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
 from google.genai import types
 
+from result_cache import ResultCache
+
+# Modules shared with the LaTeX Writing API
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "gemini_common"))
+from remote_files import RemoteFileRegistry
+from file_uploads import run_upload_files
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -30,6 +44,13 @@ UPLOAD_DIRECTORY = SCRIPT_DIR / "uploads"
 CHUNK_SIZE = 1024 * 1024  # 1 MB chunks for file reading
 # Regex to validate YouTube video URLs (handles various formats)
 YOUTUBE_REGEX = r"^(?:https?:\/\/)?(?:www\.)?(?:youtube\.com\/(?:watch\?v=|embed\/|v\/)|youtu\.be\/)([a-zA-Z0-9_-]{11})(?:\S+)?$"
+JOB_WORKERS = 4 # Gemini pipelines running at once; further jobs wait in the queue
+JOB_TTL_SECONDS = 6 * 3600 # Finished jobs are forgotten after this long
+MODEL = "gemini-2.0-flash-thinking-exp-01-21"
+RESULT_CACHE_PATH = SCRIPT_DIR / "result_cache.sqlite3" # Generated responses by (video, task, language, model)
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024 # Least recently used responses are evicted beyond this
+JOB_EVENTS_POLL_SECONDS = 0.1 # How often the SSE stream checks a job for news
+REMOTE_FILE_REGISTRY_PATH = SCRIPT_DIR.parent / "gemini_common" / "remote_files.sqlite3" # Shared with the LaTeX Writing API
 
 # --- Create upload directory if it doesn't exist ---
 try:
@@ -52,6 +73,14 @@ class YouTubeLinkRequest(BaseModel):
         description="The specific task to be performed with the video.",
         examples=["summarize", "transcribe", "explain", "latex"]
         )
+    stream: bool = Field(
+        False,
+        description="Stream the generated text as server-sent events instead of returning a job id."
+        )
+    no_cache: bool = Field(
+        False,
+        description="Ignore a cached result for this video, task and language and generate it again."
+        )
 
     # Keep the custom validator for the URL
     @field_validator('url')
@@ -75,6 +104,114 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# --- Background Jobs ---
+# generate() blocks for minutes (file upload, processing poll, streamed
+# generation), so it runs on a thread pool instead of the event loop. Jobs
+# live in memory in this process; run a single uvicorn worker.
+executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="video-job")
+jobs = {}
+jobs_lock = threading.Lock()
+result_cache = ResultCache(RESULT_CACHE_PATH, RESULT_CACHE_MAX_BYTES)
+remote_files = RemoteFileRegistry(REMOTE_FILE_REGISTRY_PATH)
+
+def update_job(job_id: str, **fields):
+    with jobs_lock:
+        job = jobs[job_id]
+        job.update(fields)
+        job["updated_at"] = time.time()
+
+def append_job_text(job_id: str, text: str):
+    with jobs_lock:
+        job = jobs[job_id]
+        job["text"] += text
+        job["updated_at"] = time.time()
+
+def prune_jobs():
+    """Forgets finished jobs older than JOB_TTL_SECONDS."""
+    cutoff = time.time() - JOB_TTL_SECONDS
+    with jobs_lock:
+        for job_id in [job_id for job_id, job in jobs.items()
+                       if job["status"] in ("done", "failed") and job["updated_at"] < cutoff]:
+            del jobs[job_id]
+
+def result_cache_key(fingerprint: str, task: str, language: str) -> str:
+    """`fingerprint` is 'sha256:<hex>' for uploaded files or 'youtube:<id>' for links."""
+    return f"{fingerprint}|{task}|{language}|{MODEL}"
+
+def submit_job(details: dict, cache_key: str = None, bypass_cache: bool = False, **generate_args) -> str:
+    """
+    Queues generate(**generate_args) and returns the job id; `details` are echoed in the job status.
+
+    With a `cache_key`, a cached response finishes the job right away (unless
+    `bypass_cache`) and a freshly generated one is stored for next time.
+    Reads the SQLite result cache, so async handlers call it via asyncio.to_thread.
+    """
+    prune_jobs()
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    cached = result_cache.get(cache_key) if cache_key and not bypass_cache else None
+    with jobs_lock:
+        jobs[job_id] = {
+            "id": job_id,
+            "status": "queued",
+            "stage": None,
+            "text": "", # Generated text so far
+            "response": None,
+            "error": None,
+            "cache": {"hit": False, "bypassed": bypass_cache},
+            "created_at": now,
+            "updated_at": now,
+            **details,
+        }
+        if cached is not None:
+            response, cached_at = cached
+            jobs[job_id].update(
+                status="done",
+                text=response,
+                response=response,
+                cache={"hit": True, "cached_at": cached_at, "age_seconds": round(now - cached_at, 1)}
+            )
+            print(f"Result cache hit for {cache_key} (age {now - cached_at:.0f}s)")
+            return job_id
+
+    def run():
+        update_job(job_id, status="running")
+        try:
+            response = generate(
+                **generate_args,
+                on_stage=lambda stage: update_job(job_id, stage=stage),
+                on_text=lambda text: append_job_text(job_id, text),
+            )
+            if cache_key and isinstance(response, str) and response:
+                result_cache.put(cache_key, response)
+            update_job(job_id, status="done", stage=None, response=response)
+        except Exception as e:
+            traceback.print_exc()
+            update_job(job_id, status="failed", error=str(e))
+
+    executor.submit(run)
+    return job_id
+
+def get_job_snapshot(job_id: str):
+    with jobs_lock:
+        job = jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+def job_accepted_response(job_id: str, **details) -> JSONResponse:
+    """202 with the job id, or 200 with the response right away when it came from the result cache."""
+    job = get_job_snapshot(job_id)
+    content = {
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events",
+        "status": job["status"],
+        "cache": job["cache"],
+        **details,
+    }
+    if job["cache"]["hit"]:
+        return JSONResponse(status_code=200, content={**content, "response": job["response"]})
+    return JSONResponse(status_code=202, content=content)
+
 # --- Helper Function for Unique Filenames (Optional) ---
 def get_unique_filename(original_filename: str) -> str:
     """Generates a unique filename while preserving the extension."""
@@ -93,13 +230,17 @@ async def read_root():
 async def upload_video(
     video: UploadFile = File(..., description="The video file to upload."),
     language: str = Form(..., description="Target language code (e.g., 'en', 'fn', 'es', 'de', 'ro').", examples=["en", "fr", "es", "de", "ro"]),
-    task: str = Form(..., description="The specific task to be performed with the video (e.g., 'summarize', 'transcribe', 'explain', 'latex').", examples=["summarize", "transcribe","explain", "latex"])
+    task: str = Form(..., description="The specific task to be performed with the video (e.g., 'summarize', 'transcribe', 'explain', 'latex').", examples=["summarize", "transcribe","explain", "latex"]),
+    stream: bool = Form(False, description="Stream the generated text as server-sent events instead of returning a job id."),
+    no_cache: bool = Form(False, description="Ignore a cached result for this video, task and language and generate it again.")
 ):
     """
     Uploads a video file.
 
     The file is saved to the server in the 'uploads' directory
-    relative to the script location.
+    relative to the script location and processed as a background job;
+    the response (202) carries the job id. With `stream`, the job is
+    followed as server-sent events in the same response instead.
     """
     if not video.filename:
          raise HTTPException(status_code=400, detail="No filename provided.")
@@ -108,22 +249,27 @@ async def upload_video(
         raise HTTPException(status_code=400, detail="Invalid file type. Only video files are allowed.")
 
     # Basic sanitization using Path().name to get just the filename part
-    # Consider using get_unique_filename() for better collision avoidance
     safe_filename = Path(video.filename).name
-    # Construct the full absolute path for saving
-    file_path = UPLOAD_DIRECTORY / safe_filename
+    # Written under a unique name first, then stored by content hash: a queued
+    # job reads its file later, so another upload with the same filename must
+    # not replace it, and the result cache key must match the bytes analysed
+    partial_path = UPLOAD_DIRECTORY / f"{get_unique_filename(safe_filename)}.part"
 
+    sha256 = hashlib.sha256()
     try:
         # Save the file chunk by chunk to handle large files efficiently
-        with open(file_path, "wb") as buffer:
+        with open(partial_path, "wb") as buffer:
             while chunk := await video.read(CHUNK_SIZE):
                 buffer.write(chunk)
+                sha256.update(chunk)
+        file_path = UPLOAD_DIRECTORY / f"{sha256.hexdigest()}{Path(safe_filename).suffix.lower()}"
+        os.replace(partial_path, file_path) # Same content if it already exists
 
     except Exception as e:
         # Clean up partial file if upload fails
-        if file_path.exists():
+        if partial_path.exists():
             try:
-                file_path.unlink()
+                partial_path.unlink()
             except OSError:
                  # Ignore errors during cleanup attempt, log if necessary
                  pass
@@ -133,20 +279,28 @@ async def upload_video(
 
     # Construct a simple relative path string for the response
     # This assumes the 'uploads' directory is served or known by the client
-    relative_save_path_str = f"{UPLOAD_DIRECTORY.name}/{safe_filename}"
+    relative_save_path_str = f"{UPLOAD_DIRECTORY.name}/{file_path.name}"
     print(f"File saved to: {relative_save_path_str}")
 
-    generate_response = generate(mode="video", task=task, file=file_path, language=language)
-
-    return {
-        "message": "Video uploaded successfully",
+    details = {
         "filename": safe_filename,
         "content_type": video.content_type,
         "saved_path": relative_save_path_str,
         "language": language,
         "task": task,
-        "response": generate_response
     }
+    job_id = await asyncio.to_thread(
+        submit_job,
+        details,
+        cache_key=result_cache_key(f"sha256:{sha256.hexdigest()}", task, language),
+        bypass_cache=no_cache,
+        mode="video", task=task, file=file_path, language=language
+    )
+    if stream:
+        return job_event_response(job_id, **details)
+
+    # Processing continues in the background; poll status_url or follow events_url
+    return job_accepted_response(job_id, message="Video uploaded successfully", **details)
 
 # --- Endpoint 2: YouTube Link Upload ---
 @app.post("/upload/youtube/")
@@ -170,20 +324,90 @@ async def upload_youtube_link(
     match = re.search(YOUTUBE_REGEX, url_str)
     video_id = match.group(1) if match else None # Get the captured group (the ID)
 
-    generate_response = generate(mode="youtube", task=task_description, file=None, language=language_code, video_link=url_str)
-
-    return {
-        "message": "Valid YouTube link received.",
+    details = {
         "received_url": url_str,
         "extracted_video_id": video_id,
         "language": language_code,
         "task": task_description,
-        "response": generate_response
     }
-
-def generate(mode = "youtube", task = "summarize", file = None, language = "en", video_link = None):
-
-    model = "gemini-2.0-flash-thinking-exp-01-21"
+    job_id = await asyncio.to_thread(
+        submit_job,
+        details,
+        cache_key=result_cache_key(f"youtube:{video_id}", task_description, language_code) if video_id else None,
+        bypass_cache=link_data.no_cache,
+        mode="youtube", task=task_description, file=None, language=language_code, video_link=url_str
+    )
+    if link_data.stream:
+        return job_event_response(job_id, **details)
+
+    return job_accepted_response(job_id, message="Valid YouTube link received.", **details)
+
+# --- Endpoint 3: Job Status ---
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Returns the status of a video job; `response` holds the generated text once it is done."""
+    job = get_job_snapshot(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+# --- Endpoint 4: Job Events (SSE) ---
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Streams a job as server-sent events: `job` (its id), `status` on every
+    status/stage change, `text` with each newly generated piece, then `done` (with the
+    full response) or `error`.
+    """
+    if get_job_snapshot(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job_event_response(job_id)
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def job_events(job_id: str):
+    """Yields a job's status changes, text deltas and final `done`/`error` as SSE messages."""
+    last_state = None
+    sent_chars = 0
+    while True:
+        job = get_job_snapshot(job_id)
+        if job is None:
+            yield sse_event("error", {"error": "Job expired."})
+            return
+        state = (job["status"], job["stage"])
+        if state != last_state:
+            last_state = state
+            yield sse_event("status", {"status": job["status"], "stage": job["stage"]})
+        if len(job["text"]) > sent_chars:
+            yield sse_event("text", {"text": job["text"][sent_chars:]})
+            sent_chars = len(job["text"])
+        if job["status"] == "done":
+            yield sse_event("done", {"response": job["response"]})
+            return
+        if job["status"] == "failed":
+            yield sse_event("error", {"error": job["error"]})
+            return
+        await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+def job_event_response(job_id: str, **details) -> StreamingResponse:
+    """Streams a job as SSE, starting with a `job` event carrying its id and `details`."""
+    async def events():
+        job = get_job_snapshot(job_id) or {}
+        yield sse_event("job", {"job_id": job_id, "cache": job.get("cache"), **details})
+        async for message in job_events(job_id):
+            yield message
+
+    # X-Accel-Buffering stops nginx from holding the stream back
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def generate(mode = "youtube", task = "summarize", file = None, language = "en", video_link = None, on_stage = None, on_text = None):
+    """Runs the Gemini pipeline (blocking). `on_stage(name)` and `on_text(chunk)` report progress."""
+    on_stage = on_stage or (lambda stage: None)
+    on_text = on_text or (lambda text: None)
+
+    model = MODEL
 
     if task == "summarize":
         if language == "en":
@@ -247,20 +471,10 @@ def generate(mode = "youtube", task = "summarize", file = None, language = "en",
 
     elif mode == "video" and file:
 
-        print("Uploading file...")
-        video_file = client.files.upload(file=file)
-        print(f"Completed upload: {video_file.uri}")
-
-        # Check whether the file is ready to be used.
-        while video_file.state.name == "PROCESSING":
-            print('.', end='')
-            time.sleep(1)
-            video_file = client.files.get(name=video_file.name)
-
-        if video_file.state.name == "FAILED":
-          raise ValueError(video_file.state.name)
-
-        print('Done')
+        # Reuses the remote copy if this video was uploaded before and hasn't expired.
+        # The registry key is hashed from the file being uploaded, not taken from the request.
+        on_stage("uploading")
+        (video_file,), _ = run_upload_files(client, [file], registry=remote_files)
 
         contents = [
             video_file,
@@ -275,6 +489,7 @@ def generate(mode = "youtube", task = "summarize", file = None, language = "en",
         temperature=0.7,
     )
 
+    on_stage("generating")
     return_text = ""
     for chunk in client.models.generate_content_stream(
         model=model,
@@ -282,6 +497,7 @@ def generate(mode = "youtube", task = "summarize", file = None, language = "en",
         config=generate_content_config,
     ):
         return_text += str(chunk.text)
+        on_text(str(chunk.text))
         print(chunk.text, end="")
 
     return return_text
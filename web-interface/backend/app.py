@@ -1,21 +1,75 @@
-from flask import Flask, jsonify, abort, request, send_file, make_response
+from flask import Flask, Response, jsonify, abort, request, stream_with_context
 from flask_cors import CORS
+import click
 import redis
-import re # Import regular expressions for sorting
+import xml.etree.ElementTree as ET
 import json
-import requests
 import time
-import base64
-import io
+import threading
+import uuid
 from pathlib import Path
 
+from doc_index import (
+    unindex_document, rebuild_document_index, ensure_document_index,
+    get_document_keys_slice, get_document_keys_page, iter_document_keys,
+    count_documents, start_index_listener, reconcile_document_index,
+    acquire_listener_lease, mark_listener_active, is_listener_active,
+)
+from keyspace import iter_keys
+from content_index import (
+    index_content, unindex_content, find_key_by_content, wait_for_content, rebuild_content_index,
+)
+from jobs import submit_job, get_job
+from naming import name_documents
+import name_cache
+import search_cache
+from metrics import render_metrics
+from pdf_store import open_pdf, link_pdf, migrate_inline_pdf, collect_garbage, select_byte_range
+from pdf_extract import count_pages, iter_page_texts, iter_pdf_chunks
+from blob_store import FileSystemBlobStore, RedisBlobStore
+import redis_pool
+from ingest import ingest_texts
+from flowise_client import FlowiseClient, FlowiseEndpoint, CircuitOpenError
+from quiz_format import QuizStreamParser, parse_quiz_xml, encode_parsed_quiz, decode_parsed_quiz
+from vector_index import LocalVectorIndex, create_embedder
+from text_index import BM25Index, reciprocal_rank_fusion, keyword_weight
+from saved_items import QUIZZES, ASSIGNMENTS, save_item, delete_item, get_item_page, count_items
+
 # --- Configuration ---
 REDIS_HOST = "192.168.10.164"
 REDIS_PORT = 6699
 REDIS_DB = 0
 REDIS_PASSWORD = None  # Set password if needed, otherwise None
+REDIS_MAX_CONNECTIONS = 50 # Per worker process, shared by all request handlers
+REDIS_POOL_TIMEOUT = 5 # Seconds to wait for a free pooled connection before failing
+REDIS_HEALTH_CHECK_INTERVAL = 30 # PING connections that have been idle longer than this (seconds)
+INDEX_LISTENER_RETRY_SECONDS = 30 # First wait before retrying a failed listener start; doubles up to the max
+INDEX_LISTENER_MAX_RETRY_SECONDS = 600
+INDEX_LEASE_SECONDS = 30 # One worker per deployment holds this lease and applies the keyspace events
+INDEX_MAINTENANCE_SECONDS = 10 # How often each worker renews/contends for the lease and refreshes its own indexes
+DOC_INDEX_RECONCILE_SECONDS = 60 # Without keyspace events, how often the lease holder rescans the keyspace
 KEY_PATTERN = "doc:brasov-cursuri:*"
 TARGET_FIELD = "content"
+MATERIALS_PAGE_SIZE = 50 # Default page size for /api/materials
+MATERIALS_MAX_PAGE_SIZE = 500
+MATERIALS_PREVIEW_CHARS = 300 # Content preview length in listings; full text via /api/materials/<id>/content
+MATERIALS_FETCH_BATCH = 100 # Keys per Redis pipeline when hydrating a listing
+PDF_STREAM_CHUNK_SIZE = 256 * 1024 # Bytes read from the blob store per streamed chunk
+BLOB_STORE_BACKEND = "filesystem" # "filesystem" or "redis"
+BLOB_STORE_DIR = Path(__file__).resolve().parent / "blobs" # Used by the filesystem backend
+BLOB_GC_MIN_AGE_SECONDS = 24 * 60 * 60 # gc-pdf-blobs keeps unreferenced blobs used more recently than this
+INGEST_MAX_ITEMS = 1000 # Texts accepted per /api/materials/upload-batch request
+PDF_CHUNK_CHARS = 2000 # Characters per chunk of extracted PDF text
+PDF_INGEST_BATCH = 20 # Chunks upserted between two progress updates of a PDF job
+PDF_LINK_TIMEOUT = 5 # Seconds to wait for an upserted chunk to appear in Redis before linking its PDF
+SAVED_ITEMS_PAGE_SIZE = 20 # Default page size for /api/quizzes and /api/assignments
+SAVED_ITEMS_MAX_PAGE_SIZE = 100
+SEARCH_MAX_LIMIT = 100 # Most results a single /api/materials/search request may ask for
+SEARCH_BACKEND = "remote" # "remote" (Flowise), "local" (in-process index) or "hybrid" (remote, local on failure)
+LOCAL_INDEX_DIR = Path(__file__).resolve().parent / "vector_index" # Persisted local vector index
+LOCAL_EMBEDDER = "hashing" # "hashing[:<dim>]" or "sentence-transformers:<model>"
+SEARCH_CACHE = True # Cache search results in Redis, invalidated whenever the corpus changes
+KEYWORD_SEARCH = False # Rank search results by fusing in BM25 keyword matches (exact codes, names, unaccented terms)
 FLASK_PORT = 5020 # Port for the web server
 
 # Vector DB configuration
@@ -24,74 +78,235 @@ VECTOR_SEARCH_API_URL = "https://flow.sprk.ro/api/v1/vector/search/9ffc4511-5216
 # --- End Configuration ---
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
-
-# Global variable for Redis connection (can be improved with connection pooling for production)
-redis_client = None
+# Enable CORS for all routes; pdf.js needs the range headers exposed to issue partial requests
+CORS(app, expose_headers=['Accept-Ranges', 'Content-Range', 'Content-Length', 'ETag'])
+
+# Background pubsub thread keeping the document index in sync (only in the worker holding the lease)
+index_listener = None
+index_listener_lock = threading.Lock()
+index_maintenance_started = threading.Event()
+index_owner = uuid.uuid4().hex # This worker's identity in the listener lease
+index_leader = False
+index_reconciled_at = 0 # Last reconcile pass by this worker; 0 forces one on taking the lease
+indexed_generation = None # Corpus generation the in-process indexes were last synced at
+index_listener_retry_at = 0 # When a failed start (e.g. CONFIG denied) may be retried
+index_listener_retry_delay = INDEX_LISTENER_RETRY_SECONDS
+
+# Local vector index, loaded on first use when SEARCH_BACKEND is not "remote"
+local_index = None
+local_index_lock = threading.Lock()
+local_index_warming = threading.Event()
+
+# BM25 keyword index, built from Redis in the background when KEYWORD_SEARCH is on
+keyword_index = None
+keyword_index_lock = threading.Lock()
+
+# API URL for quiz generation
+QUIZ_GENERATOR_API_URL = "https://flow.sprk.ro/api/v1/prediction/5d18b69b-b911-4a27-b2dc-2105fd9b42ef"
 
 # API URL for name generation
 NAME_GENERATOR_API_URL = "https://flow.sprk.ro/api/v1/prediction/6b1424e8-987a-4ede-97fe-05d953faf3e6"
 
+# One pooled client for every Flowise call: (connect, read) timeouts, retries and a circuit breaker per endpoint
+flowise = FlowiseClient({
+    'name_generator': FlowiseEndpoint(NAME_GENERATOR_API_URL, timeout=(5, 30), retries=1, retry_read_timeouts=True),
+    'quiz_generator': FlowiseEndpoint(QUIZ_GENERATOR_API_URL, timeout=(5, 120), retries=1),
+    'vector_upsert': FlowiseEndpoint(VECTOR_UPSERT_API_URL, timeout=(5, 60), retries=2, idempotent=False),
+    'vector_search': FlowiseEndpoint(VECTOR_SEARCH_API_URL, timeout=(5, 15), retries=2, retry_read_timeouts=True),
+})
+
+redis_pool.configure(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    db=REDIS_DB,
+    password=REDIS_PASSWORD,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    pool_timeout=REDIS_POOL_TIMEOUT,
+    health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+)
+
 def get_redis_connection():
-    """Establishes and returns a Redis connection."""
-    global redis_client
-    if redis_client is None:
-        try:
-            print(f"Attempting to connect to Redis at {REDIS_HOST}:{REDIS_PORT} DB {REDIS_DB}...")
-            r = redis.Redis(
-                host=REDIS_HOST,
-                port=REDIS_PORT,
-                db=REDIS_DB,
-                password=REDIS_PASSWORD,
-                decode_responses=True
-            )
-            r.ping()
-            print("Successfully connected to Redis.")
-            redis_client = r
-        except redis.exceptions.ConnectionError as e:
-            print(f"FATAL: Could not connect to Redis: {e}")
-            # In a real app, you might retry or have more robust handling
-            raise ConnectionError(f"Failed to connect to Redis: {e}")
-        except redis.exceptions.AuthenticationError:
-             print(f"FATAL: Redis authentication failed. Check password.")
-             raise ConnectionError("Redis authentication failed.")
-        except Exception as e:
-            print(f"FATAL: An unexpected error occurred during Redis connection: {e}")
-            raise ConnectionError(f"Unexpected Redis connection error: {e}")
-    return redis_client
+    """Returns a Redis client with decoded responses, backed by the shared connection pool.
 
-def get_binary_redis_connection():
-    try:
-        # Create Redis client
-        r = redis.Redis(
-            host=REDIS_HOST,
-            port=REDIS_PORT,
-            db=REDIS_DB,
-            password=REDIS_PASSWORD,
-            decode_responses=False,
-            socket_connect_timeout=5 # Add a timeout
-        )
-        r.ping()
-        print("Successfully connected to Redis")
-        return r
-    except redis.exceptions.ConnectionError as e:
-        print(f"Error connecting to Redis: {str(e)}")
-        # Return a connection anyway, to allow the app to start
-        redis_client = redis.Redis(
-            host=REDIS_HOST,
-            port=REDIS_PORT,
-            db=REDIS_DB,
-            password=REDIS_PASSWORD,
-            decode_responses=False
-        )
-        return redis_client
+    Clients are cheap wrappers around the process-wide pool: connections are
+    opened on demand, health-checked when idle and re-established after failures.
+    """
+    ensure_index_listener()
+    return redis.Redis(connection_pool=redis_pool.get_pool(decode_responses=True))
 
-def extract_numeric_index(key_name):
-    """Extracts the numeric index from the key name (e.g., 'doc:brasov-cursuri:10' -> 10)."""
-    match = re.search(r':(\d+)$', key_name)
-    if match:
-        return int(match.group(1))
-    return -1 # Return -1 or raise error if format is unexpected
+def get_binary_redis_connection():
+    """Returns a Redis client with raw (bytes) responses, backed by the shared connection pool."""
+    ensure_index_listener()
+    return redis.Redis(connection_pool=redis_pool.get_pool(decode_responses=False))
+
+def create_blob_store(backend):
+    """Creates the content-addressed store holding PDF bytes outside the document hashes."""
+    if backend == "filesystem":
+        return FileSystemBlobStore(BLOB_STORE_DIR)
+    if backend == "redis":
+        return RedisBlobStore(lambda: redis.Redis(connection_pool=redis_pool.get_pool(decode_responses=False)))
+    raise ValueError(f"Unknown blob store backend: {backend}")
+
+blob_store = create_blob_store(BLOB_STORE_BACKEND)
+
+def ensure_index_listener():
+    """Starts this worker's index maintenance thread and the local index warm-up (once per process)."""
+    if not index_maintenance_started.is_set():
+        with index_listener_lock:
+            if not index_maintenance_started.is_set():
+                index_maintenance_started.set()
+                threading.Thread(target=run_index_maintenance, name='index-maintenance', daemon=True).start()
+    if (SEARCH_BACKEND != 'remote' or KEYWORD_SEARCH) and not local_index_warming.is_set():
+        # Load and sync the local indexes in the background instead of on the first search
+        with index_listener_lock:
+            if not local_index_warming.is_set():
+                local_index_warming.set()
+                threading.Thread(target=warm_local_indexes, name='local-index-warmup', daemon=True).start()
+
+def run_index_maintenance():
+    while True:
+        try:
+            maintain_indexes(redis.Redis(connection_pool=redis_pool.get_pool(decode_responses=True)))
+        except Exception as e:
+            print(f"Index maintenance error: {e}")
+        time.sleep(INDEX_MAINTENANCE_SECONDS)
+
+def maintain_indexes(r):
+    """One pass of the maintenance thread.
+
+    The worker holding the listener lease runs the keyspace listener and
+    updates the shared Redis indexes, so each event is applied once per
+    deployment. If keyspace events are unavailable (CONFIG denied) it
+    reconciles the index with a keyspace scan every DOC_INDEX_RECONCILE_SECONDS
+    instead, and once right after taking the lease to catch up on missed
+    events. Every worker then refreshes its own in-process indexes.
+    """
+    global index_listener, index_leader, index_reconciled_at
+    global index_listener_retry_at, index_listener_retry_delay
+    leader = acquire_listener_lease(r, index_owner, INDEX_LEASE_SECONDS)
+    if leader and not index_leader:
+        print("This worker now maintains the document indexes")
+        index_reconciled_at = 0
+    elif index_leader and not leader:
+        print("Lost the document index lease to another worker")
+        if index_listener is not None:
+            index_listener.stop()
+            index_listener = None
+    index_leader = leader
+
+    if leader:
+        if index_listener is None and time.time() >= index_listener_retry_at:
+            try:
+                index_listener = start_index_listener(
+                    r, KEY_PATTERN, db=REDIS_DB,
+                    on_add=on_document_added,
+                    on_remove=on_document_removed
+                )
+            except redis.RedisError as e:
+                print(f"Warning: Could not start the index listener: {e}")
+            if index_listener is None:
+                index_listener_retry_at = time.time() + index_listener_retry_delay
+                print(f"Retrying the index listener in {index_listener_retry_delay}s, "
+                      f"reconciling every {DOC_INDEX_RECONCILE_SECONDS}s meanwhile")
+                index_listener_retry_delay = min(index_listener_retry_delay * 2, INDEX_LISTENER_MAX_RETRY_SECONDS)
+        if index_listener is not None:
+            mark_listener_active(r, INDEX_LEASE_SECONDS)
+        if index_reconciled_at == 0 or (index_listener is None and
+                                        time.time() - index_reconciled_at >= DOC_INDEX_RECONCILE_SECONDS):
+            ensure_document_index(r, KEY_PATTERN)
+            added, removed = reconcile_document_index(r, KEY_PATTERN)
+            for key in added:
+                on_document_added(r, key)
+            for key in removed:
+                on_document_removed(r, key)
+            if added or removed:
+                print(f"Reconciled the document index: {len(added)} added, {len(removed)} removed")
+            index_reconciled_at = time.time()
+
+    refresh_local_indexes(r, leader)
+
+def refresh_local_indexes(r, leader):
+    """Brings this worker's keyword and local vector indexes in line with the corpus.
+
+    Only the lease holder embeds new documents and saves the local vector
+    index; the other workers reload it from disk once it has been saved.
+    """
+    global indexed_generation
+    if local_index is not None and not leader and local_index.changed_on_disk():
+        local_index.load()
+    generation = search_cache.get_corpus_generation(r)
+    if generation == indexed_generation or (keyword_index is None and local_index is None):
+        return
+    keys = list(iter_document_keys(r))
+    if keyword_index is not None:
+        keyword_index.sync(r, keys)
+    if local_index is not None and leader:
+        local_index.sync(r, keys)
+        if local_index.dirty:
+            local_index.save()
+    indexed_generation = generation
+
+def on_document_added(r, key):
+    """Called by the lease holder whenever a document hash is written (keyspace event or reconcile)."""
+    if index_content(r, key) is not None:
+        search_cache.bump_corpus_generation(r)
+
+def on_document_removed(r, key):
+    """Called by the lease holder whenever a document hash is deleted (keyspace event or reconcile)."""
+    unindex_content(r, key)
+    search_cache.bump_corpus_generation(r)
+
+def remove_document_from_indexes(r, key):
+    """Drops a deleted document from every index (without waiting for the keyspace event)."""
+    unindex_document(r, key)
+    unindex_content(r, key)
+    search_cache.bump_corpus_generation(r)
+    if keyword_index is not None:
+        keyword_index.remove(key)
+    if local_index is not None:
+        local_index.remove(key)
+
+def get_local_index():
+    """Loads the local vector index (once per process) and syncs it with the documents in Redis."""
+    global local_index
+    with local_index_lock:
+        if local_index is None:
+            started = time.perf_counter()
+            r = get_redis_connection()
+            index = LocalVectorIndex(LOCAL_INDEX_DIR, create_embedder(LOCAL_EMBEDDER))
+            index.load()
+            ensure_document_index(r, KEY_PATTERN)
+            added, removed = index.sync(r, iter_document_keys(r))
+            if added or removed:
+                index.save()
+            print(f"Local vector index ready: {len(index)} documents ({added} embedded, {removed} dropped) "
+                  f"in {time.perf_counter() - started:.2f}s")
+            local_index = index
+    return local_index
+
+def get_keyword_index():
+    """Builds the BM25 keyword index (once per process) from the documents in Redis.
+
+    Slow on a large corpus: only called from the warm-up thread, searches use
+    `keyword_index` once it is set.
+    """
+    global keyword_index
+    with keyword_index_lock:
+        if keyword_index is None:
+            started = time.perf_counter()
+            r = get_redis_connection()
+            index = BM25Index()
+            ensure_document_index(r, KEY_PATTERN)
+            added, _ = index.sync(r, iter_document_keys(r))
+            print(f"Keyword index ready: {added} documents in {time.perf_counter() - started:.2f}s")
+            keyword_index = index
+    return keyword_index
+
+def warm_local_indexes():
+    if KEYWORD_SEARCH:
+        get_keyword_index()
+    if SEARCH_BACKEND != 'remote':
+        get_local_index()
 
 @app.route('/brasov-cursuri/<start_str>/<stop_str>', methods=['GET'])
 def get_brasov_cursuri_slice(start_str, stop_str):
@@ -112,41 +327,21 @@ def get_brasov_cursuri_slice(start_str, stop_str):
     try:
         r = get_redis_connection()
 
-        # --- Fetch and Sort Keys ---
-        print(f"Scanning for keys matching pattern: {KEY_PATTERN}")
-        all_keys = []
+        # --- Fetch Keys from the Index ---
+        # The sorted-set index holds every document key scored by its numeric
+        # suffix, so the requested slice is a single ZRANGE.
         try:
-            # Use scan_iter for efficiency
-            key_iterator = r.scan_iter(match=KEY_PATTERN)
-            # Store keys with their numeric index for proper sorting
-            keys_with_indices = []
-            for key in key_iterator:
-                index = extract_numeric_index(key)
-                if index != -1:
-                    keys_with_indices.append((index, key))
-                else:
-                    print(f"Warning: Could not parse index from key '{key}'. Skipping.")
-
-            # Sort keys based on the extracted numeric index
-            keys_with_indices.sort(key=lambda item: item[0])
-            # Get the sorted list of key names
-            sorted_keys = [item[1] for item in keys_with_indices]
-            print(f"Found and sorted {len(sorted_keys)} keys.")
+            ensure_document_index(r, KEY_PATTERN)
+            keys_to_fetch = get_document_keys_slice(r, start, stop)
+            print(f"Fetching content for keys from index {start} up to (but not including) {stop}.")
 
         except redis.RedisError as e:
-            print(f"Redis error during key scan: {e}")
+            print(f"Redis error during index lookup: {e}")
             abort(500, description="Error retrieving keys from Redis.") # Internal Server Error
         except Exception as e:
              print(f"Unexpected error during key processing: {e}")
              abort(500, description="An internal error occurred while processing keys.")
 
-        # --- Apply Slicing ---
-        # Python slice is [start:stop] (exclusive of stop)
-        # User request 1/5 -> indices 1, 2, 3, 4 -> slice [1:5]
-        # User request 10/15 -> indices 10, 11, 12, 13, 14 -> slice [10:15]
-        keys_to_fetch = sorted_keys[start:stop]
-        print(f"Fetching content for keys from index {start} up to (but not including) {stop}.")
-
         # --- Fetch Content ---
         output_data = {}
         if not keys_to_fetch:
@@ -180,8 +375,8 @@ def get_brasov_cursuri_slice(start_str, stop_str):
         # Return the result as JSON
         return jsonify(output_data)
 
-    except ConnectionError as e:
-         # Handle the Redis connection error raised by get_redis_connection
+    except redis.exceptions.ConnectionError as e:
+         # Redis is unreachable even after the pool's reconnect attempts
          print(f"Error detail: {e}")
          abort(503, description="Service Unavailable: Cannot connect to backend data store.") # Service Unavailable
     except Exception as e:
@@ -202,21 +397,33 @@ def internal_server_error(e):
 def service_unavailable(e):
     return jsonify(error=str(e.description)), 503
 
-def generate_document_name(content):
-    """Generate a document name using the AI bot"""
+def generate_document_name(content, rate_limit=None):
+    """Generate a document name using the AI bot, reusing cached names for identical 40-word prefixes
+
+    `rate_limit()`, if given, is called right before the AI request (cache hits skip it).
+    """
     try:
         # Get first 40 words of content
-        first_40_words = ' '.join(content.split()[:40])
+        first_40_words = name_cache.name_prompt_prefix(content)
+
+        # Identical chunks (re-syncs, re-uploads) get the name generated last time
+        redis_client = get_redis_connection()
+        try:
+            cached_name = name_cache.get_cached_name(redis_client, first_40_words)
+            if cached_name:
+                print(f"Using cached name for document: {cached_name}")
+                return cached_name
+        except redis.RedisError as e:
+            print(f"Warning: Name cache unavailable: {e}")
 
         # Create a simple prompt for a 3-word summary
         prompt = f"Summarize this text in exactly 3 words: {first_40_words}"
 
         # Call the AI API with explicit headers
-        response = requests.post(
-            NAME_GENERATOR_API_URL,
-            json={"question": prompt},
-            headers={"Content-Type": "application/json"}
-        )
+        if rate_limit:
+            rate_limit()
+        started = time.perf_counter()
+        response = flowise.post('name_generator', {"question": prompt})
 
         # Print response for debugging
         print(f"AI API Response for name generation: {response.text}")
@@ -226,95 +433,146 @@ def generate_document_name(content):
 
         # Extract the name from the response - check both 'text' and 'output' fields
         if 'text' in result:
-            return result['text'].strip()
+            document_name = result['text'].strip()
         elif 'output' in result:
-            return result['output'].strip()
+            document_name = result['output'].strip()
         else:
             print(f"Error: AI response missing both 'text' and 'output' fields: {result}")
             return None
+
+        if document_name:
+            try:
+                name_cache.store_name(redis_client, first_40_words, document_name, time.perf_counter() - started)
+            except redis.RedisError as e:
+                print(f"Warning: Could not cache document name: {e}")
+        return document_name
     except Exception as e:
         print(f"Error generating document name: {e}")
         return None
 
+def fetch_document_summaries(redis_client, keys, preview_chars=MATERIALS_PREVIEW_CHARS):
+    """Fetch name, content preview and PDF flag for many documents with pipelined HMGET/HEXISTS.
+
+    Never reads PDF bytes; content is cut to `preview_chars` characters.
+    """
+    documents = []
+    for batch_start in range(0, len(keys), MATERIALS_FETCH_BATCH):
+        batch = keys[batch_start:batch_start + MATERIALS_FETCH_BATCH]
+
+        pipe = redis_client.pipeline(transaction=False)
+        for key in batch:
+            pipe.hmget(key, b'name', b'content', b'pdf_ref')
+            # Documents not yet moved to the blob store keep the bytes inline
+            pipe.hexists(key, b'pdf_data')
+        results = pipe.execute()
+
+        for i, key in enumerate(batch):
+            (name_bytes, content_bytes, pdf_ref), has_inline_pdf = results[2 * i], results[2 * i + 1]
+
+            # Skip keys that disappeared or are not document hashes
+            if name_bytes is None and content_bytes is None:
+                continue
+
+            content = (content_bytes or b'').decode('utf-8', errors='replace')
+            documents.append({
+                'id': key.decode('utf-8'),
+                'content': content[:preview_chars],
+                'content_length': len(content),
+                'content_truncated': len(content) > preview_chars,
+                'name': (name_bytes or b'').decode('utf-8', errors='replace'),
+                'has_pdf': bool(pdf_ref) or bool(has_inline_pdf)
+            })
+    return documents
+
 @app.route('/api/materials', methods=['GET'])
 def get_materials():
     try:
+        # Pagination: 'cursor' is the next_cursor returned by the previous page
+        cursor = request.args.get('cursor')
+        try:
+            cursor = int(cursor) if cursor not in (None, '') else None
+            limit = int(request.args.get('limit', MATERIALS_PAGE_SIZE))
+            preview_chars = int(request.args.get('preview', MATERIALS_PREVIEW_CHARS))
+        except ValueError:
+            return jsonify({'error': "'cursor', 'limit' and 'preview' must be integers"}), 400
+        limit = max(1, min(limit, MATERIALS_MAX_PAGE_SIZE))
+        preview_chars = max(0, preview_chars)
+
         # Get Redis connection (non-decoded)
         redis_client = get_binary_redis_connection()
 
-        # Get all document keys from Redis
-        all_keys = redis_client.keys(b'doc:brasov-cursuri:*')
+        # Get one page of document keys from the index
+        ensure_document_index(redis_client, KEY_PATTERN)
+        doc_keys, next_cursor = get_document_keys_page(redis_client, cursor, limit)
+        doc_keys = [key.encode('utf-8') for key in doc_keys]
 
-        # Filter out any non-document keys
-        doc_keys = [key for key in all_keys if not key.endswith(b':name')]
+        documents = fetch_document_summaries(redis_client, doc_keys, preview_chars)
 
-        documents = []
+        return jsonify({
+            'success': True,
+            'documents': documents,
+            'next_cursor': next_cursor,
+            'total': count_documents(redis_client)
+        })
 
-        for key in doc_keys:
-            try:
-                # Get the document hash
-                doc_hash = redis_client.hgetall(key)
+    except Exception as e:
+        print(f"Error in get_materials: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
-                # Skip if empty
-                if not doc_hash:
-                    continue
+@app.route('/api/materials/<doc_id>/content', methods=['GET'])
+def get_material_content(doc_id):
+    try:
+        # Ensure the doc_id is correctly formatted
+        if not doc_id.startswith('doc:brasov-cursuri:'):
+            doc_id = f'doc:brasov-cursuri:{doc_id}'
 
-                # Create the document object with decoded text fields
-                document = {
-                    'id': key.decode('utf-8'),
-                    'content': doc_hash.get(b'content', b'').decode('utf-8', errors='replace'),
-                    'name': doc_hash.get(b'name', b'').decode('utf-8', errors='replace'),
-                    'has_pdf': b'pdf_data' in doc_hash
-                }
+        redis_client = get_binary_redis_connection()
+        doc_id_bytes = doc_id.encode('utf-8')
 
-                # Don't include the pdf_data in the response
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hmget(doc_id_bytes, b'name', b'content', b'pdf_ref')
+        pipe.hexists(doc_id_bytes, b'pdf_data')
+        (name_bytes, content_bytes, pdf_ref), has_inline_pdf = pipe.execute()
 
-                documents.append(document)
-            except Exception as e:
-                print(f"Error processing key {key}: {str(e)}")
+        if content_bytes is None:
+            return jsonify({'error': 'Document not found'}), 404
 
         return jsonify({
             'success': True,
-            'documents': documents
+            'document': {
+                'id': doc_id,
+                'content': content_bytes.decode('utf-8', errors='replace'),
+                'name': (name_bytes or b'').decode('utf-8', errors='replace'),
+                'has_pdf': bool(pdf_ref) or bool(has_inline_pdf)
+            }
         })
-
     except Exception as e:
-        print(f"Error in get_materials: {str(e)}")
+        print(f"Error in get_material_content: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-def find_redis_entry_by_content(content, max_attempts=5, delay=1):
-    """Find a Redis entry that contains the exact content provided"""
-    redis_client = get_redis_connection()
+def find_redis_entry_by_content(content, timeout=5):
+    """Find the Redis entry whose content is exactly `content`.
 
-    # Try multiple times with delay in between
-    for attempt in range(max_attempts):
-        print(f"Searching for entry with matching content (attempt {attempt+1}/{max_attempts})")
-
-        # Get all document keys
-        all_keys = [key.decode('utf-8') for key in redis_client.keys(KEY_PATTERN)]
-
-        # Check each key for matching content
-        for key in all_keys:
-            try:
-                content_bytes = redis_client.hget(key, 'content')
-                if content_bytes:
-                    try:
-                        current_content = content_bytes.decode('utf-8')
-                        if current_content == content:
-                            print(f"Found matching content in key: {key}")
-                            return key
-                    except UnicodeDecodeError:
-                        print(f"Warning: Could not decode content field for key {key} - skipping")
-            except Exception as e:
-                print(f"Error checking key {key}: {e}")
-                continue
+    Uses the content-hash index; if the document has not landed yet (e.g. the
+    Flowise upsert is still writing it), waits up to `timeout` seconds for the
+    index listener to announce it instead of polling.
+    """
+    redis_client = get_redis_connection()
 
-        # If no match found, wait before retrying
-        print(f"No matching content found, waiting {delay} seconds before retrying...")
-        time.sleep(delay)
+    if not is_listener_active(redis_client):
+        # Without keyspace notifications the content index is only reconciled periodically
+        print("Warning: Document index listener not running, scanning for matching content")
+        for key in iter_keys(redis_client, KEY_PATTERN):
+            if redis_client.hget(key, 'content') == content:
+                return key
+        return None
 
-    print("Failed to find matching content after all attempts")
-    return None
+    key = find_key_by_content(redis_client, content)
+    if key is None:
+        key = wait_for_content(redis_client, content, timeout)
+    if key is None:
+        print("Failed to find matching content within timeout")
+    return key
 
 @app.route('/api/materials/upload', methods=['POST'])
 def upload_material():
@@ -336,78 +594,69 @@ def upload_material():
         print(f"Error in upload_material: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/materials/sync-unnamed', methods=['POST'])
-def sync_unnamed_documents():
+@app.route('/api/materials/upload-batch', methods=['POST'])
+def upload_material_batch():
+    """Ingests many texts (e.g. every page of a course) as deduplicated, concurrent vector upserts."""
     try:
-        # Get Redis connection
-        redis_client = get_binary_redis_connection()
+        data = request.json or {}
+        texts = data.get('texts')
+        if texts is None and 'items' in data:
+            texts = [item.get('text', '') for item in data['items']]
+
+        if not texts or not isinstance(texts, list):
+            return jsonify({'success': False, 'error': "Provide a non-empty 'texts' list"}), 400
+        if len(texts) > INGEST_MAX_ITEMS:
+            return jsonify({'success': False, 'error': f'At most {INGEST_MAX_ITEMS} texts per batch'}), 400
+
+        results = ingest_texts(get_redis_connection(), texts, store_document_in_vector_db)
+        print(f"Batch upload: {results['stored']} chunks stored, {results['duplicates']} duplicates, "
+              f"{results['failed']} failed in {results['seconds']}s ({results['docs_per_second']} docs/s, {results['chunks_per_second']} chunks/s)")
 
-        # Get all document keys from Redis
-        all_keys = redis_client.keys(b'doc:brasov-cursuri:*')
+        return jsonify({'success': results['failed'] == 0, **results})
+    except Exception as e:
+        print(f"Error in upload_material_batch: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        # Filter out any non-document keys
-        doc_keys = [key for key in all_keys if not key.endswith(b':name')]
+def start_naming_job(kind, delete_short=False):
+    """Queues a background job naming every unnamed document and returns a 202 response with its id."""
+    redis_client = get_binary_redis_connection()
+
+    # Walk the document index page by page instead of listing every key at once
+    ensure_document_index(redis_client, KEY_PATTERN)
+    total = count_documents(redis_client)
+    print(f"Starting {kind} job over {total} indexed documents")
+
+    def run(report_progress):
+        cache_before = name_cache.get_stats(redis_client)
+        doc_keys = (key.encode('utf-8') for key in iter_document_keys(redis_client))
+        results = name_documents(
+            redis_client, doc_keys, generate_document_name,
+            total=total,
+            delete_short=delete_short,
+            on_delete=remove_document_from_indexes,
+            report_progress=report_progress
+        )
 
-        results = {
-            'total': len(doc_keys),
-            'processed': 0,
-            'named': 0,
-            'errors': 0,
-            'named_documents': []
+        # How much of this run was served by the name cache (approximate if jobs overlap)
+        cache_after = name_cache.get_stats(redis_client)
+        results['name_cache'] = {
+            'hits': cache_after['hits'] - cache_before['hits'],
+            'misses': cache_after['misses'] - cache_before['misses'],
+            'saved_seconds': round(cache_after['saved_seconds'] - cache_before['saved_seconds'], 2)
         }
+        return results
 
-        for key in doc_keys:
-            try:
-                print(f"Processing document {key}")
-
-                # Check if this document already has a name
-                has_name = redis_client.hexists(key, b'name')
-                if has_name:
-                    # Skip documents that already have names
-                    continue
-
-                # Get the document content
-                content_bytes = redis_client.hget(key, b'content')
-                if not content_bytes:
-                    print(f"Document {key} has no content field")
-                    results['errors'] += 1
-                    continue
-
-                try:
-                    content = content_bytes.decode('utf-8')
-                except UnicodeDecodeError:
-                    print(f"Could not decode content for {key}")
-                    results['errors'] += 1
-                    continue
-
-                # Generate a name for the document
-                document_name = generate_document_name(content)
-
-                if document_name:
-                    # Store the name in Redis
-                    redis_client.hset(key, b'name', document_name.encode('utf-8'))
-
-                    # Add to results
-                    results['named'] += 1
-                    results['named_documents'].append({
-                        'key': key.decode('utf-8'),
-                        'name': document_name
-                    })
-
-                    print(f"Set name '{document_name}' for document {key}")
-                else:
-                    results['errors'] += 1
-
-                results['processed'] += 1
-
-            except Exception as e:
-                print(f"Error processing document {key}: {str(e)}")
-                results['errors'] += 1
+    job_id = submit_job(redis_client, kind, run)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': f'/api/jobs/{job_id}'
+    }), 202
 
-        return jsonify({
-            'success': True,
-            'results': results
-        })
+@app.route('/api/materials/sync-unnamed', methods=['POST'])
+def sync_unnamed_documents():
+    try:
+        return start_naming_job('sync-unnamed')
     except Exception as e:
         print(f"Error in sync_unnamed_documents: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -446,6 +695,7 @@ def sync_document_name():
         # Store the new name directly in the document hash
         if document_name:
             redis_client.hset(key_bytes, b'name', document_name.encode('utf-8'))
+            search_cache.bump_corpus_generation(redis_client)
             print(f"Successfully set name '{document_name}' for key '{key}'")
 
             return jsonify({
@@ -480,6 +730,7 @@ def delete_material():
 
         # Delete the document hash (contains all fields including name)
         redis_client.delete(key_bytes)
+        remove_document_from_indexes(redis_client, key_bytes)
 
         return jsonify({
             'success': True,
@@ -491,174 +742,63 @@ def delete_material():
 
 @app.route('/api/materials/sync-all', methods=['POST'])
 def sync_all_documents():
+    """Names every unnamed document and deletes documents with short/invalid content ('#')."""
     try:
-        # Get Redis connection with binary data
-        redis_client = get_binary_redis_connection()
-
-        # Get all document keys from Redis as binary
-        all_keys = redis_client.keys(b'doc:brasov-cursuri:*')
-        print(f"Found {len(all_keys)} total keys in Redis")
-
-        # Filter out any non-document keys
-        doc_keys = [key for key in all_keys if not key.endswith(b':name')]
-        print(f"Found {len(doc_keys)} document keys after filtering")
-
-        results = {
-            'total': len(doc_keys),
-            'processed': 0,
-            'already_named': 0,
-            'named': 0,
-            'deleted': 0,
-            'errors': 0,
-            'deleted_keys': [],
-            'named_keys': []
-        }
-
-        # Debug counters
-        debug_process_count = 0
-        debug_api_call_count = 0
-        debug_api_success_count = 0
-
-        for key in doc_keys:
-            try:
-                debug_process_count += 1
-                key_str = key.decode('utf-8')
-                print(f"Processing document {debug_process_count}/{len(doc_keys)}: {key_str}")
-
-                # Check if this document already has a name field
-                has_name = redis_client.hexists(key, b'name')
-                if has_name:
-                    name_bytes = redis_client.hget(key, b'name')
-                    if name_bytes:
-                        existing_name = name_bytes.decode('utf-8', errors='replace')
-                        print(f"Document already has name: {existing_name}")
-                        results['already_named'] += 1
-                        continue
-
-                # Get the document content
-                content_bytes = redis_client.hget(key, b'content')
-                if not content_bytes:
-                    print(f"Document {key_str} has no content field")
-                    results['errors'] += 1
-                    continue
-
-                # Try to decode content
-                try:
-                    text = content_bytes.decode('utf-8', errors='replace')
-                except Exception as e:
-                    print(f"Error decoding content for {key_str}: {e}")
-                    results['errors'] += 1
-                    continue
-
-                # Debug content
-                print(f"Document content (first 100 chars): {text[:100]}...")
-
-                # Check if content is just "#" or extremely short - delete this document
-                if text == '#' or len(text) < 5:
-                    print(f"Deleting document with short/invalid content: {key_str}")
-                    # Store key details before deletion
-                    results['deleted_keys'].append({
-                        'key': key_str,
-                        'content': text[:30] + ('...' if len(text) > 30 else '')
-                    })
-
-                    # Delete the document
-                    redis_client.delete(key)
-                    results['deleted'] += 1
-                    continue
-
-                # Get first 40 words of content for name generation
-                first_40_words = ' '.join(text.split()[:40])
-
-                # Create prompt for name generation - make it simple, asking for a 3-word summary
-                prompt = f"Summarize this text in exactly 3 words: {first_40_words}"
-
-                print(f"Calling AI API with prompt: {prompt[:100]}...")
-                debug_api_call_count += 1
-
-                # Call the AI API with the correct format
-                try:
-                    response = requests.post(
-                        NAME_GENERATOR_API_URL,
-                        json={"question": prompt},
-                        headers={"Content-Type": "application/json"},
-                        timeout=10  # Add timeout
-                    )
-
-                    # Print the actual response for debugging
-                    print(f"AI API Response status: {response.status_code}")
-                    print(f"AI API Response text: {response.text}")
-
-                    # Parse the response
-                    result = response.json()
-
-                    # Check if the response has 'text' or 'output' field
-                    if 'text' in result:
-                        document_name = result['text'].strip()
-                        debug_api_success_count += 1
-
-                        print(f"Generated name: '{document_name}'")
-
-                        # Store the name directly in the document hash
-                        redis_client.hset(key, b'name', document_name.encode('utf-8'))
-
-                        print(f"Successfully set name '{document_name}' for key '{key_str}'")
-
-                        # Store detailed info about the named document
-                        results['named_keys'].append({
-                            'key': key_str,
-                            'name': document_name,
-                            'preview': first_40_words[:50] + ('...' if len(first_40_words) > 50 else '')
-                        })
-
-                        results['named'] += 1
-                    elif 'output' in result:
-                        document_name = result['output'].strip()
-                        debug_api_success_count += 1
-
-                        print(f"Generated name: '{document_name}'")
-
-                        # Store the name directly in the document hash
-                        redis_client.hset(key, b'name', document_name.encode('utf-8'))
-
-                        print(f"Successfully set name '{document_name}' for key '{key_str}'")
-
-                        # Store detailed info about the named document
-                        results['named_keys'].append({
-                            'key': key_str,
-                            'name': document_name,
-                            'preview': first_40_words[:50] + ('...' if len(first_40_words) > 50 else '')
-                        })
-
-                        results['named'] += 1
-                    else:
-                        print(f"Error: AI API response missing both 'text' and 'output' fields: {result}")
-                        results['errors'] += 1
-                except Exception as e:
-                    print(f"Error with AI name generation: {e}")
-                    results['errors'] += 1
-
-                results['processed'] += 1
-
-            except Exception as e:
-                print(f"Error processing key {key}: {str(e)}")
-                results['errors'] += 1
-
-        # Calculate summary statistics
-        results['summary'] = f"Named {results['named']} documents, deleted {results['deleted']} documents, {results['already_named']} already had names"
-
-        # Add debug information
-        print(f"Debug summary: processed {debug_process_count} docs, made {debug_api_call_count} API calls, got {debug_api_success_count} successful names")
-
-        return jsonify({
-            'success': True,
-            'results': results
-        })
-
+        return start_naming_job('sync-all', delete_short=True)
     except Exception as e:
         print(f"Error in sync_all_documents: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def serve_pdf(redis_client, key, filename, as_attachment=False):
+    """Streams the PDF of document `key` with Range, ETag and Last-Modified support.
+
+    Only the requested byte range is read from the blob store, in
+    PDF_STREAM_CHUNK_SIZE pieces, so the viewer can render the first pages
+    before the rest arrives.
+    """
+    pdf = open_pdf(redis_client, key, blob_store)
+    if pdf is None:
+        return jsonify({'error': 'Document has no PDF data'}), 404
+
+    # Conditional GET: the client already has this version
+    if request.if_none_match.contains_weak(pdf.etag) or (
+            not request.if_none_match and pdf.modified is not None
+            and request.if_modified_since is not None
+            and int(request.if_modified_since.timestamp()) >= pdf.modified):
+        pdf.close()
+        response = Response(status=304)
+        response.set_etag(pdf.etag, weak=pdf.weak_etag)
+        return response
+
+    # If-Range: only honour the range if the client's copy is still current
+    range_valid = request.if_range.etag is None or (not pdf.weak_etag and request.if_range.etag == pdf.etag)
+    # Multi-range requests are answered with the whole file
+    byte_range = select_byte_range(request.range, pdf.size, range_valid)
+    if byte_range is None:
+        pdf.close()
+        response = Response(status=416)
+        response.headers.set('Content-Range', f'bytes */{pdf.size}')
+        return response
+    start, end, status = byte_range
+
+    response = Response(
+        pdf.iter_chunks(start, end, PDF_STREAM_CHUNK_SIZE),
+        status=status,
+        mimetype='application/pdf',
+        direct_passthrough=True
+    )
+    response.headers.set('Content-Length', str(end - start))
+    response.headers.set('Accept-Ranges', 'bytes')
+    if status == 206:
+        response.headers.set('Content-Range', f'bytes {start}-{end - 1}/{pdf.size}')
+    response.set_etag(pdf.etag, weak=pdf.weak_etag)
+    if pdf.modified is not None:
+        response.last_modified = pdf.modified
+    response.headers.set('Cache-Control', 'no-cache')
+    disposition = 'attachment' if as_attachment else 'inline'
+    response.headers.set('Content-Disposition', f'{disposition}; filename="{filename}"')
+    return response
+
 @app.route('/api/materials/pdf/<key>', methods=['GET'])
 def get_pdf(key):
     try:
@@ -670,40 +810,18 @@ def get_pdf(key):
         redis_client = get_binary_redis_connection()
         key_bytes = key.encode('utf-8')
 
-        # Check if the document exists
-        if not redis_client.exists(key_bytes):
+        # Get document name if available (also tells us whether the document exists)
+        name_bytes = redis_client.hget(key_bytes, b'name')
+        if name_bytes is None and not redis_client.exists(key_bytes):
             return jsonify({'error': 'Document not found'}), 404
 
-        # Check if the document has PDF data
-        if not redis_client.hexists(key_bytes, b'pdf_data'):
-            return jsonify({'error': 'Document has no PDF data'}), 404
-
-        # Get the PDF data directly as binary
-        pdf_data = redis_client.hget(key_bytes, b'pdf_data')
-
-        # Get document name if available
         doc_name = ""
-        name_bytes = redis_client.hget(key_bytes, b'name')
         if name_bytes:
-            try:
-                doc_name = name_bytes.decode('utf-8', errors='replace')
-            except:
-                doc_name = key.split(':')[-1]
-
+            doc_name = name_bytes.decode('utf-8', errors='replace')
         if not doc_name:
             doc_name = key.split(':')[-1]
 
-        # Create a BytesIO object with the PDF data
-        pdf_io = io.BytesIO(pdf_data)
-        pdf_io.seek(0)
-
-        # Send the file
-        return send_file(
-            pdf_io,
-            mimetype='application/pdf',
-            as_attachment=False,
-            download_name=f"{doc_name}.pdf"
-        )
+        return serve_pdf(redis_client, key_bytes, f"{doc_name}.pdf")
     except Exception as e:
         print(f"Error in get_pdf: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -725,76 +843,167 @@ def get_document_pdf(doc_id):
         if not redis_client.exists(doc_id_bytes):
             return jsonify({'error': 'Document not found'}), 404
 
-        # Get the PDF data directly
-        pdf_data = redis_client.hget(doc_id_bytes, b'pdf_data')
-
-        if not pdf_data:
-            return jsonify({'error': 'No PDF data for this document'}), 404
-
-        # Return the PDF data as a binary response
-        response = make_response(pdf_data)
-        response.headers.set('Content-Type', 'application/pdf')
-        response.headers.set('Content-Disposition', f'inline; filename="{doc_id}.pdf"')
-
-        return response
+        return serve_pdf(redis_client, doc_id_bytes, f"{doc_id}.pdf")
 
     except Exception as e:
         print(f"Error in get_document_pdf: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Fields a search result can carry, and the document hash fields each one needs
+SEARCH_RESULT_FIELDS = {
+    'text': ('content',),
+    'title': ('metadata',),
+    'timestamp': (),
+    'key': (),
+    'name': ('name',),
+    'has_pdf': ('metadata', 'pdf_ref'),
+    'score': (),
+    'vector_score': (),
+    'keyword_score': (),
+    'fused_score': (),
+}
+
+def hydrate_search_matches(redis_client, matches, fields, preview_chars=None):
+    """Turn vector matches into materials with one pipelined HMGET of just the needed hash fields."""
+    redis_fields = sorted({field for name in fields for field in SEARCH_RESULT_FIELDS[name]})
+    want_text = 'text' in fields
+
+    keyed_matches = [(match.get('metadata', {}).get('key'), match) for match in matches]
+    keyed_matches = [(doc_key, match) for doc_key, match in keyed_matches if doc_key]
+
+    pipe = redis_client.pipeline(transaction=False)
+    for doc_key, _ in keyed_matches:
+        if redis_fields:
+            pipe.hmget(doc_key, *redis_fields)
+        if not want_text:
+            # Only check that the document still exists instead of transferring its content
+            pipe.hstrlen(doc_key, 'content')
+    replies = iter(pipe.execute())
+
+    materials = []
+    for doc_key, match in keyed_matches:
+        values = dict(zip(redis_fields, next(replies))) if redis_fields else {}
+        exists = values.get('content') is not None if want_text else bool(next(replies))
+        if not exists:
+            continue
+
+        # Parse metadata
+        metadata = {}
+        if values.get('metadata'):
+            try:
+                metadata = json.loads(values['metadata'])
+            except json.JSONDecodeError:
+                metadata = {}
+
+        material_data = {}
+        for name in fields:
+            if name == 'text':
+                text = values['content']
+                if preview_chars is not None and len(text) > preview_chars:
+                    text = text[:preview_chars]
+                    material_data['text_truncated'] = True
+                material_data['text'] = text
+            elif name == 'title':
+                material_data['title'] = metadata.get('title', '')
+            elif name == 'timestamp':
+                material_data['timestamp'] = int(doc_key.split(':')[-1])
+            elif name == 'key':
+                material_data['key'] = doc_key
+            elif name == 'name':
+                material_data['name'] = values.get('name') or ''
+            elif name == 'has_pdf':
+                material_data['has_pdf'] = bool(values.get('pdf_ref')) or metadata.get('has_pdf', False)
+            elif name == 'score':
+                material_data['score'] = match.get('score', 0)
+            elif name in ('vector_score', 'keyword_score', 'fused_score'):
+                material_data[name] = match.get(name)
+
+        materials.append(material_data)
+    return materials
+
+def fuse_keyword_matches(index, query, vector_matches, limit):
+    """Merges BM25 keyword matches from `index` into the vector matches with reciprocal rank fusion.
+
+    Matches are ordered by the fused score, returned as `fused_score`.
+    Identifier-like queries (course codes) weight the keyword ranking higher.
+    `score` stays the vector similarity (0 for keyword-only matches), and
+    `vector_score` / `keyword_score` are set where the document was matched
+    that way.
+    """
+    keyword_matches = index.search(query, limit)
+    vector_scores = {}
+    for match in vector_matches:
+        key = match.get('metadata', {}).get('key')
+        if key and key not in vector_scores:
+            vector_scores[key] = match.get('score', 0)
+    keyword_scores = dict(keyword_matches)
+
+    fused = reciprocal_rank_fusion(
+        [list(vector_scores), [key for key, _ in keyword_matches]], limit,
+        weights=[1.0, keyword_weight(query)]
+    )
+    matches = []
+    for key, fused_score in fused:
+        match = {'metadata': {'key': key}, 'score': vector_scores.get(key, 0), 'fused_score': fused_score}
+        if key in vector_scores:
+            match['vector_score'] = vector_scores[key]
+        if key in keyword_scores:
+            match['keyword_score'] = keyword_scores[key]
+        matches.append(match)
+    return matches
+
 # New endpoint to search documents by content
 @app.route('/api/materials/search', methods=['POST'])
 def search_materials():
     try:
-        data = request.json
+        data = request.json or {}
         query = data.get('query', '')
-        limit = int(data.get('limit', 10))
+        # Optional content preview length; full text by default
+        preview_chars = data.get('preview')
+        try:
+            limit = max(1, min(int(data.get('limit', 10)), SEARCH_MAX_LIMIT))
+            preview_chars = max(0, int(preview_chars)) if preview_chars is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'error': "'limit' and 'preview' must be integers"}), 400
 
         if not query:
             return jsonify({'error': 'No search query provided'}), 400
 
-        # Search vector database for semantically similar documents
-        search_results = search_vector_db(query, limit)
+        # Optional projection: only return (and only read from Redis) these fields
+        fields = data.get('fields') or list(SEARCH_RESULT_FIELDS)
+        if isinstance(fields, str):
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown_fields = [field for field in fields if field not in SEARCH_RESULT_FIELDS]
+        if unknown_fields:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown_fields)}"}), 400
 
-        if not search_results or 'matches' not in search_results:
-            return jsonify({'materials': [], 'count': 0})
-
-        # Get Redis connection
+        # Identical searches are answered from the shared cache until the corpus changes
         redis_client = get_redis_connection()
+        use_cache = SEARCH_CACHE and not data.get('no_cache')
+        if use_cache:
+            variant = f"{limit}|{','.join(fields)}|{preview_chars}"
+            cached, generation = search_cache.get_cached_search(redis_client, query, variant)
+            if cached is not None:
+                return jsonify({'materials': cached, 'count': len(cached), 'cached': True})
+        started = time.perf_counter()
 
-        # Get details for each matching document
-        materials = []
-        for match in search_results.get('matches', []):
-            # Extract the document key from metadata
-            doc_key = match.get('metadata', {}).get('key')
-            if not doc_key:
-                continue
+        # Search vector database for semantically similar documents
+        search_results = search_vector_db(query, limit)
+        matches = (search_results or {}).get('matches', [])
 
-            # Get document details from Redis
-            doc_fields = redis_client.hgetall(doc_key)
-            if not doc_fields or 'content' not in doc_fields:
-                continue
+        # Until the background build finishes, searches are vector-only (and not cached)
+        index = keyword_index if KEYWORD_SEARCH else None
+        if index is not None:
+            matches = fuse_keyword_matches(index, query, matches, limit)
 
-            # Parse metadata
-            metadata = {}
-            if 'metadata' in doc_fields:
-                try:
-                    metadata = json.loads(doc_fields['metadata'])
-                except json.JSONDecodeError:
-                    metadata = {}
-
-            # Create material data
-            material_data = {
-                'text': doc_fields['content'],
-                'title': metadata.get('title', ''),
-                'timestamp': int(doc_key.split(':')[-1]),
-                'key': doc_key,
-                'name': doc_fields.get('name', ''),
-                'has_pdf': metadata.get('has_pdf', False),
-                'score': match.get('score', 0)
-            }
+        # Get details for every matching document in one round trip
+        materials = hydrate_search_matches(redis_client, matches, fields, preview_chars) if matches else []
 
-            materials.append(material_data)
+        # Results of a failed vector search are not worth keeping
+        if use_cache and search_results is not None and (index is not None or not KEYWORD_SEARCH):
+            search_cache.store_search(
+                redis_client, query, variant, materials, generation, time.perf_counter() - started
+            )
 
         return jsonify({
             'materials': materials,
@@ -818,16 +1027,29 @@ def store_document_in_vector_db(text, key=None):
             payload["overrideConfig"]["metadata"] = {"key": key}
 
         # Call Flowise API to store the document
-        response = requests.post(VECTOR_UPSERT_API_URL, json=payload)
-        result = response.json()
+        result = flowise.post_json('vector_upsert', payload)
         print(f"Vector DB upsert response: {result}")
+        # Also bumped by the index listener; this covers workers running without keyspace notifications
+        search_cache.bump_corpus_generation(get_redis_connection())
         return result
     except Exception as e:
         print(f"Error storing document in vector DB: {e}")
         return None
 
+def search_local_index(query_text, limit=10):
+    """Searches the in-process vector index; returns matches shaped like the Flowise response."""
+    matches = get_local_index().search(query_text, limit)
+    print(f"Local vector index returned {len(matches)} matches")
+    return {
+        'matches': [{'metadata': {'key': key}, 'score': score} for key, score in matches],
+        'backend': 'local'
+    }
+
 def search_vector_db(query_text, limit=10):
     """Search vector database for semantically similar documents"""
+    if SEARCH_BACKEND == 'local':
+        return search_local_index(query_text, limit)
+
     try:
         payload = {
             "overrideConfig": {
@@ -836,37 +1058,109 @@ def search_vector_db(query_text, limit=10):
             }
         }
 
-        response = requests.post(VECTOR_SEARCH_API_URL, json=payload)
-        result = response.json()
-        print(f"Vector DB search response: {result}")
+        result = flowise.post_json('vector_search', payload)
+        print(f"Vector DB search returned {len(result.get('matches', []))} matches")
         return result
     except Exception as e:
         print(f"Error searching vector DB: {e}")
+        if SEARCH_BACKEND == 'hybrid':
+            print("Falling back to the local vector index")
+            return search_local_index(query_text, limit)
         return None
 
+def link_pdf_chunks(redis_client, chunks, sha, size):
+    """Points every document created from `chunks` at the PDF blob; returns (linked, unlinked).
+
+    Chunks not in Redis yet are waited for under one shared PDF_LINK_TIMEOUT
+    deadline, so a slow chunk does not stop the later ones from being linked.
+    """
+    keys = [find_key_by_content(redis_client, chunk) for chunk in chunks]
+    listening = is_listener_active(redis_client)
+    deadline = time.monotonic() + PDF_LINK_TIMEOUT
+    linked = 0
+    for chunk, key in zip(chunks, keys):
+        remaining = deadline - time.monotonic()
+        if key is None and listening and remaining > 0:
+            # Upserted documents may still be on their way into Redis
+            key = wait_for_content(redis_client, chunk, remaining)
+        elif key is None:
+            # Past the deadline: still link anything that has landed meanwhile
+            key = find_key_by_content(redis_client, chunk)
+        if key is None:
+            continue
+        link_pdf(redis_client, key, sha, size)
+        linked += 1
+    return linked, len(chunks) - linked
+
+def ingest_pdf(redis_client, data, report_progress):
+    """Extracts, chunks and upserts a PDF page range by page range, then links the chunks to its blob."""
+    started = time.perf_counter()
+    sha = blob_store.put(data)
+    pages_total = count_pages(data)
+    progress = {'pages_done': 0, 'pages_total': pages_total, 'chunks': 0, 'stored': 0, 'duplicates': 0, 'failed': 0}
+    report_progress(progress)
+
+    def counted_pages():
+        for text in iter_page_texts(data, pages_total):
+            progress['pages_done'] += 1
+            yield text
+
+    chunks = []
+    batch = []
+
+    def flush(batch):
+        results = ingest_texts(redis_client, batch, store_document_in_vector_db, PDF_CHUNK_CHARS)
+        for name in ('stored', 'duplicates', 'failed'):
+            progress[name] += results[name]
+        progress['chunks'] += len(batch)
+        report_progress(progress)
+
+    for chunk in iter_pdf_chunks(counted_pages(), PDF_CHUNK_CHARS):
+        chunks.append(chunk)
+        batch.append(chunk)
+        if len(batch) >= PDF_INGEST_BATCH:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    progress['linked'], progress['unlinked'] = link_pdf_chunks(redis_client, chunks, sha, len(data))
+    report_progress(progress)
+
+    elapsed = time.perf_counter() - started
+    print(f"PDF {sha[:12]}: {pages_total} pages, {len(chunks)} chunks ({progress['stored']} stored, "
+          f"{progress['duplicates']} duplicates, {progress['failed']} failed), {progress['linked']} linked, "
+          f"{progress['unlinked']} unlinked in {elapsed:.2f}s")
+    return {**progress, 'pdf_ref': sha, 'seconds': round(elapsed, 3)}
+
 @app.route('/api/materials/upload-pdf', methods=['POST'])
 def upload_pdf_material():
+    """Queues server-side extraction and ingestion of an uploaded PDF; progress is at /api/jobs/<id>."""
     try:
         # Check if the request has the file part
         if 'pdf_file' not in request.files:
             return jsonify({'error': 'No PDF file provided'}), 400
 
         pdf_file = request.files['pdf_file']
-        text = request.form.get('text', '')
-
-        if not pdf_file:
+        if not pdf_file or not pdf_file.filename:
             return jsonify({'error': 'No PDF file selected'}), 400
 
-        if not text:
-            return jsonify({'error': 'No text provided'}), 400
+        data = pdf_file.read()
+        if not data.startswith(b'%PDF'):
+            return jsonify({'error': 'File is not a PDF'}), 400
 
-        # ONLY do the Flowise upsert - don't touch Redis directly
-        vector_result = store_document_in_vector_db(text)
-        print(f"Document stored in vector DB with result: {vector_result}")
+        redis_client = get_redis_connection()
+        job_id = submit_job(
+            get_binary_redis_connection(), 'pdf-ingest',
+            lambda report_progress: ingest_pdf(redis_client, data, report_progress)
+        )
+        print(f"Queued PDF ingestion job {job_id} for {pdf_file.filename} ({len(data)} bytes)")
 
         return jsonify({
-            'success': True
-        })
+            'success': True,
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}'
+        }), 202
     except Exception as e:
         print(f"Error in upload_pdf_material: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -874,93 +1168,95 @@ def upload_pdf_material():
 @app.route('/api/materials/sync-names', methods=['POST'])
 def sync_document_names():
     try:
-        # Get Redis connection with binary data
-        redis_client = get_binary_redis_connection()
-
-        # Get all document keys from Redis as binary
-        all_keys = redis_client.keys(b'doc:brasov-cursuri:*')
-        print(f"Found {len(all_keys)} total keys in Redis")
-
-        # Filter out any non-document keys
-        doc_keys = [key for key in all_keys if not key.endswith(b':name')]
-        print(f"Found {len(doc_keys)} document keys after filtering")
-
-        results = {
-            'total': len(doc_keys),
-            'processed': 0,
-            'already_named': 0,
-            'named': 0,
-            'errors': 0,
-            'named_documents': []
-        }
-
-        for key in doc_keys:
-            try:
-                key_str = key.decode('utf-8')
-                print(f"Processing document: {key_str}")
-
-                # Check if this document already has a name field
-                has_name = redis_client.hexists(key, b'name')
-                if has_name:
-                    name_bytes = redis_client.hget(key, b'name')
-                    if name_bytes:
-                        existing_name = name_bytes.decode('utf-8', errors='replace')
-                        print(f"Document already has name: {existing_name}")
-                        results['already_named'] += 1
-                        continue
-
-                # Get the document content
-                content_bytes = redis_client.hget(key, b'content')
-                if not content_bytes:
-                    print(f"Document has no content field")
-                    results['errors'] += 1
-                    continue
-
-                # Try to decode content
-                try:
-                    text = content_bytes.decode('utf-8', errors='replace')
-                except Exception as e:
-                    print(f"Error decoding content: {e}")
-                    results['errors'] += 1
-                    continue
-
-                # Generate document name using AI
-                document_name = generate_document_name(text)
-
-                if document_name:
-                    # Store the name directly in the document hash
-                    redis_client.hset(key, b'name', document_name.encode('utf-8'))
-
-                    print(f"Set name '{document_name}' for key '{key_str}'")
-
-                    # Store named document info
-                    results['named_documents'].append({
-                        'key': key_str,
-                        'name': document_name
-                    })
-
-                    results['named'] += 1
-                else:
-                    print(f"Failed to generate name for document")
-                    results['errors'] += 1
-
-                results['processed'] += 1
-
-            except Exception as e:
-                print(f"Error processing key {key}: {str(e)}")
-                results['errors'] += 1
+        return start_naming_job('sync-names')
+    except Exception as e:
+        print(f"Error in sync_document_names: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    try:
+        job = get_job(get_binary_redis_connection(), job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
         return jsonify({
             'success': True,
-            'results': results
+            'job': job
         })
-
     except Exception as e:
-        print(f"Error in sync_document_names: {str(e)}")
+        print(f"Error in get_job_status: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def extract_quiz_xml(response_data):
+    """Finds the quiz XML in a (non-streamed) Flowise prediction response."""
+    if isinstance(response_data, dict) and 'text' in response_data:
+        return response_data['text']
+    if isinstance(response_data, list):
+        for item in response_data:
+            if isinstance(item, dict) and item.get('agentName') == 'QuizGenerator' and item.get('messages'):
+                for message in item['messages']:
+                    if isinstance(message, dict) and 'text' in message:
+                        return message['text']
+                    elif isinstance(message, str) and '<test>' in message:
+                        return message
+    return ''
+
+def stream_quiz_generator_text(topic):
+    """Yields the quiz generator's output as it arrives.
+
+    Asks Flowise for a streamed (SSE) prediction; if the flow answers with a
+    plain JSON body instead, the whole XML is yielded as one chunk.
+    """
+    with flowise.post('quiz_generator', {'question': topic, 'streaming': True}, stream=True) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f'External API error: {response.text}')
+
+        if not response.headers.get('Content-Type', '').startswith('text/event-stream'):
+            yield extract_quiz_xml(response.json())
+            return
+
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            try:
+                event = json.loads(line[len('data:'):].strip())
+            except json.JSONDecodeError:
+                continue
+            if event.get('event') == 'token':
+                yield event.get('data', '')
+            elif event.get('event') == 'error':
+                raise RuntimeError(f"External API error: {event.get('data')}")
+            elif event.get('event') == 'end':
+                return
+
+def stream_generated_quiz(topic):
+    """Yields NDJSON lines: the topic, each question as soon as it is parsed, then the full XML."""
+    parser = QuizStreamParser()
+    xml_chunks = []
+    question_count = 0
+
+    def encode(events):
+        nonlocal question_count
+        for event, value in events:
+            if event == 'question':
+                question_count += 1
+                yield json.dumps({'type': 'question', 'question': value}) + '\n'
+            else:
+                yield json.dumps({'type': 'topic', 'topic': value}) + '\n'
+
+    try:
+        for chunk in stream_quiz_generator_text(topic):
+            xml_chunks.append(chunk)
+            yield from encode(parser.feed(chunk))
+        yield from encode(parser.close())
+        yield json.dumps({'type': 'done', 'quizXml': ''.join(xml_chunks), 'questionCount': question_count}) + '\n'
+    except Exception as e:
+        print(f"Error streaming quiz for '{topic}': {str(e)}")
+        yield json.dumps({'type': 'error', 'error': str(e)}) + '\n'
+
 @app.route('/api/quizzes/generate', methods=['POST'])
 def generate_quiz():
+    """Generates a quiz; with {"stream": true} questions are sent as NDJSON lines as soon as they are parsed."""
     try:
         data = request.get_json()
         topic = data.get('topic')
@@ -968,32 +1264,17 @@ def generate_quiz():
         if not topic:
             return jsonify({'success': False, 'error': 'Topic is required'}), 400
 
+        if data.get('stream'):
+            return Response(stream_with_context(stream_generated_quiz(topic)), mimetype='application/x-ndjson')
+
         # Call the external API
-        response = requests.post(
-            'https://flow.sprk.ro/api/v1/prediction/5d18b69b-b911-4a27-b2dc-2105fd9b42ef',
-            json={'question': topic},
-            headers={'Content-Type': 'application/json'}
-        )
+        response = flowise.post('quiz_generator', {'question': topic})
 
         if response.status_code != 200:
             return jsonify({'success': False, 'error': f'External API error: {response.text}'}), 500
 
         # Parse the XML from the response
-        response_data = response.json()
-        xml_content = ''
-
-        if isinstance(response_data, dict) and 'text' in response_data:
-            xml_content = response_data['text']
-        elif isinstance(response_data, list):
-            for item in response_data:
-                if isinstance(item, dict) and item.get('agentName') == 'QuizGenerator' and item.get('messages'):
-                    for message in item['messages']:
-                        if isinstance(message, dict) and 'text' in message:
-                            xml_content = message['text']
-                            break
-                        elif isinstance(message, str) and '<test>' in message:
-                            xml_content = message
-                            break
+        xml_content = extract_quiz_xml(response.json())
 
         if not xml_content:
             return jsonify({'success': False, 'error': 'No XML content found in response'}), 500
@@ -1009,48 +1290,11 @@ def generate_quiz():
         except Exception as e:
             return jsonify({'success': False, 'error': f'XML parsing error: {str(e)}'}), 500
 
+    except CircuitOpenError as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def parse_quiz_xml(xml_string):
-    # Clean the XML string by removing any non-XML content
-    xml_pattern = re.compile(r'<test>.*?</test>', re.DOTALL)
-    match = xml_pattern.search(xml_string)
-    if match:
-        xml_string = match.group(0)
-
-    # Parse the XML
-    root = ET.fromstring(xml_string)
-
-    # Extract topic
-    topic = root.find('topic').text if root.find('topic') is not None else ''
-
-    # Extract questions
-    questions = []
-    for q in root.findall('.//question'):
-        question_data = {
-            'id': q.get('id', ''),
-            'type': q.get('type', ''),
-            'text': q.find('text').text if q.find('text') is not None else '',
-            'options': []
-        }
-
-        # Extract options
-        for option in q.findall('.//option'):
-            is_correct = option.get('correct', 'false').lower() == 'true'
-            option_text = option.text if option.text is not None else ''
-            question_data['options'].append({
-                'text': option_text,
-                'correct': is_correct
-            })
-
-        questions.append(question_data)
-
-    return {
-        'topic': topic,
-        'questions': questions
-    }
-
 @app.route('/api/quizzes/save', methods=['POST'])
 def save_quiz():
     try:
@@ -1061,39 +1305,21 @@ def save_quiz():
         if not xml_content or not topic:
             return jsonify({'success': False, 'error': 'XML content and topic are required'}), 400
 
+        # Parse once here so reads can return the questions without re-parsing the XML
+        fields = {
+            'xml': xml_content,
+            'topic': topic
+        }
+        try:
+            fields.update(encode_parsed_quiz(parse_quiz_xml(xml_content)))
+        except ET.ParseError as e:
+            print(f"Warning: saving quiz '{topic}' without a parsed form: {str(e)}")
+
         # Get Redis client for binary data
         redis_client = get_binary_redis_connection()
 
-        # Get all existing test keys to determine the next index
-        existing_keys = redis_client.keys(b'doc:brasov-tests:*')
-
-        # Extract indexes and find the highest one
-        highest_index = 0
-        for key in existing_keys:
-            try:
-                key_parts = key.decode('utf-8').split(':')
-                if len(key_parts) == 3:
-                    index = int(key_parts[2])
-                    if index > highest_index:
-                        highest_index = index
-            except (ValueError, IndexError, UnicodeDecodeError):
-                continue
-
-        # Increment for new index
-        new_index = highest_index + 1
-
-        # Create new key
-        new_key = f'doc:brasov-tests:{new_index}'
-
-        # Save to Redis
-        redis_client.hset(
-            new_key.encode('utf-8'),
-            mapping={
-                b'xml': xml_content.encode('utf-8'),
-                b'topic': topic.encode('utf-8'),
-                b'timestamp': str(int(time.time())).encode('utf-8')
-            }
-        )
+        # Allocate the next key atomically and index it by timestamp
+        new_key, new_index = save_item(redis_client, QUIZZES, fields)
 
         return jsonify({
             'success': True,
@@ -1105,50 +1331,105 @@ def save_quiz():
         print(f"Error saving quiz: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def get_saved_items_page(redis_client, collection):
+    """Reads limit/cursor/topic from the query string and returns (summaries, next_cursor), or raises ValueError."""
+    cursor = request.args.get('cursor') or None
+    topic = request.args.get('topic', '').strip() or None
+    try:
+        limit = int(request.args.get('limit', SAVED_ITEMS_PAGE_SIZE))
+        return get_item_page(
+            redis_client, collection, cursor,
+            limit=max(1, min(limit, SAVED_ITEMS_MAX_PAGE_SIZE)),
+            topic=topic
+        )
+    except ValueError:
+        raise ValueError("'limit' must be an integer and 'cursor' a value returned by the previous page")
+
+def get_saved_item(redis_client, collection, item_id):
+    """Returns the full stored item (key, topic, timestamp, xml), or None if it does not exist."""
+    key = collection.normalize_key(item_id)
+    topic, timestamp, xml = redis_client.hmget(key, b'topic', b'timestamp', b'xml')
+    if xml is None:
+        return None
+    return {
+        'key': key,
+        'topic': (topic or b'').decode('utf-8', errors='replace'),
+        'timestamp': int(timestamp or 0),
+        'xml': xml.decode('utf-8', errors='replace')
+    }
+
 @app.route('/api/quizzes', methods=['GET'])
 def get_quizzes():
+    """Lists quiz summaries (topic, timestamp, question_count) newest first; XML via /api/quizzes/<id>."""
     try:
         # Get Redis client
         redis_client = get_binary_redis_connection()
 
-        # Get all quiz keys
-        quiz_keys = redis_client.keys(b'doc:brasov-tests:*')
-
-        quizzes = []
-
-        for key in quiz_keys:
-            try:
-                # Get quiz data
-                quiz_data = redis_client.hgetall(key)
-
-                # Skip if empty
-                if not quiz_data:
-                    continue
-
-                # Parse quiz
-                quiz = {
-                    'key': key.decode('utf-8'),
-                    'topic': quiz_data.get(b'topic', b'Unnamed Quiz').decode('utf-8', errors='replace'),
-                    'timestamp': int(quiz_data.get(b'timestamp', b'0').decode('utf-8', errors='replace')),
-                    'xml': quiz_data.get(b'xml', b'').decode('utf-8', errors='replace')
-                }
-
-                quizzes.append(quiz)
-            except Exception as e:
-                print(f"Error processing quiz key {key}: {str(e)}")
-
-        # Sort quizzes by timestamp (newest first)
-        quizzes.sort(key=lambda x: x['timestamp'], reverse=True)
+        try:
+            quizzes, next_cursor = get_saved_items_page(redis_client, QUIZZES)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
 
         return jsonify({
             'success': True,
-            'quizzes': quizzes
+            'quizzes': quizzes,
+            'next_cursor': next_cursor,
+            'total': count_items(redis_client, QUIZZES)
         })
 
     except Exception as e:
         print(f"Error fetching quizzes: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def get_parsed_quiz(redis_client, quiz_id, include_xml=False):
+    """Returns a saved quiz with its parsed questions, or None if it does not exist.
+
+    Quizzes saved before pre-parsing (or under an older schema version) are
+    parsed on first read and the result is stored for the next one.
+    """
+    key = QUIZZES.normalize_key(quiz_id)
+    topic, timestamp, parsed_json, schema_version = redis_client.hmget(
+        key, b'topic', b'timestamp', b'parsed', b'schema_version'
+    )
+    parsed = decode_parsed_quiz(parsed_json, schema_version)
+
+    xml = None
+    if parsed is None or include_xml:
+        xml = redis_client.hget(key, b'xml')
+        if xml is None:
+            return None
+        xml = xml.decode('utf-8', errors='replace')
+    if parsed is None:
+        parsed = parse_quiz_xml(xml)
+        redis_client.hset(key, mapping=encode_parsed_quiz(parsed))
+
+    quiz = {
+        'key': key,
+        'topic': (topic or b'').decode('utf-8', errors='replace'),
+        'timestamp': int(timestamp or 0),
+        'questions': parsed['questions']
+    }
+    if include_xml:
+        quiz['xml'] = xml
+    return quiz
+
+@app.route('/api/quizzes/<quiz_id>', methods=['GET'])
+def get_quiz(quiz_id):
+    """Returns a quiz with its parsed questions; add ?xml=true for the stored XML as well."""
+    try:
+        include_xml = request.args.get('xml', '').lower() in ('1', 'true', 'yes')
+        try:
+            quiz = get_parsed_quiz(get_binary_redis_connection(), quiz_id, include_xml)
+        except ET.ParseError as e:
+            return jsonify({'success': False, 'error': f'XML parsing error: {str(e)}'}), 500
+        if quiz is None:
+            return jsonify({'success': False, 'error': f'Quiz not found: {quiz_id}'}), 404
+        return jsonify({'success': True, 'quiz': quiz})
+
+    except Exception as e:
+        print(f"Error fetching quiz {quiz_id}: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/assignments/save', methods=['POST'])
 def save_assignment():
     try:
@@ -1162,36 +1443,11 @@ def save_assignment():
         # Get Redis client for binary data
         redis_client = get_binary_redis_connection()
 
-        # Get all existing assignment keys to determine the next index
-        existing_keys = redis_client.keys(b'brasov-assignments:*')
-
-        # Extract indexes and find the highest one
-        highest_index = 0
-        for key in existing_keys:
-            try:
-                key_parts = key.decode('utf-8').split(':')
-                if len(key_parts) == 2:
-                    index = int(key_parts[1])
-                    if index > highest_index:
-                        highest_index = index
-            except (ValueError, IndexError, UnicodeDecodeError):
-                continue
-
-        # Increment for new index
-        new_index = highest_index + 1
-
-        # Create new key
-        new_key = f'brasov-assignments:{new_index}'
-
-        # Save to Redis
-        redis_client.hset(
-            new_key.encode('utf-8'),
-            mapping={
-                b'xml': xml_content.encode('utf-8'),
-                b'topic': topic.encode('utf-8'),
-                b'timestamp': str(int(time.time())).encode('utf-8')
-            }
-        )
+        # Allocate the next key atomically and index it by timestamp
+        new_key, new_index = save_item(redis_client, ASSIGNMENTS, {
+            'xml': xml_content,
+            'topic': topic
+        })
 
         return jsonify({
             'success': True,
@@ -1205,51 +1461,26 @@ def save_assignment():
 
 @app.route('/api/assignments', methods=['GET', 'OPTIONS'])
 def get_assignments():
+    """Lists assignment summaries (topic, title, timestamp, question_count) newest first."""
     # Handle preflight OPTIONS request
     if request.method == 'OPTIONS':
         response = jsonify({'success': True})
         return add_cors_headers(response)
 
     try:
-        print("Fetching assignments...")
         # Get Redis client
         redis_client = get_binary_redis_connection()
 
-        # Get all assignment keys
-        assignment_keys = redis_client.keys(b'brasov-assignments:*')
-        print(f"Found {len(assignment_keys)} assignment keys")
-
-        assignments = []
-
-        for key in assignment_keys:
-            try:
-                # Get assignment data
-                assignment_data = redis_client.hgetall(key)
-
-                # Skip if empty
-                if not assignment_data:
-                    print(f"Skipping empty assignment: {key}")
-                    continue
-
-                # Parse assignment
-                assignment = {
-                    'key': key.decode('utf-8'),
-                    'topic': assignment_data.get(b'topic', b'Unnamed Assignment').decode('utf-8', errors='replace'),
-                    'timestamp': int(assignment_data.get(b'timestamp', b'0').decode('utf-8', errors='replace')),
-                    'xml': assignment_data.get(b'xml', b'').decode('utf-8', errors='replace')
-                }
-
-                print(f"Found assignment: {assignment['key']}, topic: {assignment['topic']}")
-                assignments.append(assignment)
-            except Exception as e:
-                print(f"Error processing assignment key {key}: {str(e)}")
-
-        # Sort assignments by timestamp (newest first)
-        assignments.sort(key=lambda x: x['timestamp'], reverse=True)
+        try:
+            assignments, next_cursor = get_saved_items_page(redis_client, ASSIGNMENTS)
+        except ValueError as e:
+            return add_cors_headers(jsonify({'success': False, 'error': str(e)})), 400
 
         response = jsonify({
             'success': True,
-            'assignments': assignments
+            'assignments': assignments,
+            'next_cursor': next_cursor,
+            'total': count_items(redis_client, ASSIGNMENTS)
         })
         return add_cors_headers(response)
 
@@ -1258,6 +1489,20 @@ def get_assignments():
         response = jsonify({'success': False, 'error': str(e)})
         return add_cors_headers(response), 500
 
+@app.route('/api/assignments/<assignment_id>', methods=['GET'])
+def get_assignment(assignment_id):
+    try:
+        assignment = get_saved_item(get_binary_redis_connection(), ASSIGNMENTS, assignment_id)
+        if assignment is None:
+            response = jsonify({'success': False, 'error': f'Assignment not found: {assignment_id}'})
+            return add_cors_headers(response), 404
+        return add_cors_headers(jsonify({'success': True, 'assignment': assignment}))
+
+    except Exception as e:
+        print(f"Error fetching assignment {assignment_id}: {str(e)}")
+        response = jsonify({'success': False, 'error': str(e)})
+        return add_cors_headers(response), 500
+
 # Add assignment delete route
 @app.route('/api/assignments/delete', methods=['POST', 'OPTIONS'])
 def delete_assignment():
@@ -1287,34 +1532,16 @@ def delete_assignment():
         # Get Redis connection (binary)
         redis_client = get_binary_redis_connection()
 
-        # Handle both string format and ensure proper encoding
-        if isinstance(key, str):
-            # If key doesn't have the prefix, add it
-            if not key.startswith('brasov-assignments:'):
-                original_key = key
-                key = f'brasov-assignments:{key}'
-                print(f"Modified key from {original_key} to {key}")
-            key_bytes = key.encode('utf-8')
-        else:
-            key_bytes = key
-
-        # Add debug output
-        print(f"Looking for assignment with key: {key} (bytes: {key_bytes})")
+        # Accept either the full key or just its numeric suffix
+        key = ASSIGNMENTS.normalize_key(key)
+        print(f"Looking for assignment with key: {key}")
 
-        # List all keys for debugging
-        all_keys = redis_client.keys(b'brasov-assignments:*')
-        print(f"Available assignment keys: {[k.decode('utf-8') for k in all_keys]}")
-
-        # Check if assignment exists
-        if not redis_client.exists(key_bytes):
+        # Delete the assignment hash and drop it from the timestamp index
+        if not delete_item(redis_client, ASSIGNMENTS, key):
             print(f"Error: Assignment not found with key: {key}")
             response = jsonify({'success': False, 'error': f'Assignment not found: {key}'})
             return add_cors_headers(response), 404
 
-        # Delete the assignment hash
-        result = redis_client.delete(key_bytes)
-        print(f"Delete result: {result}")
-
         response = jsonify({
             'success': True,
             'message': 'Assignment deleted successfully'
@@ -1354,34 +1581,16 @@ def delete_quiz():
         # Get Redis connection (binary)
         redis_client = get_binary_redis_connection()
 
-        # Handle both string format and ensure proper encoding
-        if isinstance(key, str):
-            # If key doesn't have the prefix, add it
-            if not key.startswith('brasov-quizzes:'):
-                original_key = key
-                key = f'brasov-quizzes:{key}'
-                print(f"Modified key from {original_key} to {key}")
-            key_bytes = key.encode('utf-8')
-        else:
-            key_bytes = key
+        # Accept either the full key or just its numeric suffix
+        key = QUIZZES.normalize_key(key)
+        print(f"Looking for quiz with key: {key}")
 
-        # Add debug output
-        print(f"Looking for quiz with key: {key} (bytes: {key_bytes})")
-
-        # List all keys for debugging
-        all_keys = redis_client.keys(b'brasov-quizzes:*')
-        print(f"Available quiz keys: {[k.decode('utf-8') for k in all_keys]}")
-
-        # Check if quiz exists
-        if not redis_client.exists(key_bytes):
+        # Delete the quiz hash and drop it from the timestamp index
+        if not delete_item(redis_client, QUIZZES, key):
             print(f"Error: Quiz not found with key: {key}")
             response = jsonify({'success': False, 'error': f'Quiz not found: {key}'})
             return add_cors_headers(response), 404
 
-        # Delete the quiz hash
-        result = redis_client.delete(key_bytes)
-        print(f"Delete result: {result}")
-
         response = jsonify({
             'success': True,
             'message': 'Quiz deleted successfully'
@@ -1392,6 +1601,93 @@ def delete_quiz():
         response = jsonify({'success': False, 'error': str(e)})
         return add_cors_headers(response), 500
 
+name_cache.register_metrics(get_redis_connection)
+search_cache.register_metrics(get_redis_connection)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus-style metrics for this worker process (Redis pool usage, etc.)."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+# --- CLI commands ---
+@app.cli.command('rebuild-doc-index')
+def rebuild_doc_index_command():
+    """Rebuilds the sorted-set and content-hash indexes of course documents from a full keyspace scan."""
+    r = get_redis_connection()
+    started = time.perf_counter()
+    count = rebuild_document_index(r, KEY_PATTERN)
+    print(f"Indexed {count} document keys in {time.perf_counter() - started:.2f}s.")
+
+    started = time.perf_counter()
+    count = rebuild_content_index(r, iter_document_keys(r))
+    print(f"Indexed the content hash of {count} documents in {time.perf_counter() - started:.2f}s.")
+
+@app.cli.command('build-vector-index')
+def build_vector_index_command():
+    """Embeds every document into the local vector index from scratch and saves it."""
+    r = get_redis_connection()
+    ensure_document_index(r, KEY_PATTERN)
+    started = time.perf_counter()
+    index = LocalVectorIndex(LOCAL_INDEX_DIR, create_embedder(LOCAL_EMBEDDER))
+    added, _ = index.sync(r, iter_document_keys(r))
+    index.save()
+    print(f"Embedded {added} documents with {index.embedder.name} in {time.perf_counter() - started:.2f}s.")
+
+@app.cli.command('migrate-pdf-blobs')
+def migrate_pdf_blobs_command():
+    """Moves inline pdf_data fields out of the document hashes into the blob store."""
+    r = get_binary_redis_connection()
+    ensure_document_index(r, KEY_PATTERN)
+    migrated = 0
+    freed_bytes = 0
+    for key in iter_document_keys(r):
+        key_bytes = key.encode('utf-8')
+        size = r.hstrlen(key_bytes, b'pdf_data')
+        if not size:
+            continue
+        sha = migrate_inline_pdf(r, key_bytes, blob_store)
+        if sha:
+            migrated += 1
+            freed_bytes += size
+            print(f"Moved PDF of {key} ({size} bytes) to blob {sha}")
+    print(f"Migrated {migrated} PDFs, {freed_bytes / (1024 * 1024):.1f} MB moved out of Redis hashes.")
+
+@app.cli.command('gc-pdf-blobs')
+@click.option('--min-age', type=int, default=BLOB_GC_MIN_AGE_SECONDS, show_default=True,
+              help='Keep unreferenced blobs used within this many seconds.')
+@click.option('--dry-run', is_flag=True, help='Only report what would be deleted.')
+def gc_pdf_blobs_command(min_age, dry_run):
+    """Deletes PDF blobs that no document references any more."""
+    r = get_binary_redis_connection()
+    started = time.perf_counter()
+    deleted, freed_bytes = collect_garbage(r, KEY_PATTERN, blob_store, min_age, dry_run=dry_run)
+    action = "Would delete" if dry_run else "Deleted"
+    print(f"{action} {deleted} unreferenced PDF blobs ({freed_bytes / (1024 * 1024):.1f} MB) "
+          f"in {time.perf_counter() - started:.2f}s.")
+
+@app.cli.command('backfill-parsed-quizzes')
+@click.option('--force', is_flag=True, help='Re-parse quizzes that already have a current parsed form.')
+def backfill_parsed_quizzes_command(force):
+    """Parses every saved quiz's XML and stores the parsed form next to it."""
+    r = get_binary_redis_connection()
+    parsed_count = 0
+    skipped = 0
+    failed = 0
+    for key in iter_keys(r, f"{QUIZZES.prefix}*"):
+        xml, parsed_json, schema_version = r.hmget(key, b'xml', b'parsed', b'schema_version')
+        if xml is None or (not force and decode_parsed_quiz(parsed_json, schema_version) is not None):
+            skipped += 1
+            continue
+        try:
+            parsed = parse_quiz_xml(xml.decode('utf-8', errors='replace'))
+        except ET.ParseError as e:
+            print(f"Could not parse {key.decode('utf-8')}: {str(e)}")
+            failed += 1
+            continue
+        r.hset(key, mapping=encode_parsed_quiz(parsed))
+        parsed_count += 1
+    print(f"Parsed {parsed_count} quizzes, {skipped} skipped, {failed} failed.")
+
 # --- CORS and response handling ---
 def add_cors_headers(response):
     """Add CORS headers to a response."""
@@ -1404,8 +1700,10 @@ if __name__ == '__main__':
     print(f"--- Starting Flask Web Server on http://0.0.0.0:{FLASK_PORT} ---")
     # Get the initial connection attempt out of the way before starting server
     try:
-        get_redis_connection()
-    except ConnectionError:
+        get_redis_connection().ping()
+        print("Successfully connected to Redis.")
+    except redis.RedisError as e:
+        print(f"FATAL: Could not connect to Redis: {e}")
         print("--- Exiting due to failed initial Redis connection ---")
         exit(1) # Exit if we can't connect on startup
 
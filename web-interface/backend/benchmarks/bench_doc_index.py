@@ -0,0 +1,97 @@
+"""Benchmark: /brasov-cursuri slices via full SCAN + sort vs. the sorted-set index.
+
+Populates a scratch Redis database with synthetic course documents and times
+fetching one page of content both ways.
+
+    python benchmarks/bench_doc_index.py --host localhost --port 6379 --db 15
+
+WARNING: the target database is flushed before every run.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import redis
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from doc_index import (  # noqa: E402
+    extract_numeric_index, rebuild_document_index, get_document_keys_slice,
+)
+
+KEY_PATTERN = "doc:brasov-cursuri:*"
+PAGE_SIZE = 20
+
+
+def populate(r, count):
+    r.flushdb()
+    pipe = r.pipeline(transaction=False)
+    for i in range(count):
+        pipe.hset(f"doc:brasov-cursuri:{i}", mapping={
+            'content': f"Curs {i}: integrale definite, serii Taylor si alte subiecte. " * 4,
+        })
+        if i % 1000 == 999:
+            pipe.execute()
+    pipe.execute()
+
+
+def fetch_content(r, keys):
+    pipe = r.pipeline()
+    for key in keys:
+        pipe.hget(key, 'content')
+    return pipe.execute()
+
+
+def slice_with_scan(r, start, stop):
+    keys_with_indices = []
+    for key in r.scan_iter(match=KEY_PATTERN):
+        index = extract_numeric_index(key)
+        if index != -1:
+            keys_with_indices.append((index, key))
+    keys_with_indices.sort(key=lambda item: item[0])
+    keys = [item[1] for item in keys_with_indices][start:stop]
+    return fetch_content(r, keys)
+
+
+def slice_with_index(r, start, stop):
+    return fetch_content(r, get_document_keys_slice(r, start, stop))
+
+
+def measure(fn, r, count, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = random.randrange(0, max(1, count - PAGE_SIZE))
+        began = time.perf_counter()
+        fn(r, start, start + PAGE_SIZE)
+        timings.append((time.perf_counter() - began) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=6379)
+    parser.add_argument('--db', type=int, default=15)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    r = redis.Redis(host=args.host, port=args.port, db=args.db, decode_responses=True)
+
+    print(f"{'docs':>8} | {'scan+sort p50':>14} | {'scan+sort p95':>14} | {'index p50':>10} | {'index p95':>10}")
+    for count in args.sizes:
+        populate(r, count)
+        rebuild_document_index(r, KEY_PATTERN)
+        scan_p50, scan_p95 = measure(slice_with_scan, r, count, args.repeats)
+        index_p50, index_p95 = measure(slice_with_index, r, count, args.repeats)
+        print(f"{count:>8} | {scan_p50:>11.2f} ms | {scan_p95:>11.2f} ms | {index_p50:>7.2f} ms | {index_p95:>7.2f} ms")
+
+    r.flushdb()
+
+
+if __name__ == '__main__':
+    main()
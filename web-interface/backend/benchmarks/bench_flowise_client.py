@@ -0,0 +1,94 @@
+"""Benchmark: one-off requests.post calls vs. the pooled FlowiseClient against a local stub.
+
+The stub answers like a Flowise prediction endpoint after `--delay` ms and,
+with `--fail-rate`, returns 503 for that fraction of requests so the retry
+and circuit breaker paths can be watched on the printed /metrics output.
+
+    python benchmarks/bench_flowise_client.py --requests 200 --fail-rate 0.1
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import flowise_client  # noqa: E402
+from flowise_client import FlowiseClient, FlowiseEndpoint, FlowiseError  # noqa: E402
+from metrics import render_metrics  # noqa: E402
+
+
+def start_stub(delay_ms, fail_rate):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1' # Keep-alive, like the real upstream
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(delay_ms / 1000)
+            failed = random.random() < fail_rate
+            body = json.dumps({'text': 'Integrale definite Taylor'}).encode('utf-8')
+            self.send_response(503 if failed else 200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(fn, count):
+    timings = []
+    errors = 0
+    for _ in range(count):
+        began = time.perf_counter()
+        try:
+            fn()
+        except (FlowiseError, requests.RequestException):
+            errors += 1
+        timings.append((time.perf_counter() - began) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1], errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=5, help="stub latency in ms")
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    # Short backoff so the benchmark measures connection handling, not sleeping
+    flowise_client.BACKOFF_BASE = 0.01
+    server = start_stub(args.delay, args.fail_rate)
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/prediction/stub"
+    client = FlowiseClient({'stub': FlowiseEndpoint(url, timeout=(2, 5), retries=2, retry_read_timeouts=True)})
+
+    def one_off():
+        response = requests.post(url, json={'question': 'x'}, timeout=5)
+        if response.status_code != 200:
+            raise requests.HTTPError(response.status_code)
+
+    print(f"{'client':>10} | {'p50':>9} | {'p95':>9} | {'errors':>6}")
+    for label, fn in (('one-off', one_off), ('pooled', lambda: client.post_json('stub', {'question': 'x'}))):
+        p50, p95, errors = measure(fn, args.requests)
+        print(f"{label:>10} | {p50:>6.2f} ms | {p95:>6.2f} ms | {errors:>6}")
+
+    print()
+    print('\n'.join(line for line in render_metrics().splitlines() if line.startswith('flowise_') and '_bucket' not in line))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark: ranking quality and latency of vector, BM25 and fused (RRF) search on a fixture corpus.
+
+'fused' is plain reciprocal rank fusion; 'weighted' is what the backend
+uses, with the keyword ranking weighted up for code-like queries.
+
+Uses the synthetic corpus of bench_vector_index.py (course codes, topic
+terms with diacritics, random vocabulary) with the local hashing embedder
+standing in for the remote vector search. Three kinds of queries, each with
+one relevant document:
+
+  code        the document's course code ('MI00042')
+  unaccented  a 4-word excerpt typed without diacritics
+  excerpt     an 8-word excerpt as written
+
+    python benchmarks/bench_keyword_search.py --docs 20000 --queries 300
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_vector_index import excerpt, make_corpus  # noqa: E402
+from text_index import BM25Index, fold_text, keyword_weight, reciprocal_rank_fusion  # noqa: E402
+from vector_index import LocalVectorIndex, create_embedder  # noqa: E402
+
+DEPTH = 10
+
+
+def make_queries(documents, count, rng):
+    queries = []
+    for i, (key, text) in enumerate(rng.sample(documents, count)):
+        kind = ('code', 'unaccented', 'excerpt')[i % 3]
+        if kind == 'code':
+            query = text.split('.')[0].split()[-1]
+        elif kind == 'unaccented':
+            query = fold_text(excerpt(text, rng, words=4))
+        else:
+            query = excerpt(text, rng)
+        queries.append((kind, key, query))
+    return queries
+
+
+def evaluate(search, queries):
+    """Returns {kind: (MRR@DEPTH, recall@DEPTH)} and the latency p50/p95 in ms."""
+    timings = []
+    reciprocal_ranks = {}
+    for kind, expected, query in queries:
+        began = time.perf_counter()
+        keys = search(query)
+        timings.append((time.perf_counter() - began) * 1000)
+        rank = keys.index(expected) + 1 if expected in keys else None
+        reciprocal_ranks.setdefault(kind, []).append(1 / rank if rank else 0)
+    timings.sort()
+    quality = {
+        kind: (statistics.mean(values), sum(1 for value in values if value) / len(values))
+        for kind, values in reciprocal_ranks.items()
+    }
+    return quality, statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=300)
+    args = parser.parse_args()
+
+    documents = make_corpus(args.docs)
+    queries = make_queries(documents, args.queries, random.Random(5))
+
+    with tempfile.TemporaryDirectory() as directory:
+        vectors = LocalVectorIndex(directory, create_embedder('hashing'))
+        for start in range(0, len(documents), 500):
+            vectors.add_many(documents[start:start + 500])
+
+        keywords = BM25Index()
+        began = time.perf_counter()
+        for key, text in documents:
+            keywords.add(key, text)
+        print(f"Indexed {len(keywords)} documents for BM25 in {time.perf_counter() - began:.2f}s")
+
+        def vector_search(query):
+            return [key for key, _ in vectors.search(query, DEPTH)]
+
+        def keyword_search(query):
+            return [key for key, _ in keywords.search(query, DEPTH)]
+
+        def fused_search(query):
+            return [key for key, _ in reciprocal_rank_fusion([vector_search(query), keyword_search(query)], DEPTH)]
+
+        def weighted_search(query):
+            fused = reciprocal_rank_fusion([vector_search(query), keyword_search(query)], DEPTH,
+                                           weights=[1.0, keyword_weight(query)])
+            return [key for key, _ in fused]
+
+        kinds = ('code', 'unaccented', 'excerpt')
+        header = ' | '.join(f"{kind + ' MRR/R@10':>22}" for kind in kinds)
+        print(f"{'search':>8} | {header} | {'p50':>9} | {'p95':>9}")
+        for label, search in (('vector', vector_search), ('bm25', keyword_search), ('fused', fused_search),
+                              ('weighted', weighted_search)):
+            quality, p50, p95 = evaluate(search, queries)
+            values = ' | '.join(f"{quality[kind][0]:>13.3f} / {quality[kind][1]:.3f}" for kind in kinds)
+            print(f"{label:>8} | {values} | {p50:>6.2f} ms | {p95:>6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Benchmark: /api/materials/search end to end, per-match HMGET vs. one pipelined hydration.
+
+Starts a stub vector search server on localhost that returns `--limit`
+matches (after `--vector-delay` ms), populates a scratch Redis database with
+synthetic course documents and times the search endpoint through Flask's
+test client, against the old per-match loop, with a field projection and
+with the result cache warm.
+
+    python benchmarks/bench_search.py --host localhost --port 6379 --db 15
+
+WARNING: the target database is flushed before every run.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import redis
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app as backend  # noqa: E402
+import redis_pool  # noqa: E402
+
+DOC_COUNT = 5000
+
+
+def start_vector_stub(limit, delay_ms):
+    """Serves `limit` random document keys as matches for every query."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(delay_ms / 1000)
+            matches = [
+                {'metadata': {'key': f"doc:brasov-cursuri:{i}"}, 'score': random.random()}
+                for i in random.sample(range(DOC_COUNT), limit)
+            ]
+            body = json.dumps({'matches': matches}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def populate(r):
+    r.flushdb()
+    pipe = r.pipeline(transaction=False)
+    for i in range(DOC_COUNT):
+        pipe.hset(f"doc:brasov-cursuri:{i}", mapping={
+            'content': f"Curs {i}: integrale definite, serii Taylor si alte subiecte. " * 40,
+            'name': f"Curs {i}",
+            'metadata': json.dumps({'title': f"Curs {i}"}),
+        })
+        if i % 1000 == 999:
+            pipe.execute()
+    pipe.execute()
+
+
+def search_per_match(query, limit):
+    """The previous implementation: one HMGET round trip per match."""
+    search_results = backend.search_vector_db(query, limit)
+    redis_client = backend.get_redis_connection()
+    materials = []
+    for match in search_results.get('matches', []):
+        doc_key = match.get('metadata', {}).get('key')
+        content, name, metadata_json, pdf_ref = redis_client.hmget(doc_key, 'content', 'name', 'metadata', 'pdf_ref')
+        if content is None:
+            continue
+        metadata = json.loads(metadata_json) if metadata_json else {}
+        materials.append({
+            'text': content,
+            'title': metadata.get('title', ''),
+            'timestamp': int(doc_key.split(':')[-1]),
+            'key': doc_key,
+            'name': name or '',
+            'has_pdf': bool(pdf_ref) or metadata.get('has_pdf', False),
+            'score': match.get('score', 0)
+        })
+    return materials
+
+
+def measure(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        began = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - began) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=6379)
+    parser.add_argument('--db', type=int, default=15)
+    parser.add_argument('--limits', type=int, nargs='+', default=[5, 20, 50])
+    parser.add_argument('--vector-delay', type=float, default=0, help="stub vector server latency in ms")
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    redis_pool.configure(host=args.host, port=args.port, db=args.db)
+    r = redis.Redis(host=args.host, port=args.port, db=args.db, decode_responses=True)
+    populate(r)
+
+    # Keep the benchmark output readable
+    backend.print = lambda *a, **k: None
+    client = backend.app.test_client()
+
+    def endpoint(limit, no_cache=True, **extra):
+        def run():
+            response = client.post('/api/materials/search', json={
+                'query': 'integrale', 'limit': limit, 'no_cache': no_cache, **extra
+            })
+            assert response.status_code == 200, response.get_data(as_text=True)
+        return run
+
+    print(f"{'limit':>6} | {'per-match p50':>14} | {'pipelined p50':>14} | {'projected p50':>14} | "
+          f"{'pipelined p95':>14} | {'cached p50':>14}")
+    for limit in args.limits:
+        server = start_vector_stub(limit, args.vector_delay)
+        backend.flowise.endpoints['vector_search'].url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+        old_p50, _ = measure(lambda: search_per_match('integrale', limit), args.repeats)
+        new_p50, new_p95 = measure(endpoint(limit), args.repeats)
+        projected_p50, _ = measure(endpoint(limit, fields='key,name,score'), args.repeats)
+        cached_p50, _ = measure(endpoint(limit, no_cache=False), args.repeats)
+        print(f"{limit:>6} | {old_p50:>11.2f} ms | {new_p50:>11.2f} ms | {projected_p50:>11.2f} ms | "
+              f"{new_p95:>11.2f} ms | {cached_p50:>11.2f} ms")
+        server.shutdown()
+
+    r.flushdb()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark: local vector index recall@k and query latency, in memory and mmap-loaded.
+
+Builds a synthetic course corpus (topic terms with Romanian diacritics plus
+a large random vocabulary), indexes it with the configured embedder and queries it
+with short excerpts of random documents. A query counts as a hit at k when
+the document it was cut from is among the top k results.
+
+    python benchmarks/bench_vector_index.py --docs 20000 --queries 500
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from vector_index import LocalVectorIndex, create_embedder  # noqa: E402
+
+TOPICS = {
+    'analiza': "integrală definită derivată limită șir convergență serie Taylor funcție continuă teorema Rolle",
+    'algebra': "matrice determinant spațiu vectorial valoare proprie bază dimensiune transformare liniară rang",
+    'programare': "funcție recursivă pointer listă înlănțuită arbore binar complexitate algoritm sortare stivă",
+    'grafuri': "graf orientat drum minim Dijkstra arbore parțial Kruskal conexitate ciclu hamiltonian flux",
+    'probabilitati': "variabilă aleatoare distribuție normală medie dispersie eveniment independent Bayes",
+    'baze-de-date': "tabel cheie primară interogare SQL normalizare index tranzacție relație join",
+}
+FILLER = "cursul seminar exercițiu exemplu definiție observație rezolvare problemă capitol".split()
+SYLLABLES = "ba be ca ce de di fa ga la le ma mi na ne pa pe ra re sa se șa ta te ți va vi za".split()
+
+
+def make_corpus(count, seed=7, vocabulary_size=20000):
+    rng = random.Random(seed)
+    topics = list(TOPICS.values())
+    vocabulary = [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(vocabulary_size)]
+    documents = []
+    for i in range(count):
+        words = rng.sample(topics[i % len(topics)].split(), 6) + rng.sample(FILLER, 4)
+        words += rng.choices(vocabulary, k=50)
+        rng.shuffle(words)
+        documents.append((f"doc:brasov-cursuri:{i}", f"Curs MI{i:05d}. " + ' '.join(words)))
+    return documents
+
+
+def excerpt(text, rng, words=8):
+    tokens = text.split()
+    start = rng.randrange(0, max(1, len(tokens) - words))
+    return ' '.join(tokens[start:start + words])
+
+
+def run_queries(index, queries, ks):
+    timings = []
+    hits = {k: 0 for k in ks}
+    for expected, query in queries:
+        began = time.perf_counter()
+        results = index.search(query, max(ks))
+        timings.append((time.perf_counter() - began) * 1000)
+        keys = [key for key, _ in results]
+        for k in ks:
+            hits[k] += expected in keys[:k]
+    timings.sort()
+    recall = {k: hits[k] / len(queries) for k in ks}
+    return recall, statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--embedder', default='hashing')
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 5, 10])
+    args = parser.parse_args()
+
+    documents = make_corpus(args.docs)
+    rng = random.Random(11)
+    queries = [(key, excerpt(text, rng)) for key, text in rng.sample(documents, args.queries)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = LocalVectorIndex(directory, create_embedder(args.embedder))
+        began = time.perf_counter()
+        for start in range(0, len(documents), 500):
+            index.add_many(documents[start:start + 500])
+        print(f"Embedded {len(index)} documents with {index.embedder.name} in {time.perf_counter() - began:.2f}s")
+        results = [('in-memory', run_queries(index, queries, args.k))]
+
+        began = time.perf_counter()
+        index.save()
+        print(f"Saved in {time.perf_counter() - began:.2f}s")
+
+        loaded = LocalVectorIndex(directory, create_embedder(args.embedder))
+        began = time.perf_counter()
+        loaded.load()
+        print(f"Loaded (mmap) in {(time.perf_counter() - began) * 1000:.1f} ms")
+
+        # A handful of incremental updates on top of the mapped base
+        for key, text in documents[:50]:
+            loaded.add(key, text + " actualizat")
+
+        results.append(('mmap + delta', run_queries(loaded, queries, args.k)))
+
+    header = ' | '.join(f"{f'recall@{k}':>9}" for k in args.k)
+    print(f"{'index':>14} | {header} | {'p50':>9} | {'p95':>9}")
+    for label, (recall, p50, p95) in results:
+        values = ' | '.join(f"{recall[k]:>9.3f}" for k in args.k)
+        print(f"{label:>14} | {values} | {p50:>6.2f} ms | {p95:>6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
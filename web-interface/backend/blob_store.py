@@ -0,0 +1,192 @@
+"""Content-addressed blob storage for large binary payloads (PDFs).
+
+Blobs are identified by the SHA-256 of their bytes, so storing the same file
+twice is a no-op. Two backends share the same interface:
+
+- FileSystemBlobStore keeps each blob in `<root>/<sha[:2]>/<sha[2:4]>/<sha>`
+  and serves reads from a read-only mmap, so a byte range never copies the
+  rest of the file into worker memory.
+- RedisBlobStore keeps each blob in a Redis string `pdf:<sha>` and serves
+  ranges with GETRANGE.
+
+Blobs are not reference counted: unreferenced ones are reclaimed by
+pdf_store.collect_garbage (the gc-pdf-blobs command).
+"""
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+import redis
+
+from keyspace import iter_keys
+
+_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+class BlobHandle:
+    """An open blob: `size`, `modified` (Unix time or None) and ranged reads."""
+
+    def __init__(self, size, modified, read_range, close=None):
+        self.size = size
+        self.modified = modified
+        self._read_range = read_range
+        self._close = close
+
+    def read(self, start, end):
+        """Returns bytes [start, end) of the blob."""
+        if end <= start:
+            return b''
+        return self._read_range(start, end)
+
+    def close(self):
+        if self._close:
+            self._close()
+            self._close = None
+
+
+class BlobStore:
+    """Interface shared by the blob store backends."""
+
+    def put(self, data):
+        """Stores `data` (if not already present) and returns its SHA-256 hex digest."""
+        raise NotImplementedError
+
+    def open(self, sha):
+        """Returns a BlobHandle for `sha`, or None if the blob does not exist."""
+        raise NotImplementedError
+
+    def exists(self, sha):
+        raise NotImplementedError
+
+    def delete(self, sha):
+        raise NotImplementedError
+
+    def iter_blobs(self):
+        """Yields (sha, size, age) for every stored blob; age is seconds since it was last written or read, or None."""
+        raise NotImplementedError
+
+    @staticmethod
+    def digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+
+class FileSystemBlobStore(BlobStore):
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, sha):
+        return self.root / sha[:2] / sha[2:4] / sha
+
+    def put(self, data):
+        sha = self.digest(data)
+        path = self._path(sha)
+        if path.exists():
+            return sha
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file and rename so readers never see partial blobs
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return sha
+
+    def open(self, sha):
+        path = self._path(sha)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            # mmap cannot map empty files
+            f.close()
+            return BlobHandle(0, int(stat.st_mtime), lambda start, end: b'')
+
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        def close():
+            mapped.close()
+            f.close()
+
+        return BlobHandle(
+            size=stat.st_size,
+            modified=int(stat.st_mtime),
+            read_range=lambda start, end: mapped[start:end],
+            close=close
+        )
+
+    def exists(self, sha):
+        return self._path(sha).exists()
+
+    def delete(self, sha):
+        try:
+            self._path(sha).unlink()
+        except FileNotFoundError:
+            pass
+
+    def iter_blobs(self):
+        now = time.time()
+        for path in self.root.glob('*/*/*'):
+            if not _SHA256.match(path.name):
+                continue # Temporary files of writes in progress
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path.name, stat.st_size, now - max(stat.st_mtime, stat.st_atime)
+
+
+class RedisBlobStore(BlobStore):
+    KEY_PREFIX = "pdf:"
+
+    def __init__(self, get_client):
+        # Called per operation so the store works with the shared binary connection pool
+        self.get_client = get_client
+
+    def put(self, data):
+        sha = self.digest(data)
+        self.get_client().set(self.KEY_PREFIX + sha, data, nx=True)
+        return sha
+
+    def open(self, sha):
+        r = self.get_client()
+        key = self.KEY_PREFIX + sha
+        size = r.strlen(key)
+        if not size:
+            return None
+        # GETRANGE's end offset is inclusive
+        return BlobHandle(size, None, lambda start, end: r.getrange(key, start, end - 1))
+
+    def exists(self, sha):
+        return bool(self.get_client().exists(self.KEY_PREFIX + sha))
+
+    def delete(self, sha):
+        self.get_client().delete(self.KEY_PREFIX + sha)
+
+    def iter_blobs(self):
+        r = self.get_client()
+        for key in iter_keys(r, f"{self.KEY_PREFIX}*"):
+            sha = key.decode('utf-8') if isinstance(key, bytes) else key
+            sha = sha[len(self.KEY_PREFIX):]
+            if not _SHA256.match(sha):
+                continue
+            try:
+                age = r.object('idletime', key)
+            except redis.RedisError:
+                age = None # Not available under an LFU maxmemory-policy
+            yield sha, r.strlen(key), age
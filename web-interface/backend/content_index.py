@@ -0,0 +1,157 @@
+"""Reverse index from document content to document key.
+
+CONTENT_INDEX_KEY maps the SHA-256 of a document's `content` field to its key
+(and CONTENT_KEYS_KEY maps the key back to the hash so deletes can clean up),
+which makes "which key holds this text?" a single HGET. Whenever a document is
+indexed a message is published on CONTENT_EVENTS_CHANNEL so callers waiting
+for a freshly upserted document can block on pub/sub instead of polling.
+"""
+import hashlib
+import time
+
+CONTENT_INDEX_KEY = "idx:brasov-cursuri:content-sha256"
+CONTENT_KEYS_KEY = "idx:brasov-cursuri:key-sha256"
+CONTENT_EVENTS_CHANNEL = "events:brasov-cursuri:content-indexed"
+REBUILD_BATCH_SIZE = 500
+
+
+def _as_str(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def content_sha256(content):
+    """Returns the hex SHA-256 of a document's text (str or UTF-8 bytes)."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+def index_content(r, key, content=None):
+    """Records the content hash of `key` (reading its content if not given) and announces it."""
+    key = _as_str(key)
+    if content is None:
+        content = r.hget(key, 'content')
+        if content is None:
+            return None
+    sha = content_sha256(content)
+
+    previous = _as_str(r.hget(CONTENT_KEYS_KEY, key))
+    pipe = r.pipeline(transaction=False)
+    if previous and previous != sha:
+        pipe.hdel(CONTENT_INDEX_KEY, previous)
+    pipe.hset(CONTENT_INDEX_KEY, sha, key)
+    pipe.hset(CONTENT_KEYS_KEY, key, sha)
+    pipe.publish(CONTENT_EVENTS_CHANNEL, f"{sha} {key}")
+    pipe.execute()
+    return sha
+
+
+def unindex_content(r, key):
+    """Removes `key` from the content index."""
+    key = _as_str(key)
+    sha = _as_str(r.hget(CONTENT_KEYS_KEY, key))
+    if not sha:
+        return
+    pipe = r.pipeline(transaction=False)
+    pipe.hdel(CONTENT_KEYS_KEY, key)
+    # Only drop the hash entry if it still points at this key (duplicates keep the latest)
+    if _as_str(r.hget(CONTENT_INDEX_KEY, sha)) == key:
+        pipe.hdel(CONTENT_INDEX_KEY, sha)
+    pipe.execute()
+
+
+def find_key_by_content(r, content):
+    """Returns the key of the document whose content is exactly `content`, or None."""
+    return _as_str(r.hget(CONTENT_INDEX_KEY, content_sha256(content)))
+
+
+def wait_for_content(r, content, timeout=5.0):
+    """Like find_key_by_content, but waits up to `timeout` seconds for the document to be indexed."""
+    sha = content_sha256(content)
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    try:
+        # Subscribe before checking so an event landing in between is not missed
+        pubsub.subscribe(CONTENT_EVENTS_CHANNEL)
+        key = r.hget(CONTENT_INDEX_KEY, sha)
+        if key is not None:
+            return _as_str(key)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            message = pubsub.get_message(timeout=remaining)
+            if message is None:
+                continue
+            event_sha, _, event_key = _as_str(message['data']).partition(' ')
+            if event_sha == sha:
+                return event_key
+    finally:
+        pubsub.close()
+
+
+def iter_changed_documents(r, keys, known_shas, batch_size=REBUILD_BATCH_SIZE):
+    """Yields (key, content, sha) for the `keys` whose content hash differs from `known_shas[key]`.
+
+    Hashes come from CONTENT_KEYS_KEY, so unchanged documents are never read;
+    documents missing from the content index are always read.
+    """
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        shas = r.hmget(CONTENT_KEYS_KEY, batch)
+        stale = [key for key, sha in zip(batch, shas) if sha is None or known_shas.get(key) != _as_str(sha)]
+        if not stale:
+            continue
+        pipe = r.pipeline(transaction=False)
+        for key in stale:
+            pipe.hget(key, 'content')
+        for key, content in zip(stale, pipe.execute()):
+            if content is not None:
+                yield key, content, content_sha256(content)
+
+
+def rebuild_content_index(r, keys, batch_size=REBUILD_BATCH_SIZE):
+    """Rebuilds both content index hashes from `keys` and returns the number indexed.
+
+    The new hashes are built under temporary keys and swapped in with RENAME.
+    """
+    tmp_index, tmp_keys = f"{CONTENT_INDEX_KEY}:rebuild", f"{CONTENT_KEYS_KEY}:rebuild"
+    r.delete(tmp_index, tmp_keys)
+    indexed = 0
+    batch = []
+
+    def flush(batch):
+        pipe = r.pipeline(transaction=False)
+        for key in batch:
+            pipe.hget(key, 'content')
+        contents = pipe.execute()
+
+        pipe = r.pipeline(transaction=False)
+        count = 0
+        for key, content in zip(batch, contents):
+            if content is None:
+                continue
+            sha = content_sha256(content)
+            pipe.hset(tmp_index, sha, _as_str(key))
+            pipe.hset(tmp_keys, _as_str(key), sha)
+            count += 1
+        pipe.execute()
+        return count
+
+    for key in keys:
+        batch.append(key)
+        if len(batch) >= batch_size:
+            indexed += flush(batch)
+            batch = []
+    if batch:
+        indexed += flush(batch)
+
+    if indexed:
+        pipe = r.pipeline()
+        pipe.rename(tmp_index, CONTENT_INDEX_KEY)
+        pipe.rename(tmp_keys, CONTENT_KEYS_KEY)
+        pipe.execute()
+    else:
+        r.delete(CONTENT_INDEX_KEY, CONTENT_KEYS_KEY)
+    return indexed
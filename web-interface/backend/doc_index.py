@@ -0,0 +1,246 @@
+"""Sorted-set index over the course document hashes.
+
+Every document key (e.g. 'doc:brasov-cursuri:10') is stored in DOC_INDEX_KEY
+with its numeric suffix as the score, so a slice of the corpus in numeric
+order is a single ZRANGE instead of a full SCAN + sort.
+"""
+import re
+import time
+import redis
+
+from keyspace import iter_keys
+
+DOC_INDEX_KEY = "idx:brasov-cursuri"
+LISTENER_LEASE_KEY = "lock:idx:brasov-cursuri:listener"
+LISTENER_ACTIVE_KEY = "idx:brasov-cursuri:listener-active"
+REBUILD_BATCH_SIZE = 1000
+
+_NUMERIC_SUFFIX = re.compile(r':(\d+)$')
+
+
+def _as_str(key):
+    return key.decode('utf-8') if isinstance(key, bytes) else key
+
+
+def extract_numeric_index(key_name):
+    """Extracts the numeric index from the key name (e.g., 'doc:brasov-cursuri:10' -> 10)."""
+    match = _NUMERIC_SUFFIX.search(_as_str(key_name))
+    if match:
+        return int(match.group(1))
+    return -1 # Return -1 or raise error if format is unexpected
+
+
+def index_document(r, key):
+    """Adds a document key to the index. Returns False if the key has no numeric suffix."""
+    index = extract_numeric_index(key)
+    if index == -1:
+        return False
+    r.zadd(DOC_INDEX_KEY, {_as_str(key): index})
+    return True
+
+
+def unindex_document(r, key):
+    """Removes a document key from the index."""
+    r.zrem(DOC_INDEX_KEY, _as_str(key))
+
+
+def rebuild_document_index(r, pattern, batch_size=REBUILD_BATCH_SIZE):
+    """Rebuilds the index from a full SCAN of the keyspace and returns the number of indexed keys.
+
+    The new index is written to a temporary key and swapped in with RENAME, so
+    readers never see a half-built index.
+    """
+    tmp_key = f"{DOC_INDEX_KEY}:rebuild"
+    r.delete(tmp_key)
+
+    indexed = 0
+    batch = {}
+    for key in iter_keys(r, pattern, count=batch_size):
+        index = extract_numeric_index(key)
+        if index == -1:
+            continue
+        batch[_as_str(key)] = index
+        if len(batch) >= batch_size:
+            r.zadd(tmp_key, batch)
+            indexed += len(batch)
+            batch = {}
+    if batch:
+        r.zadd(tmp_key, batch)
+        indexed += len(batch)
+
+    if indexed:
+        r.rename(tmp_key, DOC_INDEX_KEY)
+    else:
+        r.delete(DOC_INDEX_KEY)
+    return indexed
+
+
+def reconcile_document_index(r, pattern, batch_size=REBUILD_BATCH_SIZE):
+    """Brings the index in line with a full SCAN of the keyspace and returns (added, removed) keys.
+
+    Unlike rebuild_document_index the index is patched in place, so callers
+    learn which documents appeared or disappeared. Used when keyspace events
+    are unavailable or may have been missed; a document rewritten under the
+    same key is not detected.
+    """
+    indexed = {_as_str(key) for key in r.zrange(DOC_INDEX_KEY, 0, -1)}
+    seen = set()
+    added = []
+    batch = {}
+    for key in iter_keys(r, pattern, count=batch_size):
+        key = _as_str(key)
+        index = extract_numeric_index(key)
+        if index == -1 or key in seen:
+            continue
+        seen.add(key)
+        if key not in indexed:
+            batch[key] = index
+            added.append(key)
+            if len(batch) >= batch_size:
+                r.zadd(DOC_INDEX_KEY, batch)
+                batch = {}
+    if batch:
+        r.zadd(DOC_INDEX_KEY, batch)
+
+    removed = sorted(indexed - seen)
+    for start in range(0, len(removed), batch_size):
+        r.zrem(DOC_INDEX_KEY, *removed[start:start + batch_size])
+    return added, removed
+
+
+def ensure_document_index(r, pattern):
+    """Builds the index on first use if it does not exist yet."""
+    if not r.exists(DOC_INDEX_KEY):
+        print(f"Document index '{DOC_INDEX_KEY}' missing, rebuilding from keyspace...")
+        count = rebuild_document_index(r, pattern)
+        print(f"Indexed {count} document keys.")
+
+
+def get_document_keys_slice(r, start, stop):
+    """Returns the document keys at positions [start:stop) in numeric order."""
+    if stop <= start:
+        return []
+    return [_as_str(key) for key in r.zrange(DOC_INDEX_KEY, start, stop - 1)]
+
+
+def get_document_keys_page(r, cursor=None, limit=50):
+    """Returns (keys, next_cursor) for the documents after `cursor` in numeric order.
+
+    The cursor is the numeric index of the last key on the previous page, so
+    pages stay stable when documents are added or deleted in between.
+    next_cursor is None on the last page.
+    """
+    min_score = '-inf' if cursor is None else f'({int(cursor)}'
+    entries = r.zrangebyscore(DOC_INDEX_KEY, min_score, '+inf', start=0, num=limit + 1, withscores=True)
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    keys = [_as_str(key) for key, _ in entries]
+    next_cursor = int(entries[-1][1]) if has_more else None
+    return keys, next_cursor
+
+
+def iter_document_keys(r, batch_size=REBUILD_BATCH_SIZE):
+    """Yields every indexed document key in numeric order, one page at a time.
+
+    Safe to use while deleting the keys being iterated.
+    """
+    cursor = None
+    while True:
+        keys, cursor = get_document_keys_page(r, cursor, batch_size)
+        yield from keys
+        if cursor is None:
+            return
+
+
+def count_documents(r):
+    """Returns the number of indexed documents."""
+    return r.zcard(DOC_INDEX_KEY)
+
+
+# --- Keyspace notifications ---
+# Documents are written to Redis by the Flowise upsert flow, not by this app,
+# so the index is kept in sync by listening for keyspace events on the
+# document keys.
+
+_ADD_EVENTS = {'hset', 'rename_to'}
+_REMOVE_EVENTS = {'del', 'expired', 'evicted', 'rename_from'}
+
+
+def enable_keyspace_events(r, flags='Kghxe'):
+    """Ensures the keyspace notification flags we rely on are enabled, keeping existing ones."""
+    try:
+        current = r.config_get('notify-keyspace-events').get('notify-keyspace-events', '')
+        current = _as_str(current)
+        missing = ''.join(flag for flag in flags if flag not in current)
+        if missing:
+            r.config_set('notify-keyspace-events', current + missing)
+        return True
+    except redis.RedisError as e:
+        # Managed Redis instances often disable CONFIG; the index is then kept
+        # current by periodic reconcile_document_index passes instead.
+        print(f"Warning: Could not enable keyspace notifications: {e}")
+        return False
+
+
+# One worker per deployment holds the listener lease and maintains the shared
+# Redis indexes; the others only refresh their in-process indexes.
+_RENEW_OR_ACQUIRE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return 1
+end
+return 0
+"""
+
+
+def acquire_listener_lease(r, owner, ttl):
+    """Takes or renews the listener lease for `ttl` seconds. Returns True if `owner` holds it."""
+    return bool(r.eval(_RENEW_OR_ACQUIRE, 1, LISTENER_LEASE_KEY, owner, int(ttl)))
+
+
+def mark_listener_active(r, ttl):
+    """Announces for `ttl` seconds that keyspace events are being applied somewhere in the deployment."""
+    r.set(LISTENER_ACTIVE_KEY, 1, ex=int(ttl))
+
+
+def is_listener_active(r):
+    """True if some worker is applying keyspace events, i.e. the content index is kept current."""
+    return bool(r.exists(LISTENER_ACTIVE_KEY))
+
+
+def start_index_listener(r, pattern, db=0, on_add=None, on_remove=None):
+    """Starts a background thread that keeps the index in sync with keyspace events.
+
+    `r` must be a client with decode_responses=True. Optional `on_add` and
+    `on_remove` callbacks receive (client, key) after the index is updated.
+    Returns the worker thread, or None if notifications could not be enabled.
+    """
+    if not enable_keyspace_events(r):
+        return None
+
+    prefix = f"__keyspace@{db}__:"
+
+    def handle_event(message):
+        key = _as_str(message['channel'])[len(prefix):]
+        event = _as_str(message['data'])
+        try:
+            if event in _ADD_EVENTS:
+                if index_document(r, key) and on_add:
+                    on_add(r, key)
+            elif event in _REMOVE_EVENTS:
+                unindex_document(r, key)
+                if on_remove:
+                    on_remove(r, key)
+        except Exception as e:
+            print(f"Error updating document index for {key} ({event}): {e}")
+
+    def handle_error(e, pubsub, thread):
+        # The pubsub connection reconnects and resubscribes on the next read.
+        print(f"Document index listener error: {e}")
+        time.sleep(1)
+
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    pubsub.psubscribe(**{f"{prefix}{pattern}": handle_event})
+    return pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=handle_error)
@@ -0,0 +1,223 @@
+"""Shared HTTP client for the Flowise prediction and vector store APIs.
+
+All calls go through one requests.Session per process, so connections (and
+their TLS sessions) to the Flowise host are kept alive and reused by every
+request handler thread. Each endpoint has its own timeouts, retry budget and
+circuit breaker: after FAILURE_THRESHOLD consecutive failures the endpoint is
+short-circuited for RESET_TIMEOUT seconds and then probed with one trial
+request, so a hung or failing upstream costs callers a fast error instead of
+a pinned worker. Latencies, retries and breaker state are exported on
+/metrics.
+
+The client is synchronous on purpose: the backend runs on sync gunicorn
+workers, where connection reuse and bounded timeouts give the latency win an
+async client would, without an event loop.
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import Counter, Histogram, register_collector
+
+POOL_SIZE = 20 # Keep-alive connections per host, per worker process
+FAILURE_THRESHOLD = 5 # Consecutive failures before an endpoint's circuit opens
+RESET_TIMEOUT = 30 # Seconds an open circuit waits before letting a trial request through
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+RETRY_STATUSES = {429, 502, 503, 504}
+# 502/504 can come from a gateway after the upstream already acted on the
+# request, so calls with side effects only retry statuses that mean "not done"
+SAFE_RETRY_STATUSES = {429, 503}
+
+FLOWISE_REQUEST_SECONDS = Histogram(
+    'flowise_request_seconds',
+    'Flowise request latency (until response headers for streamed calls).',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+FLOWISE_RETRIES = Counter('flowise_retries_total', 'Flowise requests retried after a transient failure.')
+FLOWISE_SHORT_CIRCUITED = Counter('flowise_short_circuited_total', 'Flowise calls rejected by an open circuit breaker.')
+
+
+class FlowiseError(Exception):
+    """Flowise answered with an error status, or could not be reached."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(FlowiseError):
+    """The endpoint's circuit breaker is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker: closed -> open -> half-open (one trial) -> closed."""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """Returns False if the call is rejected, 'trial' for the half-open probe, True otherwise."""
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return 'trial'
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                # A failed trial re-opens the circuit for another full timeout
+                self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Lets another trial through if one ended without recording an outcome."""
+        with self.lock:
+            self.trial_in_flight = False
+
+
+class FlowiseEndpoint:
+    """One Flowise URL with its (connect, read) timeouts and retry policy.
+
+    Read timeouts are only retried when `retry_read_timeouts` is set, since
+    the upstream may already have acted on the request. Endpoints that are
+    not `idempotent` (e.g. a vector upsert) never retry read timeouts and
+    only retry SAFE_RETRY_STATUSES.
+    """
+
+    def __init__(self, url, timeout=(5, 30), retries=2, retry_read_timeouts=False, idempotent=True):
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_read_timeouts = retry_read_timeouts and idempotent
+        self.retry_statuses = RETRY_STATUSES if idempotent else SAFE_RETRY_STATUSES
+        self.breaker = CircuitBreaker()
+
+
+class FlowiseClient:
+
+    def __init__(self, endpoints, pool_size=POOL_SIZE):
+        self.endpoints = endpoints
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(endpoints), pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+        register_collector(self._collect_breaker_states)
+
+    def post(self, name, payload, stream=False):
+        """POSTs `payload` as JSON to endpoint `name` and returns the Response.
+
+        Connection errors, configured read timeouts and the endpoint's retry
+        statuses (429/502/503/504, or 429/503 if not idempotent) are retried
+        with jittered exponential backoff. Raises CircuitOpenError if the
+        endpoint is short-circuited and FlowiseError once retries are
+        exhausted or on any other request failure; other error statuses are
+        returned to the caller.
+        """
+        endpoint = self.endpoints[name]
+        allowed = endpoint.breaker.allow()
+        if not allowed:
+            FLOWISE_SHORT_CIRCUITED.inc(endpoint=name)
+            raise CircuitOpenError(f"Flowise endpoint '{name}' is unavailable (circuit open)")
+
+        try:
+            return self._post_with_retries(name, endpoint, payload, stream)
+        finally:
+            if allowed == 'trial':
+                # The half-open trial must not stay claimed if it ended without an outcome
+                endpoint.breaker.release_trial()
+
+    def _post_with_retries(self, name, endpoint, payload, stream):
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = self.session.post(endpoint.url, json=payload, timeout=endpoint.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                outcome = 'timeout' if isinstance(e, requests.Timeout) else 'connection_error'
+                FLOWISE_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=name, outcome=outcome)
+                retryable = not isinstance(e, requests.ReadTimeout) or endpoint.retry_read_timeouts
+                if retryable and attempt < endpoint.retries:
+                    attempt = self._backoff(name, attempt)
+                    continue
+                endpoint.breaker.record_failure()
+                raise FlowiseError(f"Flowise endpoint '{name}' failed: {e}") from e
+            except requests.RequestException as e:
+                # Invalid URL, broken chunked response, ...: not worth retrying
+                FLOWISE_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=name, outcome='error')
+                endpoint.breaker.record_failure()
+                raise FlowiseError(f"Flowise endpoint '{name}' failed: {e}") from e
+
+            FLOWISE_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, endpoint=name, outcome=str(response.status_code)
+            )
+            if response.status_code in endpoint.retry_statuses:
+                if attempt < endpoint.retries:
+                    response.close()
+                    attempt = self._backoff(name, attempt, response.headers.get('Retry-After'))
+                    continue
+                endpoint.breaker.record_failure()
+                raise FlowiseError(
+                    f"Flowise endpoint '{name}' returned {response.status_code}: {response.text[:200]}",
+                    status_code=response.status_code
+                )
+
+            if response.status_code >= 500:
+                endpoint.breaker.record_failure()
+            else:
+                endpoint.breaker.record_success()
+            return response
+
+    def post_json(self, name, payload):
+        """Like post(), but returns the decoded JSON body and raises FlowiseError on error statuses."""
+        response = self.post(name, payload)
+        if response.status_code != 200:
+            raise FlowiseError(
+                f"Flowise endpoint '{name}' returned {response.status_code}: {response.text[:200]}",
+                status_code=response.status_code
+            )
+        return response.json()
+
+    @staticmethod
+    def _backoff(name, attempt, retry_after=None):
+        FLOWISE_RETRIES.inc(endpoint=name)
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) * (0.5 + random.random())
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(BACKOFF_MAX, int(retry_after)))
+        time.sleep(delay)
+        return attempt + 1
+
+    def _collect_breaker_states(self):
+        states = {'closed': 0, 'half-open': 1, 'open': 2}
+        return [(
+            'flowise_circuit_state', 'gauge', 'Circuit breaker state per endpoint (0 closed, 1 half-open, 2 open).',
+            [({'endpoint': name}, states[endpoint.breaker.state]) for name, endpoint in self.endpoints.items()]
+        )]
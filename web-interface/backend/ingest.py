@@ -0,0 +1,148 @@
+"""Bulk ingestion of course material into the Flowise vector store.
+
+Texts are split server-side into chunks of at most INGEST_CHUNK_CHARS
+(breaking on paragraphs, then sentences, then words). Chunks repeated within
+the batch, or already stored as a document (by SHA-256 in the content
+index), are skipped. The rest are upserted one chunk per document, so each
+stored document is exactly one chunk and later batches can dedupe against
+it, from a bounded worker pool.
+"""
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from content_index import CONTENT_INDEX_KEY, content_sha256
+from metrics import Counter
+
+INGEST_CHUNK_CHARS = 2000
+INGEST_WORKERS = 4 # Concurrent upsert calls per batch
+
+INGESTED_CHUNKS = Counter('ingest_chunks_total', 'Chunks processed by batch ingestion, by outcome.')
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def _split(text, separators, chunk_chars):
+    """Splits `text` on the first separator that yields pieces, recursing into oversized pieces."""
+    if len(text) <= chunk_chars:
+        return [text]
+    if not separators:
+        return [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+
+    separator, rest = separators[0], separators[1:]
+    parts = text.split(separator) if isinstance(separator, str) else separator.split(text)
+    if len(parts) == 1:
+        return _split(text, rest, chunk_chars)
+
+    pieces = []
+    for part in parts:
+        pieces.extend(_split(part, rest, chunk_chars))
+    return pieces
+
+
+def chunk_text(text, chunk_chars=INGEST_CHUNK_CHARS, overlap=0):
+    """Splits `text` into chunks of at most `chunk_chars`, packing paragraphs and sentences together.
+
+    With `overlap`, each chunk after the first starts with up to that many
+    trailing characters of the previous one (cut at a word boundary).
+    """
+    # Leave room for the overlap and the space joining it
+    budget = chunk_chars - (overlap + 1 if overlap else 0)
+    pieces = [piece.strip() for piece in _split(text, ['\n\n', _SENTENCE_END, ' '], budget)]
+    chunks = []
+    current = ''
+    for piece in pieces:
+        if not piece:
+            continue
+        if current and len(current) + 1 + len(piece) > budget:
+            chunks.append(current)
+            current = ''
+        current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+
+    if overlap and len(chunks) > 1:
+        overlapped = [chunks[0]]
+        for previous, chunk in zip(chunks, chunks[1:]):
+            tail = previous[-overlap:]
+            tail = tail[tail.find(' ') + 1:] if ' ' in tail else tail
+            overlapped.append(f"{tail} {chunk}")
+        chunks = overlapped
+    return chunks
+
+
+def ingest_texts(r, texts, upsert_fn, chunk_chars=INGEST_CHUNK_CHARS, workers=INGEST_WORKERS):
+    """Chunks, dedupes and upserts `texts`; returns per-item statuses and throughput.
+
+    `upsert_fn(text)` sends one chunk to the vector store and returns a
+    truthy result on success. An item's status is 'stored', 'duplicate'
+    (every chunk already exists as a document), 'partial', 'failed' or 'empty'.
+    """
+    started = time.perf_counter()
+    items = [{'index': i, 'chunks': 0, 'stored': 0, 'duplicates': 0, 'failed': 0} for i in range(len(texts))]
+
+    # Chunk every item, remembering which item each chunk came from first
+    chunk_owners = {} # sha -> item index
+    chunk_texts = {} # sha -> text, in first-seen order
+    for item, text in zip(items, texts):
+        for chunk in chunk_text(text or '', chunk_chars):
+            sha = content_sha256(chunk)
+            item['chunks'] += 1
+            if sha in chunk_owners:
+                item['duplicates'] += 1
+                continue
+            chunk_owners[sha] = item['index']
+            chunk_texts[sha] = chunk
+
+    # Drop chunks that already exist as a document. Deleting the document
+    # removes it from the content index, so its text can be ingested again.
+    shas = list(chunk_texts)
+    pipe = r.pipeline(transaction=False)
+    for sha in shas:
+        pipe.hexists(CONTENT_INDEX_KEY, sha)
+    new_shas = []
+    for sha, exists in zip(shas, pipe.execute()):
+        if exists:
+            items[chunk_owners[sha]]['duplicates'] += 1
+        else:
+            new_shas.append(sha)
+
+    def upsert_chunk(sha):
+        try:
+            return bool(upsert_fn(chunk_texts[sha]))
+        except Exception as e:
+            print(f"Error upserting a chunk: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingest') as executor:
+        for sha, ok in zip(new_shas, executor.map(upsert_chunk, new_shas)):
+            items[chunk_owners[sha]]['stored' if ok else 'failed'] += 1
+
+    for item in items:
+        if not item['chunks']:
+            item['status'] = 'empty'
+        elif item['failed'] == 0:
+            item['status'] = 'stored' if item['stored'] else 'duplicate'
+        else:
+            item['status'] = 'partial' if item['stored'] else 'failed'
+
+    stored = sum(item['stored'] for item in items)
+    duplicates = sum(item['duplicates'] for item in items)
+    failed = sum(item['failed'] for item in items)
+    INGESTED_CHUNKS.inc(stored, outcome='stored')
+    INGESTED_CHUNKS.inc(duplicates, outcome='duplicate')
+    INGESTED_CHUNKS.inc(failed, outcome='failed')
+
+    elapsed = time.perf_counter() - started
+    documents = sum(1 for item in items if item['stored'])
+    return {
+        'items': items,
+        'chunks': sum(item['chunks'] for item in items),
+        'stored': stored,
+        'duplicates': duplicates,
+        'failed': failed,
+        'upserts': len(new_shas),
+        'seconds': round(elapsed, 3),
+        'docs_per_second': round(documents / elapsed, 2) if elapsed > 0 else None,
+        'chunks_per_second': round(stored / elapsed, 2) if elapsed > 0 else None
+    }
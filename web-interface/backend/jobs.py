@@ -0,0 +1,127 @@
+"""Background jobs with progress stored in Redis.
+
+Long-running operations (bulk naming, ingestion) run on a small thread pool in
+the worker that accepted the request, while their state lives in a Redis hash
+so `/api/jobs/<id>` answers from any gunicorn worker.
+
+A job dies with the worker running it (restart, OOM kill), so each job records
+its `owner` process and that process refreshes `heartbeat_at` while the job is
+queued or running. `get_job` marks a job whose heartbeat is older than
+JOB_STALE_SECONDS as failed instead of reporting it as running forever.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_KEY_PREFIX = "job:"
+JOB_TTL_SECONDS = 24 * 3600
+JOB_WORKERS = 2
+JOB_HEARTBEAT_SECONDS = 15
+JOB_STALE_SECONDS = 120 # No heartbeat for this long: the owning worker is gone
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+_owner = f"{socket.gethostname()}:{os.getpid()}"
+_active_jobs = {} # job id -> Redis client, for the jobs of this process not finished yet
+_active_lock = threading.Lock()
+_heartbeat_thread = None
+
+
+def _job_key(job_id):
+    return f"{JOB_KEY_PREFIX}{job_id}".encode('utf-8')
+
+
+def update_job(r, job_id, **fields):
+    """Updates job fields; dict/list values are stored as JSON."""
+    mapping = {b'updated_at': str(time.time()).encode('utf-8')}
+    for name, value in fields.items():
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        mapping[name.encode('utf-8')] = str(value).encode('utf-8')
+    key = _job_key(job_id)
+    pipe = r.pipeline(transaction=False)
+    pipe.hset(key, mapping=mapping)
+    pipe.expire(key, JOB_TTL_SECONDS)
+    pipe.execute()
+
+
+def get_job(r, job_id):
+    """Returns the job as a dict, or None if it does not exist (or has expired)."""
+    raw = r.hgetall(_job_key(job_id))
+    if not raw:
+        return None
+    job = {}
+    for name, value in raw.items():
+        name = name.decode('utf-8') if isinstance(name, bytes) else name
+        value = value.decode('utf-8', errors='replace') if isinstance(value, bytes) else value
+        if name in ('progress', 'result'):
+            value = json.loads(value)
+        elif name in ('created_at', 'updated_at', 'started_at', 'heartbeat_at'):
+            value = float(value)
+        job[name] = value
+
+    if job.get('status') in ('queued', 'running'):
+        last_seen = job.get('heartbeat_at', job.get('updated_at', 0))
+        if time.time() - last_seen > JOB_STALE_SECONDS:
+            error = f"Worker {job.get('owner', 'unknown')} stopped while the job was {job['status']}"
+            update_job(r, job_id, status='failed', error=error)
+            job.update(status='failed', error=error)
+    return job
+
+
+def _send_heartbeats():
+    while True:
+        time.sleep(JOB_HEARTBEAT_SECONDS)
+        with _active_lock:
+            active = list(_active_jobs.items())
+        for job_id, r in active:
+            try:
+                pipe = r.pipeline(transaction=False)
+                pipe.hset(_job_key(job_id), b'heartbeat_at', str(time.time()).encode('utf-8'))
+                pipe.expire(_job_key(job_id), JOB_TTL_SECONDS)
+                pipe.execute()
+            except Exception as e:
+                print(f"Could not refresh the heartbeat of job {job_id}: {e}")
+
+
+def _track(r, job_id):
+    global _heartbeat_thread
+    with _active_lock:
+        _active_jobs[job_id] = r
+        if _heartbeat_thread is None:
+            _heartbeat_thread = threading.Thread(target=_send_heartbeats, name='job-heartbeat', daemon=True)
+            _heartbeat_thread.start()
+
+
+def submit_job(r, kind, fn):
+    """Queues `fn(report_progress)` on the job pool and returns the new job id.
+
+    `report_progress(dict)` stores intermediate progress; the return value of
+    `fn` becomes the job result.
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    update_job(r, job_id, id=job_id, kind=kind, status='queued', created_at=now, owner=_owner, heartbeat_at=now)
+    _track(r, job_id)
+
+    def report_progress(progress):
+        update_job(r, job_id, progress=progress)
+
+    def run():
+        update_job(r, job_id, status='running', started_at=time.time())
+        try:
+            result = fn(report_progress)
+            update_job(r, job_id, status='done', result=result)
+        except Exception as e:
+            traceback.print_exc()
+            update_job(r, job_id, status='failed', error=str(e))
+        finally:
+            with _active_lock:
+                _active_jobs.pop(job_id, None)
+
+    _executor.submit(run)
+    return job_id
@@ -0,0 +1,20 @@
+"""Non-blocking key enumeration helpers.
+
+KEYS walks the whole keyspace in one command and blocks the Redis server for
+every other client while it runs. Everything in the backend that needs to list
+keys goes through these SCAN-based helpers instead.
+"""
+
+SCAN_COUNT = 500
+
+
+def iter_keys(r, pattern, count=SCAN_COUNT, exclude_suffix=None):
+    """Yields every key matching `pattern`, one SCAN batch at a time.
+
+    Keys ending with `exclude_suffix` (e.g. b':name') are skipped.
+    """
+    for key in r.scan_iter(match=pattern, count=count):
+        if exclude_suffix is not None and key.endswith(exclude_suffix):
+            continue
+        yield key
+
@@ -0,0 +1,107 @@
+"""Minimal in-process metrics exposed in the Prometheus text format.
+
+Counters and histograms are registered at import time by the modules that
+own them; values that are cheaper to read at scrape time (pool sizes, Redis
+counters shared by all workers) are provided through collector callbacks.
+Each gunicorn worker keeps its own in-process values.
+"""
+import threading
+
+_metrics = []
+_collectors = []
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    inner = ','.join(f'{name}="{value}"' for name, value in sorted(labels.items()))
+    return '{' + inner + '}'
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f'{self.name}{_format_labels(dict(key))} {value}')
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds (in seconds by convention)."""
+
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in self._series.items():
+                labels = dict(key)
+                for bound, count in zip(self.buckets, series['counts']):
+                    lines.append(f'{self.name}_bucket{_format_labels({**labels, "le": bound})} {count}')
+                lines.append(f'{self.name}_bucket{_format_labels({**labels, "le": "+Inf"})} {series["count"]}')
+                lines.append(f'{self.name}_sum{_format_labels(labels)} {series["sum"]}')
+                lines.append(f'{self.name}_count{_format_labels(labels)} {series["count"]}')
+        return lines
+
+
+def register_collector(collector):
+    """Registers a callback returning [(name, type, help, [(labels, value), ...]), ...] at scrape time."""
+    _collectors.append(collector)
+    return collector
+
+
+def render_metrics():
+    """Renders every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            families = collector()
+        except Exception as e:
+            print(f"Error collecting metrics from {collector.__name__}: {e}")
+            continue
+        for name, metric_type, help_text, samples in families:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in samples:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,100 @@
+"""Redis cache for generated document names.
+
+Names are keyed by a SHA-256 of the normalized 40-word prefix that is sent to
+the name generator, so re-syncs and re-uploads of identical chunks skip the
+LLM call. Entries expire after NAME_CACHE_TTL_SECONDS and the cache is capped
+at NAME_CACHE_MAX_ENTRIES, evicting the least recently used names first.
+Hit/miss counters live in Redis so every worker reports the same totals.
+"""
+import hashlib
+import time
+import unicodedata
+
+from metrics import register_collector
+
+NAME_CACHE_PREFIX = "cache:docname:"
+NAME_CACHE_LRU_KEY = "cache:docname-lru"
+NAME_CACHE_STATS_KEY = "stats:docname-cache"
+NAME_CACHE_TTL_SECONDS = 30 * 24 * 3600
+NAME_CACHE_MAX_ENTRIES = 50000
+PREFIX_WORDS = 40
+
+
+def name_prompt_prefix(content):
+    """Returns the first PREFIX_WORDS words of `content`, as sent to the name generator."""
+    return ' '.join(content.split()[:PREFIX_WORDS])
+
+
+def _cache_id(prefix):
+    normalized = unicodedata.normalize('NFC', ' '.join(prefix.split())).casefold()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def get_cached_name(r, prefix):
+    """Returns the cached name for this prompt prefix, or None. Counts the hit or miss."""
+    cache_id = _cache_id(prefix)
+    key = NAME_CACHE_PREFIX + cache_id
+    name = r.get(key)
+
+    pipe = r.pipeline(transaction=False)
+    if name is not None:
+        pipe.hincrby(NAME_CACHE_STATS_KEY, 'hits', 1)
+        pipe.zadd(NAME_CACHE_LRU_KEY, {cache_id: time.time()})
+        pipe.expire(key, NAME_CACHE_TTL_SECONDS)
+    else:
+        pipe.hincrby(NAME_CACHE_STATS_KEY, 'misses', 1)
+    pipe.execute()
+
+    if isinstance(name, bytes):
+        name = name.decode('utf-8', errors='replace')
+    return name
+
+
+def store_name(r, prefix, name, generation_seconds):
+    """Caches a freshly generated name and records how long the LLM call took."""
+    cache_id = _cache_id(prefix)
+    pipe = r.pipeline(transaction=False)
+    pipe.set(NAME_CACHE_PREFIX + cache_id, name, ex=NAME_CACHE_TTL_SECONDS)
+    pipe.zadd(NAME_CACHE_LRU_KEY, {cache_id: time.time()})
+    pipe.hincrby(NAME_CACHE_STATS_KEY, 'generated', 1)
+    pipe.hincrbyfloat(NAME_CACHE_STATS_KEY, 'generation_seconds', generation_seconds)
+    pipe.zcard(NAME_CACHE_LRU_KEY)
+    size = pipe.execute()[-1]
+
+    # Evict least recently used entries beyond the cap
+    excess = size - NAME_CACHE_MAX_ENTRIES
+    if excess > 0:
+        evicted = r.zpopmin(NAME_CACHE_LRU_KEY, excess)
+        if evicted:
+            r.delete(*[NAME_CACHE_PREFIX + (member.decode('utf-8') if isinstance(member, bytes) else member)
+                       for member, _ in evicted])
+
+
+def get_stats(r):
+    """Returns hits, misses and the LLM time the cache has saved (estimated from the average miss)."""
+    raw = r.hgetall(NAME_CACHE_STATS_KEY)
+    raw = {(k.decode('utf-8') if isinstance(k, bytes) else k): float(v) for k, v in raw.items()}
+    hits = raw.get('hits', 0)
+    generated = raw.get('generated', 0)
+    generation_seconds = raw.get('generation_seconds', 0)
+    average = generation_seconds / generated if generated else 0
+    return {
+        'hits': int(hits),
+        'misses': int(raw.get('misses', 0)),
+        'generation_seconds': generation_seconds,
+        'saved_seconds': hits * average,
+    }
+
+
+def register_metrics(get_client):
+    """Exposes the shared cache counters on /metrics, read through `get_client()` at scrape time."""
+
+    @register_collector
+    def collect_name_cache_stats():
+        stats = get_stats(get_client())
+        return [
+            ('docname_cache_hits_total', 'counter', 'Document name lookups served from the cache.', [({}, stats['hits'])]),
+            ('docname_cache_misses_total', 'counter', 'Document name lookups that called the LLM.', [({}, stats['misses'])]),
+            ('docname_generation_seconds_total', 'counter', 'Time spent waiting for the name generator.', [({}, stats['generation_seconds'])]),
+            ('docname_cache_saved_seconds_total', 'counter', 'Estimated name generator time saved by cache hits.', [({}, stats['saved_seconds'])]),
+        ]
@@ -0,0 +1,159 @@
+"""Batch naming engine for the course documents.
+
+Documents are read in pipelined batches, the ones needing a name are sent to
+the name generator from a bounded worker pool behind a token-bucket rate
+limit (with retry and exponential backoff), and the generated names are
+written back with one pipeline per batch.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+NAMING_WORKERS = 4 # Concurrent calls to the name generator per job
+NAMING_RATE_PER_SECOND = 2.0 # Sustained name generator calls per second (per worker process)
+NAMING_BURST = 4
+NAMING_MAX_RETRIES = 3
+NAMING_BATCH_SIZE = 50 # Documents read/written per Redis pipeline
+MIN_CONTENT_LENGTH = 5 # Shorter documents (or just '#') are junk left by the splitter
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity` stored."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# One bucket per process so concurrent jobs share the name generator budget
+name_generator_bucket = TokenBucket(NAMING_RATE_PER_SECOND, NAMING_BURST)
+
+
+def _name_with_retry(name_fn, content, bucket, max_retries):
+    for attempt in range(max_retries + 1):
+        # name_fn waits for a token only right before calling the LLM, so cached names don't spend any
+        name = name_fn(content, rate_limit=bucket.acquire)
+        if name:
+            return name
+        if attempt < max_retries:
+            # Exponential backoff with jitter: ~0.5s, 1s, 2s, ...
+            time.sleep(0.5 * (2 ** attempt) * (0.5 + random.random()))
+    return None
+
+
+def _preview(text):
+    first_40_words = ' '.join(text.split()[:40])
+    return first_40_words[:50] + ('...' if len(first_40_words) > 50 else '')
+
+
+def name_documents(r, keys, name_fn, total=0, delete_short=False, on_delete=None, report_progress=None,
+                   workers=NAMING_WORKERS, batch_size=NAMING_BATCH_SIZE, max_retries=NAMING_MAX_RETRIES,
+                   bucket=None):
+    """Names every unnamed document in `keys` (bytes keys, binary client) and returns a results dict.
+
+    `name_fn(content, rate_limit)` returns a name or None and must call
+    `rate_limit()` before each name generator request (not for cache hits).
+
+    With `delete_short`, documents whose content is '#' or shorter than
+    MIN_CONTENT_LENGTH are deleted instead (and `on_delete(r, key)` is called).
+    """
+    bucket = bucket or name_generator_bucket
+    results = {
+        'total': total,
+        'processed': 0,
+        'already_named': 0,
+        'named': 0,
+        'deleted': 0,
+        'errors': 0,
+        'deleted_keys': [],
+        'named_keys': []
+    }
+
+    def flush(batch):
+        pipe = r.pipeline(transaction=False)
+        for key in batch:
+            pipe.hmget(key, b'name', b'content')
+        fields = pipe.execute()
+
+        to_name = []
+        to_delete = []
+        for key, (name_bytes, content_bytes) in zip(batch, fields):
+            if name_bytes:
+                results['already_named'] += 1
+                continue
+            if not content_bytes:
+                print(f"Document {key} has no content field")
+                results['errors'] += 1
+                continue
+            text = content_bytes.decode('utf-8', errors='replace')
+            if delete_short and (text == '#' or len(text) < MIN_CONTENT_LENGTH):
+                to_delete.append((key, text))
+                continue
+            to_name.append((key, text))
+
+        if to_delete:
+            pipe = r.pipeline(transaction=False)
+            for key, _ in to_delete:
+                pipe.delete(key)
+            pipe.execute()
+            for key, text in to_delete:
+                if on_delete:
+                    on_delete(r, key)
+                results['deleted'] += 1
+                results['deleted_keys'].append({
+                    'key': key.decode('utf-8'),
+                    'content': text[:30] + ('...' if len(text) > 30 else '')
+                })
+
+        names = list(executor.map(
+            lambda item: _name_with_retry(name_fn, item[1], bucket, max_retries), to_name
+        ))
+
+        pipe = r.pipeline(transaction=False)
+        for (key, text), name in zip(to_name, names):
+            results['processed'] += 1
+            if not name:
+                results['errors'] += 1
+                continue
+            pipe.hset(key, b'name', name.encode('utf-8'))
+            results['named'] += 1
+            results['named_keys'].append({
+                'key': key.decode('utf-8'),
+                'name': name,
+                'preview': _preview(text)
+            })
+        pipe.execute()
+
+        if report_progress:
+            report_progress({field: results[field] for field in
+                             ('total', 'processed', 'already_named', 'named', 'deleted', 'errors')})
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='naming') as executor:
+        batch = []
+        for key in keys:
+            batch.append(key)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+    results['summary'] = f"Named {results['named']} documents, deleted {results['deleted']} documents, {results['already_named']} already had names"
+    return results
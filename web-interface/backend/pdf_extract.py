@@ -0,0 +1,93 @@
+"""Server-side text extraction for uploaded PDFs.
+
+Pages are read lazily with pypdf and extracted in page ranges on a process
+pool (text extraction is CPU-bound and would otherwise hold the GIL in the
+web worker). The PDF is written to a temporary file once and each task
+opens it by path, so the bytes are not pickled into every task. Ranges come
+back in order, so callers can chunk and upsert the beginning of a large
+course while the rest is still being extracted.
+"""
+import io
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from pypdf import PdfReader
+
+from ingest import chunk_text
+
+PDF_EXTRACT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+PAGES_PER_TASK = 8
+PDF_CHUNK_OVERLAP = 200 # Characters repeated at the start of each chunk for context
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # Spawn rather than fork: the web worker already runs the Redis listener and job threads
+        _executor = ProcessPoolExecutor(
+            max_workers=PDF_EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _executor
+
+
+def count_pages(data):
+    return len(PdfReader(io.BytesIO(data)).pages)
+
+
+def _extract_range(source, start, stop):
+    """Returns the text of pages [start, stop) of `source` (a path in pool processes, or a stream)."""
+    reader = PdfReader(source)
+    texts = []
+    for number in range(start, stop):
+        try:
+            texts.append(reader.pages[number].extract_text() or '')
+        except Exception as e:
+            # One broken page should not fail the whole course
+            print(f"Could not extract text from page {number + 1}: {e}")
+            texts.append('')
+    return texts
+
+
+def iter_page_texts(data, page_count=None, pages_per_task=PAGES_PER_TASK):
+    """Yields the text of every page of the PDF `data`, in order."""
+    page_count = page_count if page_count is not None else count_pages(data)
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    if len(ranges) <= 1:
+        # Not worth shipping a small PDF to another process
+        for start, stop in ranges:
+            yield from _extract_range(io.BytesIO(data), start, stop)
+        return
+
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+        f.write(data)
+    try:
+        executor = _get_executor()
+        futures = [executor.submit(_extract_range, f.name, start, stop) for start, stop in ranges]
+        try:
+            for future in futures:
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+    finally:
+        os.unlink(f.name)
+
+
+def iter_pdf_chunks(page_texts, chunk_chars, overlap=PDF_CHUNK_OVERLAP):
+    """Turns a stream of page texts into overlapping chunks without holding the whole document."""
+    buffer = ''
+    for text in page_texts:
+        buffer = f"{buffer}\n\n{text}" if buffer else text
+        if len(buffer) < 4 * chunk_chars:
+            continue
+        chunks = chunk_text(buffer, chunk_chars, overlap)
+        # Keep the last chunk to continue it with the next pages
+        yield from chunks[:-1]
+        buffer = chunks[-1] if chunks else ''
+    if buffer.strip():
+        yield from chunk_text(buffer, chunk_chars, overlap)
@@ -0,0 +1,154 @@
+"""PDF storage for course documents with partial reads.
+
+PDF bytes live in a content-addressed blob store (see blob_store.py); the
+document hash only keeps a reference (`pdf_ref`, the SHA-256) plus the size
+and upload time, so listing and search handlers never touch the bytes.
+Documents that still carry an inline `pdf_data` hash field (from before
+migrate-pdf-blobs) are moved into the blob store the first time their PDF
+is opened: one HGET, after which every range is read from the blob.
+
+Several documents (the chunks of one uploaded PDF) share a blob, and
+documents are also deleted outside this app, so blobs are not reference
+counted; collect_garbage deletes the ones no document points at any more.
+"""
+import time
+
+from keyspace import iter_keys
+
+GC_BATCH_SIZE = 500 # Documents read per pipeline when collecting blob references
+
+
+def _as_str(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class StoredPdf:
+    """A PDF that can be read in byte ranges; `etag` is weak unless the blob is content-addressed."""
+
+    def __init__(self, blob, etag, modified, weak_etag=False):
+        self.blob = blob
+        self.size = blob.size
+        self.etag = etag
+        self.weak_etag = weak_etag
+        self.modified = modified # Unix timestamp, or None if unknown
+
+    def iter_chunks(self, start, end, chunk_size):
+        """Yields bytes [start, end) in chunks of at most `chunk_size`, then releases the blob."""
+        try:
+            position = start
+            while position < end:
+                chunk_end = min(position + chunk_size, end)
+                yield self.blob.read(position, chunk_end)
+                position = chunk_end
+        finally:
+            self.blob.close()
+
+    def close(self):
+        self.blob.close()
+
+
+def select_byte_range(requested, size, range_valid=True):
+    """Returns (start, end, status) to serve for a parsed Range header, or None if it is unsatisfiable (416).
+
+    `requested` is a werkzeug Range or None. The whole file is served (200)
+    without a range, for multi-range requests, or when If-Range no longer
+    matches (`range_valid`).
+    """
+    if requested is None or len(requested.ranges) != 1 or not range_valid:
+        return 0, size, 200
+    byte_range = requested.range_for_length(size)
+    if byte_range is None:
+        return None
+    start, end = byte_range
+    return start, end, 206
+
+
+def link_pdf(r, key, sha, size):
+    """Points document `key` at a PDF already in the blob store."""
+    r.hset(key, mapping={
+        'pdf_ref': sha,
+        'pdf_size': size,
+        'pdf_mtime': int(time.time()),
+    })
+
+
+def store_pdf(r, key, data, store):
+    """Stores PDF bytes for document `key` in `store` (deduplicated by SHA-256) and returns the hash."""
+    sha = store.put(data)
+    link_pdf(r, key, sha, len(data))
+    return sha
+
+
+def open_pdf(r, key, store):
+    """Returns a StoredPdf for document `key`, or None if it has no PDF.
+
+    `r` must return raw bytes, since a legacy inline PDF is migrated here.
+    """
+    ref, modified = r.hmget(key, 'pdf_ref', 'pdf_mtime')
+    if not ref and r.hexists(key, 'pdf_data'):
+        # Legacy documents keep the whole file in the pdf_data field. Reading
+        # ranges of it would copy the field once per chunk, so move it to
+        # the blob store once. A concurrent request may have just done that.
+        migrate_inline_pdf(r, key, store)
+        ref, modified = r.hmget(key, 'pdf_ref', 'pdf_mtime')
+        print(f"Migrated the inline PDF of {_as_str(key)} to blob {_as_str(ref)}")
+    if not ref:
+        return None
+
+    blob = store.open(_as_str(ref))
+    if blob is None:
+        print(f"Warning: PDF blob {_as_str(ref)} referenced by {_as_str(key)} is missing")
+        return None
+    return StoredPdf(
+        blob,
+        etag=_as_str(ref),
+        modified=int(modified) if modified else blob.modified
+    )
+
+
+def migrate_inline_pdf(r, key, store):
+    """Moves a legacy inline `pdf_data` field into `store`, leaving a reference. Returns the hash or None."""
+    data = r.hget(key, 'pdf_data')
+    if data is None:
+        return None
+    sha = store_pdf(r, key, data, store)
+    r.hdel(key, 'pdf_data')
+    return sha
+
+
+def iter_pdf_refs(r, pattern, batch_size=GC_BATCH_SIZE):
+    """Yields the blob hash referenced by every document matching `pattern`."""
+    batch = []
+
+    def flush(batch):
+        pipe = r.pipeline(transaction=False)
+        for key in batch:
+            pipe.hget(key, 'pdf_ref')
+        return [_as_str(ref) for ref in pipe.execute() if ref]
+
+    for key in iter_keys(r, pattern):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
+
+
+def collect_garbage(r, pattern, store, min_age, dry_run=False):
+    """Deletes blobs that no document matching `pattern` references. Returns (deleted, freed bytes).
+
+    Blobs used within the last `min_age` seconds (or of unknown age) are kept,
+    since an ingest job stores its PDF before the documents linking to it exist.
+    """
+    referenced = set(iter_pdf_refs(r, pattern))
+    deleted = 0
+    freed_bytes = 0
+    for sha, size, age in store.iter_blobs():
+        if sha in referenced or age is None or age < min_age:
+            continue
+        if not dry_run:
+            store.delete(sha)
+        deleted += 1
+        freed_bytes += size
+    return deleted, freed_bytes
@@ -0,0 +1,141 @@
+"""Quiz XML parsing and the pre-parsed form stored next to it.
+
+Quizzes are parsed once, when they are saved, and the result is kept in the
+quiz hash as compact JSON (`parsed`) with a `schema_version`, so reads can
+return questions without touching the XML again. QuizStreamParser parses
+a response incrementally, so generated quizzes can be streamed to the client
+question by question while the LLM is still writing. Bump QUIZ_SCHEMA_VERSION
+whenever the parsed structure changes and run `flask --app app
+backfill-parsed-quizzes` to re-parse the stored quizzes.
+"""
+import json
+import xml.etree.ElementTree as ET
+
+QUIZ_SCHEMA_VERSION = 1
+
+TEST_START = '<test>'
+TEST_END = '</test>'
+
+
+def _question_data(q):
+    question_data = {
+        'id': q.get('id', ''),
+        'type': q.get('type', ''),
+        'text': q.find('text').text if q.find('text') is not None else '',
+        'options': []
+    }
+
+    # Extract options
+    for option in q.findall('.//option'):
+        is_correct = option.get('correct', 'false').lower() == 'true'
+        option_text = option.text if option.text is not None else ''
+        question_data['options'].append({
+            'text': option_text,
+            'correct': is_correct
+        })
+    return question_data
+
+
+class QuizStreamParser:
+    """Incremental quiz parser: feed it the LLM output as it arrives and get questions back as they close.
+
+    Text before the first `<test>` and after its closing tag is ignored (like
+    the regex the one-shot parser used to apply). feed() and close() return
+    lists of ('topic', str) and ('question', dict) events; each question
+    element is discarded once parsed, so memory stays flat for large banks.
+    Malformed XML raises ET.ParseError.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._stack = []
+        self._pending = ''
+        self._tail = ''
+        self._started = False
+        self._done = False
+
+    def feed(self, text):
+        if self._done:
+            return []
+        if not self._started:
+            self._pending += text
+            start = self._pending.find(TEST_START)
+            if start < 0:
+                return []
+            text = self._pending[start:]
+            self._pending = ''
+            self._started = True
+
+        # Stop after the closing tag; the tag may straddle two chunks
+        window = self._tail + text
+        end = window.find(TEST_END)
+        if end >= 0:
+            text = text[:end + len(TEST_END) - len(self._tail)]
+            self._done = True
+        self._tail = window[-(len(TEST_END) - 1):]
+
+        self._parser.feed(text)
+        return self._read_events()
+
+    def close(self):
+        if not self._started:
+            # No <test> wrapper: parse the whole response as-is
+            self._started = True
+            self._parser.feed(self._pending)
+            self._pending = ''
+        self._parser.close()
+        return self._read_events()
+
+    def _read_events(self):
+        events = []
+        for event, elem in self._parser.read_events():
+            if event == 'start':
+                self._stack.append(elem)
+                continue
+            self._stack.pop()
+            if elem.tag == 'question':
+                events.append(('question', _question_data(elem)))
+                if self._stack:
+                    self._stack[-1].remove(elem)
+            elif elem.tag == 'topic' and len(self._stack) == 1:
+                events.append(('topic', elem.text or ''))
+        return events
+
+
+def iter_quiz_events(chunks):
+    """Yields ('topic', str) and ('question', dict) events while consuming an iterable of text chunks."""
+    parser = QuizStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def parse_quiz_xml(xml_string):
+    """Parses a whole quiz response into {'topic': ..., 'questions': [...]}."""
+    topic = ''
+    questions = []
+    for event, value in iter_quiz_events([xml_string]):
+        if event == 'topic':
+            topic = value
+        else:
+            questions.append(value)
+
+    return {
+        'topic': topic,
+        'questions': questions
+    }
+
+
+def encode_parsed_quiz(parsed):
+    """Returns the hash fields storing `parsed` (the output of parse_quiz_xml)."""
+    return {
+        'parsed': json.dumps(parsed, ensure_ascii=False, separators=(',', ':')),
+        'schema_version': str(QUIZ_SCHEMA_VERSION),
+    }
+
+
+def decode_parsed_quiz(parsed_json, schema_version):
+    """Returns the stored parsed quiz, or None if it is missing or from another schema version."""
+    if parsed_json is None or schema_version is None or int(schema_version) != QUIZ_SCHEMA_VERSION:
+        return None
+    return json.loads(parsed_json)
@@ -0,0 +1,122 @@
+"""Process-wide Redis connection pools for the Flask backend.
+
+One pool for decoded (str) responses and one for binary responses are
+created lazily per process and shared by every request handler. Connections
+are health-checked when they have been idle, and commands are retried with
+backoff after connection errors so a Redis restart doesn't need an app restart.
+"""
+import threading
+import time
+
+import redis
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+
+from metrics import Histogram, register_collector
+
+_settings = {}
+_pools = {}
+_pools_lock = threading.Lock()
+
+POOL_WAIT_SECONDS = Histogram(
+    'redis_pool_wait_seconds',
+    'Time spent waiting to check a connection out of the Redis pool.',
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+
+
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    """BlockingConnectionPool that tracks connections in use, created and checkout wait time."""
+
+    def __init__(self, *args, **kwargs):
+        self.label = kwargs.pop('label', 'default')
+        self.stats_lock = threading.Lock()
+        self.in_use = 0
+        self.created = 0
+        self.wait_seconds_total = 0.0
+        super().__init__(*args, **kwargs)
+
+    def make_connection(self):
+        connection = super().make_connection()
+        with self.stats_lock:
+            self.created += 1
+        return connection
+
+    def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        connection = super().get_connection(*args, **kwargs)
+        waited = time.perf_counter() - started
+        with self.stats_lock:
+            self.in_use += 1
+            self.wait_seconds_total += waited
+        POOL_WAIT_SECONDS.observe(waited, pool=self.label)
+        return connection
+
+    def release(self, connection):
+        with self.stats_lock:
+            self.in_use = max(0, self.in_use - 1)
+        super().release(connection)
+
+    def reset(self):
+        # Called after fork: the child starts with an empty pool
+        super().reset()
+        self.stats_lock = threading.Lock()
+        self.in_use = 0
+        self.created = 0
+        self.wait_seconds_total = 0.0
+
+
+def configure(host, port, db=0, password=None, max_connections=50, pool_timeout=5,
+              health_check_interval=30, socket_timeout=None, socket_connect_timeout=5, retries=3):
+    """Stores the connection settings used when the pools are first created."""
+    _settings.update(
+        host=host,
+        port=port,
+        db=db,
+        password=password,
+        max_connections=max_connections,
+        timeout=pool_timeout,
+        health_check_interval=health_check_interval,
+        socket_timeout=socket_timeout,
+        socket_connect_timeout=socket_connect_timeout,
+        retries=retries,
+    )
+
+
+def get_pool(decode_responses):
+    """Returns the shared pool for decoded (True) or binary (False) responses."""
+    pool = _pools.get(decode_responses)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(decode_responses)
+            if pool is None:
+                if not _settings:
+                    raise RuntimeError("redis_pool.configure() must be called before get_pool()")
+                settings = dict(_settings)
+                retries = settings.pop('retries')
+                pool = InstrumentedConnectionPool(
+                    label='decoded' if decode_responses else 'binary',
+                    decode_responses=decode_responses,
+                    retry=Retry(ExponentialBackoff(cap=1, base=0.05), retries),
+                    retry_on_error=[redis.exceptions.ConnectionError, redis.exceptions.TimeoutError],
+                    **settings,
+                )
+                _pools[decode_responses] = pool
+    return pool
+
+
+@register_collector
+def collect_pool_stats():
+    families = {
+        'redis_pool_connections_in_use': ('gauge', 'Connections currently checked out of the pool.', []),
+        'redis_pool_connections_created_total': ('counter', 'Connections created by the pool.', []),
+        'redis_pool_max_connections': ('gauge', 'Maximum number of connections in the pool.', []),
+        'redis_pool_wait_seconds_total': ('counter', 'Total time spent waiting for a pooled connection.', []),
+    }
+    for pool in list(_pools.values()):
+        labels = {'pool': pool.label}
+        families['redis_pool_connections_in_use'][2].append((labels, pool.in_use))
+        families['redis_pool_connections_created_total'][2].append((labels, pool.created))
+        families['redis_pool_max_connections'][2].append((labels, pool.max_connections))
+        families['redis_pool_wait_seconds_total'][2].append((labels, pool.wait_seconds_total))
+    return [(name, metric_type, help_text, samples) for name, (metric_type, help_text, samples) in families.items()]
@@ -0,0 +1,287 @@
+"""Key allocation and newest-first index for saved quizzes and assignments.
+
+Each collection has an INCR sequence (`seq:<name>`) that hands out the next
+numeric key suffix atomically, so concurrent saves from different workers
+never pick the same key, and a sorted set (`idx:<name>:by-time`) of keys
+scored by their save timestamp, so listings are a ZREVRANGE instead of a
+keyspace scan. Both are initialised from the existing keys on first use.
+
+A third key, `idx:<name>:summaries`, maps each item key to a small JSON
+summary (topic, timestamp, question count) so list views never have to load
+the stored XML, and `idx:<name>:topic:<topic>` holds the same timestamp
+index per (case-folded) topic, so a topic filter reads only that topic's
+items.
+
+Rebuilding the indexes takes a `lock:<name>:rebuild` lock; other workers
+wait for it to finish instead of rebuilding (and saving) concurrently.
+"""
+import itertools
+import json
+import re
+import time
+import uuid
+
+from keyspace import iter_keys
+
+REBUILD_BATCH_SIZE = 500
+REBUILD_LOCK_SECONDS = 60 # Expiry of the rebuild lock, in case its holder dies mid-rebuild
+REBUILD_POLL_SECONDS = 0.2
+
+
+class SavedCollection:
+    """Names the Redis keys of one collection of saved items."""
+
+    def __init__(self, name, prefix, item_tag):
+        self.name = name
+        self.prefix = prefix
+        self.item_tag = item_tag # XML element counted as a question
+        self.seq_key = f"seq:{name}"
+        self.index_key = f"idx:{name}:by-time"
+        self.summaries_key = f"idx:{name}:summaries"
+        self.topic_index_prefix = f"idx:{name}:topic:"
+        self.topics_ready_key = f"idx:{name}:topics-ready" # Set once the topic indexes are built
+        self.rebuild_lock_key = f"lock:{name}:rebuild"
+
+    def topic_index_key(self, topic):
+        return self.topic_index_prefix + normalize_topic(topic)
+
+    def key_for(self, index):
+        return f"{self.prefix}{index}"
+
+    def normalize_key(self, key):
+        """Accepts a full key or just its numeric suffix and returns the full key."""
+        key = str(_as_str(key))
+        return key if key.startswith(self.prefix) else self.key_for(key)
+
+
+QUIZZES = SavedCollection('brasov-tests', 'doc:brasov-tests:', 'question')
+ASSIGNMENTS = SavedCollection('brasov-assignments', 'brasov-assignments:', 'task')
+
+SUMMARY_TEXT_CHARS = 200
+
+
+def _as_str(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def normalize_topic(topic):
+    return ' '.join(_as_str(topic or '').split()).casefold()
+
+
+def _xml_text(xml, tag):
+    match = re.search(rf'<{tag}>(.*?)</{tag}>', xml, re.DOTALL)
+    return match.group(1).strip() if match else ''
+
+
+def summarize_item(collection, topic, timestamp, xml):
+    """Builds the list-view summary of a saved item without parsing the whole XML."""
+    summary = {
+        'topic': topic,
+        'timestamp': int(timestamp or 0),
+        'question_count': len(re.findall(rf'<{collection.item_tag}\b', xml)),
+    }
+    if collection is ASSIGNMENTS:
+        summary['title'] = _xml_text(xml, 'title') or topic
+        summary['description'] = _xml_text(xml, 'description')[:SUMMARY_TEXT_CHARS]
+    return summary
+
+
+def _summarize_fields(collection, fields):
+    topic, timestamp, xml = (_as_str(value) or '' for value in fields)
+    return summarize_item(collection, topic, timestamp or 0, xml)
+
+
+def _key_index(collection, key):
+    suffix = _as_str(key)[len(collection.prefix):]
+    return int(suffix) if suffix.isdigit() else None
+
+
+def rebuild_collection_index(r, collection, batch_size=REBUILD_BATCH_SIZE):
+    """Rebuilds the timestamp and topic indexes from a keyspace scan and returns the highest key index seen."""
+    tmp_key = f"{collection.index_key}:rebuild"
+    tmp_summaries = f"{collection.summaries_key}:rebuild"
+    r.delete(tmp_key, tmp_summaries)
+    # Topic indexes are rebuilt in place; entries of items deleted since are skipped when reading
+    for key in iter_keys(r, f"{collection.topic_index_prefix}*"):
+        r.delete(key)
+    highest_index = 0
+    batch = []
+
+    def flush(batch):
+        pipe = r.pipeline(transaction=False)
+        for key in batch:
+            pipe.hmget(key, 'topic', 'timestamp', 'xml')
+        summaries = [_summarize_fields(collection, fields) for fields in pipe.execute()]
+
+        pipe = r.pipeline(transaction=False)
+        pipe.zadd(tmp_key, {_as_str(key): summary['timestamp'] for key, summary in zip(batch, summaries)})
+        pipe.hset(tmp_summaries, mapping={_as_str(key): json.dumps(summary) for key, summary in zip(batch, summaries)})
+        for key, summary in zip(batch, summaries):
+            pipe.zadd(collection.topic_index_key(summary['topic']), {_as_str(key): summary['timestamp']})
+        pipe.execute()
+
+    for key in iter_keys(r, f"{collection.prefix}*"):
+        index = _key_index(collection, key)
+        if index is None:
+            continue
+        highest_index = max(highest_index, index)
+        batch.append(key)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    if r.exists(tmp_key):
+        pipe = r.pipeline()
+        pipe.rename(tmp_key, collection.index_key)
+        pipe.rename(tmp_summaries, collection.summaries_key)
+        pipe.execute()
+    else:
+        r.delete(collection.index_key, collection.summaries_key)
+    return highest_index
+
+
+def ensure_collection(r, collection, timeout=2 * REBUILD_LOCK_SECONDS):
+    """Initialises the sequence and indexes of `collection` from the existing keys if missing.
+
+    Only the worker holding the rebuild lock rebuilds; the others wait until
+    it is done (or its lock expires and they can take over). Raises
+    TimeoutError if the indexes are still not ready after `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    token = uuid.uuid4().hex
+    while r.exists(collection.seq_key, collection.topics_ready_key) != 2:
+        if not r.set(collection.rebuild_lock_key, token, nx=True, ex=REBUILD_LOCK_SECONDS):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Timed out waiting for the '{collection.name}' indexes to be rebuilt")
+            time.sleep(REBUILD_POLL_SECONDS)
+            continue
+        try:
+            if r.exists(collection.seq_key, collection.topics_ready_key) == 2:
+                return # Finished by another worker just before we took the lock
+            print(f"Sequence '{collection.seq_key}' or topic indexes missing, initialising from keyspace...")
+            highest_index = rebuild_collection_index(r, collection)
+            # NX: if another worker initialised it meanwhile, keep its value
+            r.set(collection.seq_key, highest_index, nx=True)
+            r.set(collection.topics_ready_key, 1)
+            print(f"Initialised '{collection.seq_key}' at {highest_index}.")
+        finally:
+            if _as_str(r.get(collection.rebuild_lock_key)) == token:
+                r.delete(collection.rebuild_lock_key)
+
+
+def save_item(r, collection, fields, timestamp=None):
+    """Stores `fields` (at least 'topic' and 'xml') under a freshly allocated key and indexes it.
+
+    Returns (key, index).
+    """
+    ensure_collection(r, collection)
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    index = r.incr(collection.seq_key)
+    key = collection.key_for(index)
+    summary = summarize_item(collection, _as_str(fields['topic']), timestamp, _as_str(fields['xml']))
+
+    pipe = r.pipeline()
+    pipe.hset(key, mapping={**fields, 'timestamp': str(timestamp)})
+    pipe.zadd(collection.index_key, {key: timestamp})
+    pipe.zadd(collection.topic_index_key(summary['topic']), {key: timestamp})
+    pipe.hset(collection.summaries_key, key, json.dumps(summary))
+    pipe.execute()
+    return key, index
+
+
+def delete_item(r, collection, key):
+    """Deletes a saved item and removes it from the index. Returns False if it did not exist."""
+    ensure_collection(r, collection)
+    key = collection.normalize_key(key)
+    topic = r.hget(key, 'topic')
+    pipe = r.pipeline()
+    pipe.delete(key)
+    pipe.zrem(collection.index_key, key)
+    pipe.zrem(collection.topic_index_key(topic), key)
+    pipe.hdel(collection.summaries_key, key)
+    deleted = pipe.execute()[0]
+    return bool(deleted)
+
+
+def _parse_cursor(collection, cursor):
+    """Returns (max score, last key returned or None); raises ValueError on a malformed cursor."""
+    if not cursor:
+        return '+inf', None
+    score, _, last_id = cursor.partition(':')
+    if not last_id.isdigit():
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return int(score), collection.key_for(last_id)
+
+
+def _iter_entries_after(r, index_key, max_score, last_key, batch_size):
+    """Yields (key, score) newest first, starting right after `last_key` (at `max_score`).
+
+    Equal scores are ordered by key, descending, so entries sharing the
+    cursor's timestamp are skipped by comparing keys. That still works if
+    `last_key` has been deleted since.
+    """
+    offset = 0
+    while True:
+        entries = r.zrevrangebyscore(index_key, max_score, '-inf', start=offset, num=batch_size, withscores=True)
+        if not entries:
+            return
+        offset += len(entries)
+        for key, score in entries:
+            key, score = _as_str(key), int(score)
+            if last_key is not None and score == max_score and key >= last_key:
+                continue
+            yield key, score
+
+
+def _get_summaries(r, collection, keys):
+    """Returns the summaries of `keys`, computing (and storing) any that are missing."""
+    summaries = r.hmget(collection.summaries_key, keys)
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    if missing:
+        pipe = r.pipeline(transaction=False)
+        for i in missing:
+            pipe.hmget(keys[i], 'topic', 'timestamp', 'xml')
+        computed = {}
+        for i, fields in zip(missing, pipe.execute()):
+            if fields[2] is not None:
+                computed[keys[i]] = json.dumps(_summarize_fields(collection, fields))
+            summaries[i] = computed.get(keys[i])
+        if computed:
+            r.hset(collection.summaries_key, mapping=computed)
+    return [json.loads(summary) if summary else None for summary in summaries]
+
+
+def get_item_page(r, collection, cursor=None, limit=20, topic=None, batch_size=100):
+    """Returns (summaries, next_cursor) for up to `limit` items older than `cursor`, newest first.
+
+    The cursor is '<timestamp>:<id>': the timestamp and key index of the last
+    item returned, so pages stay stable when items are saved or deleted in
+    between. `topic` keeps only items with that topic (case-insensitive),
+    read from the topic's own index. next_cursor is None on the last page.
+    """
+    ensure_collection(r, collection)
+    max_score, last_key = _parse_cursor(collection, cursor)
+    index_key = collection.topic_index_key(topic) if topic else collection.index_key
+    entries = _iter_entries_after(r, index_key, max_score, last_key, batch_size)
+    summaries = []
+    last = None
+
+    while len(summaries) < limit:
+        batch = list(itertools.islice(entries, min(batch_size, limit - len(summaries))))
+        if not batch:
+            return summaries, None
+        keys = [key for key, _ in batch]
+        for (key, score), summary in zip(batch, _get_summaries(r, collection, keys)):
+            if summary is None:
+                continue # Deleted meanwhile
+            summaries.append({'key': key, **summary})
+            last = (score, key)
+
+    has_more = next(entries, None) is not None
+    return summaries, f"{last[0]}:{_key_index(collection, last[1])}" if has_more else None
+
+
+def count_items(r, collection):
+    return r.zcard(collection.index_key)
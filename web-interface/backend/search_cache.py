@@ -0,0 +1,131 @@
+"""Redis cache for /api/materials/search results.
+
+Entries are keyed by a SHA-256 of the normalized query plus the request
+options (limit, fields, preview) and store the hydrated materials together
+with the corpus generation they were computed at. The generation is a
+counter bumped whenever a document is added, changed, renamed or deleted;
+a lookup reads it in the same round trip as the entry and treats entries
+from an older generation as misses, so invalidation is a single INCR.
+Entries expire after SEARCH_CACHE_TTL_SECONDS and the cache is capped at
+SEARCH_CACHE_MAX_ENTRIES, evicting the least recently used results first.
+"""
+import hashlib
+import json
+import time
+import unicodedata
+
+from metrics import register_collector
+
+SEARCH_CACHE_PREFIX = "cache:search:"
+SEARCH_CACHE_LRU_KEY = "cache:search-lru"
+SEARCH_CACHE_STATS_KEY = "stats:search-cache"
+CORPUS_GENERATION_KEY = "gen:brasov-cursuri"
+SEARCH_CACHE_TTL_SECONDS = 15 * 60
+SEARCH_CACHE_MAX_ENTRIES = 10000
+
+
+def _as_str(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def normalize_query(query):
+    return unicodedata.normalize('NFC', ' '.join(query.split())).casefold()
+
+
+def _cache_id(query, variant):
+    return hashlib.sha256(f"{normalize_query(query)}\0{variant}".encode('utf-8')).hexdigest()
+
+
+def bump_corpus_generation(r):
+    """Invalidates every cached search result."""
+    return r.incr(CORPUS_GENERATION_KEY)
+
+
+def get_corpus_generation(r):
+    """Returns the current corpus generation (0 before the first change)."""
+    return int(r.get(CORPUS_GENERATION_KEY) or 0)
+
+
+def get_cached_search(r, query, variant):
+    """Returns (materials or None, generation). Counts the hit or miss.
+
+    Pass the returned generation to store_search so a result computed while
+    the corpus changed is not cached as current.
+    """
+    started = time.perf_counter()
+    cache_id = _cache_id(query, variant)
+    key = SEARCH_CACHE_PREFIX + cache_id
+    generation, cached = r.mget(CORPUS_GENERATION_KEY, key)
+    generation = int(generation or 0)
+
+    materials = None
+    if cached is not None:
+        entry = json.loads(cached)
+        if entry['generation'] == generation:
+            materials = entry['materials']
+
+    pipe = r.pipeline(transaction=False)
+    if materials is not None:
+        pipe.hincrby(SEARCH_CACHE_STATS_KEY, 'hits', 1)
+        pipe.hincrbyfloat(SEARCH_CACHE_STATS_KEY, 'hit_seconds', time.perf_counter() - started)
+        pipe.zadd(SEARCH_CACHE_LRU_KEY, {cache_id: time.time()})
+    else:
+        pipe.hincrby(SEARCH_CACHE_STATS_KEY, 'misses', 1)
+    pipe.execute()
+    return materials, generation
+
+
+def store_search(r, query, variant, materials, generation, search_seconds):
+    """Caches the materials of a search computed at `generation` and records how long it took."""
+    cache_id = _cache_id(query, variant)
+    entry = json.dumps({'generation': generation, 'materials': materials}, separators=(',', ':'))
+    pipe = r.pipeline(transaction=False)
+    pipe.set(SEARCH_CACHE_PREFIX + cache_id, entry, ex=SEARCH_CACHE_TTL_SECONDS)
+    pipe.zadd(SEARCH_CACHE_LRU_KEY, {cache_id: time.time()})
+    pipe.hincrby(SEARCH_CACHE_STATS_KEY, 'computed', 1)
+    pipe.hincrbyfloat(SEARCH_CACHE_STATS_KEY, 'search_seconds', search_seconds)
+    pipe.zcard(SEARCH_CACHE_LRU_KEY)
+    size = pipe.execute()[-1]
+
+    # Evict least recently used entries beyond the cap
+    excess = size - SEARCH_CACHE_MAX_ENTRIES
+    if excess > 0:
+        evicted = r.zpopmin(SEARCH_CACHE_LRU_KEY, excess)
+        if evicted:
+            r.delete(*[SEARCH_CACHE_PREFIX + _as_str(member) for member, _ in evicted])
+
+
+def get_stats(r):
+    """Returns hits, misses, the hit ratio and the search time hits have saved.
+
+    Saved time is estimated as hits * (average uncached search - average hit).
+    """
+    raw = r.hgetall(SEARCH_CACHE_STATS_KEY)
+    raw = {_as_str(k): float(v) for k, v in raw.items()}
+    hits = raw.get('hits', 0)
+    misses = raw.get('misses', 0)
+    computed = raw.get('computed', 0)
+    average_search = raw.get('search_seconds', 0) / computed if computed else 0
+    average_hit = raw.get('hit_seconds', 0) / hits if hits else 0
+    return {
+        'hits': int(hits),
+        'misses': int(misses),
+        'hit_ratio': hits / (hits + misses) if hits + misses else 0,
+        'search_seconds': raw.get('search_seconds', 0),
+        'saved_seconds': hits * max(average_search - average_hit, 0),
+    }
+
+
+def register_metrics(get_client):
+    """Exposes the shared cache counters on /metrics, read through `get_client()` at scrape time."""
+
+    @register_collector
+    def collect_search_cache_stats():
+        stats = get_stats(get_client())
+        return [
+            ('search_cache_hits_total', 'counter', 'Material searches served from the cache.', [({}, stats['hits'])]),
+            ('search_cache_misses_total', 'counter', 'Material searches that ran the full search.', [({}, stats['misses'])]),
+            ('search_cache_hit_ratio', 'gauge', 'Share of material searches served from the cache.', [({}, stats['hit_ratio'])]),
+            ('search_uncached_seconds_total', 'counter', 'Time spent on uncached material searches.', [({}, stats['search_seconds'])]),
+            ('search_cache_saved_seconds_total', 'counter', 'Estimated search time saved by cache hits.', [({}, stats['saved_seconds'])]),
+        ]
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip('requests')
+
+import flowise_client  # noqa: E402
+from flowise_client import CircuitBreaker  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(flowise_client, 'time', clock)
+    return clock
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.allow() is True
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert breaker.allow() is False
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+
+
+def test_half_open_lets_a_single_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == 'half-open'
+    assert breaker.allow() == 'trial'
+    assert breaker.allow() is False # Only one probe at a time
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow() is True
+
+
+def test_failed_trial_reopens_for_a_full_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow() == 'trial'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    clock.now += 29
+    assert breaker.allow() is False
+    clock.now += 1
+    assert breaker.allow() == 'trial'
+
+
+def test_released_trial_lets_another_one_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow() == 'trial'
+    breaker.release_trial()
+    assert breaker.allow() == 'trial'
@@ -0,0 +1,80 @@
+import pytest
+
+from content_index import CONTENT_INDEX_KEY, content_sha256
+from ingest import chunk_text, ingest_texts
+
+PARAGRAPHS = [
+    "Prima lecție descrie limitele de funcții. Limitele se calculează pe puncte.",
+    "A doua lecție tratează derivatele. Derivata măsoară variația.",
+    "A treia lecție introduce integralele.",
+]
+TEXT = '\n\n'.join(PARAGRAPHS)
+
+
+def test_short_text_is_one_chunk():
+    assert chunk_text('  Un singur paragraf.  ', 100) == ['Un singur paragraf.']
+
+
+def test_empty_text_has_no_chunks():
+    assert chunk_text('', 100) == []
+    assert chunk_text('\n\n  \n\n', 100) == []
+
+
+@pytest.mark.parametrize('chunk_chars', [20, 40, 80, 200])
+def test_chunks_fit_and_keep_every_word(chunk_chars):
+    chunks = chunk_text(TEXT, chunk_chars)
+    assert all(len(chunk) <= chunk_chars for chunk in chunks)
+    assert ' '.join(chunks).split() == TEXT.split()
+
+
+def test_paragraphs_are_packed_together_up_to_the_limit():
+    chunks = chunk_text(TEXT, len(PARAGRAPHS[0]) + 1 + len(PARAGRAPHS[1]))
+    assert chunks == [f"{PARAGRAPHS[0]} {PARAGRAPHS[1]}", PARAGRAPHS[2]]
+
+
+def test_oversized_word_is_cut():
+    assert chunk_text('x' * 25, 10) == ['x' * 10, 'x' * 10, 'x' * 5]
+
+
+def test_overlap_repeats_the_previous_tail_at_a_word_boundary():
+    chunks = chunk_text(TEXT, 60, overlap=15)
+    assert all(len(chunk) <= 60 for chunk in chunks)
+    assert len(chunks) > 1
+    for previous, chunk in zip(chunks, chunks[1:]):
+        # The chunk opens with whole words (at most 15 characters) that end the previous chunk
+        assert any(chunk[end] == ' ' and previous.endswith(chunk[:end]) for end in range(1, 16))
+
+
+class FakePipeline:
+    def __init__(self, existing):
+        self.existing = existing
+        self.results = []
+
+    def hexists(self, name, field):
+        self.results.append(name == CONTENT_INDEX_KEY and field in self.existing)
+
+    def execute(self):
+        return self.results
+
+
+class FakeRedis:
+    def __init__(self, existing=()):
+        self.existing = set(existing)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.existing)
+
+
+def test_ingest_texts_dedupes_and_reports_statuses():
+    upserted = []
+
+    def upsert(text):
+        upserted.append(text)
+        return 'fail' not in text
+
+    r = FakeRedis(existing={content_sha256('Deja existent.')})
+    results = ingest_texts(r, ['Text nou.', 'Deja existent.', 'Text nou.', '', 'Va fail.'], upsert, workers=2)
+    statuses = [item['status'] for item in results['items']]
+    assert statuses == ['stored', 'duplicate', 'duplicate', 'empty', 'failed']
+    assert sorted(upserted) == ['Text nou.', 'Va fail.'] # Each new chunk is sent once
+    assert (results['stored'], results['duplicates'], results['failed']) == (1, 2, 1)
@@ -0,0 +1,81 @@
+import naming
+from naming import TokenBucket, _name_with_retry
+
+
+class FakeClock:
+    """Stands in for the `time` module: sleeping advances the clock instantly."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_burst_up_to_capacity_without_waiting(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(naming, 'time', clock)
+    bucket = TokenBucket(rate=2, capacity=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.slept == []
+
+
+def test_waits_for_the_next_token_once_empty(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(naming, 'time', clock)
+    bucket = TokenBucket(rate=2, capacity=1)
+    bucket.acquire()
+    bucket.acquire()
+    assert sum(clock.slept) == 0.5
+
+
+def test_refill_is_capped_at_capacity(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(naming, 'time', clock)
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 60
+    for _ in range(2):
+        bucket.acquire()
+    assert clock.slept == []
+    bucket.acquire()
+    assert sum(clock.slept) == 1
+
+
+def test_name_with_retry_only_spends_tokens_through_name_fn(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(naming, 'time', clock)
+    bucket = TokenBucket(rate=1, capacity=1)
+    calls = []
+
+    def cached_name(content, rate_limit):
+        calls.append(content)
+        return 'Cached name' # Served from the cache: never calls rate_limit
+
+    for _ in range(5):
+        assert _name_with_retry(cached_name, 'text', bucket, max_retries=2) == 'Cached name'
+    assert len(calls) == 5
+    assert bucket.tokens == 1
+
+
+def test_name_with_retry_gives_up_after_max_retries(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(naming, 'time', clock)
+    monkeypatch.setattr(naming.random, 'random', lambda: 0.5)
+    bucket = TokenBucket(rate=100, capacity=10)
+    attempts = []
+
+    def failing_name(content, rate_limit):
+        rate_limit()
+        attempts.append(content)
+        return None
+
+    assert _name_with_retry(failing_name, 'text', bucket, max_retries=2) is None
+    assert len(attempts) == 3
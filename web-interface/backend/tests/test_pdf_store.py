@@ -0,0 +1,63 @@
+import pytest
+
+from pdf_store import StoredPdf, select_byte_range
+
+SIZE = 1000
+
+
+def byte_range(header, size=SIZE, range_valid=True):
+    http = pytest.importorskip('werkzeug.http') # Parses the header as Flask does
+    return select_byte_range(http.parse_range_header(header), size, range_valid)
+
+
+def test_no_range_serves_the_whole_file():
+    assert select_byte_range(None, SIZE) == (0, SIZE, 200)
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes=0-99', (0, 100, 206)),
+    ('bytes=900-', (900, SIZE, 206)),
+    ('bytes=-100', (900, SIZE, 206)),
+    ('bytes=990-2000', (990, SIZE, 206)), # End clamped to the file size
+])
+def test_single_range(header, expected):
+    assert byte_range(header) == expected
+
+
+def test_range_past_the_end_is_unsatisfiable():
+    assert byte_range('bytes=1000-1100') is None
+
+
+def test_multi_range_serves_the_whole_file():
+    assert byte_range('bytes=0-9,20-29') == (0, SIZE, 200)
+
+
+def test_stale_if_range_serves_the_whole_file():
+    assert byte_range('bytes=0-99', range_valid=False) == (0, SIZE, 200)
+
+
+def test_malformed_range_is_ignored():
+    assert byte_range('bytes=abc') == (0, SIZE, 200)
+
+
+class FakeBlob:
+    def __init__(self, data):
+        self.data = data
+        self.size = len(data)
+        self.reads = []
+        self.closed = False
+
+    def read(self, start, end):
+        self.reads.append((start, end))
+        return self.data[start:end]
+
+    def close(self):
+        self.closed = True
+
+
+def test_iter_chunks_reads_only_the_range_and_closes_the_blob():
+    blob = FakeBlob(bytes(range(256)) * 4)
+    pdf = StoredPdf(blob, etag='x', modified=None)
+    assert b''.join(pdf.iter_chunks(100, 350, 100)) == blob.data[100:350]
+    assert blob.reads == [(100, 200), (200, 300), (300, 350)]
+    assert blob.closed
@@ -0,0 +1,102 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from quiz_format import (
+    QUIZ_SCHEMA_VERSION, QuizStreamParser, decode_parsed_quiz, encode_parsed_quiz, iter_quiz_events,
+    parse_quiz_xml,
+)
+
+QUIZ = """Here is your quiz:
+<test>
+  <topic>Ecuații diferențiale</topic>
+  <question id="1" type="single">
+    <text>Ce ordin are y'' + y = 0?</text>
+    <options>
+      <option correct="false">1</option>
+      <option correct="TRUE">2</option>
+    </options>
+  </question>
+  <question id="2" type="multiple">
+    <text>Alegeți soluțiile</text>
+    <options>
+      <option correct="true">sin x</option>
+      <option>cos x</option>
+      <option correct="true"></option>
+    </options>
+  </question>
+</test>
+Good luck!"""
+
+
+def test_parse_quiz_xml():
+    parsed = parse_quiz_xml(QUIZ)
+    assert parsed['topic'] == 'Ecuații diferențiale'
+    assert parsed['questions'] == [
+        {'id': '1', 'type': 'single', 'text': "Ce ordin are y'' + y = 0?",
+         'options': [{'text': '1', 'correct': False}, {'text': '2', 'correct': True}]},
+        {'id': '2', 'type': 'multiple', 'text': 'Alegeți soluțiile',
+         'options': [{'text': 'sin x', 'correct': True}, {'text': 'cos x', 'correct': False},
+                     {'text': '', 'correct': True}]},
+    ]
+
+
+def test_parse_quiz_xml_without_test_wrapper():
+    parsed = parse_quiz_xml('<quiz><topic>T</topic><question id="1"><text>Q</text></question></quiz>')
+    assert parsed['topic'] == 'T'
+    assert parsed['questions'] == [{'id': '1', 'type': '', 'text': 'Q', 'options': []}]
+
+
+def test_parse_quiz_xml_rejects_malformed_xml():
+    with pytest.raises(ET.ParseError):
+        parse_quiz_xml('<test><question><text>Q</question></test>')
+
+
+def test_parsed_quiz_round_trip():
+    parsed = parse_quiz_xml(QUIZ)
+    fields = encode_parsed_quiz(parsed)
+    assert fields['schema_version'] == str(QUIZ_SCHEMA_VERSION)
+    assert 'ț' in fields['parsed'] # Stored as UTF-8, not \\u escapes
+    assert decode_parsed_quiz(fields['parsed'], fields['schema_version']) == parsed
+    assert decode_parsed_quiz(fields['parsed'].encode('utf-8'), fields['schema_version'].encode()) == parsed
+
+
+@pytest.mark.parametrize('parsed_json, schema_version', [
+    (None, str(QUIZ_SCHEMA_VERSION)),
+    ('{}', None),
+    ('{}', str(QUIZ_SCHEMA_VERSION + 1)),
+])
+def test_decode_parsed_quiz_misses(parsed_json, schema_version):
+    assert decode_parsed_quiz(parsed_json, schema_version) is None
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 64, len(QUIZ)])
+def test_stream_parser_matches_the_one_shot_parse_for_any_chunking(chunk_size):
+    chunks = [QUIZ[i:i + chunk_size] for i in range(0, len(QUIZ), chunk_size)]
+    events = list(iter_quiz_events(chunks))
+    parsed = parse_quiz_xml(QUIZ)
+    assert events == [('topic', parsed['topic'])] + [('question', q) for q in parsed['questions']]
+
+
+def test_stream_parser_emits_each_question_as_soon_as_it_closes():
+    parser = QuizStreamParser()
+    first_end = QUIZ.index('</question>') + len('</question>')
+    assert parser.feed(QUIZ[:first_end - 1]) == [('topic', 'Ecuații diferențiale')]
+    events = parser.feed(QUIZ[first_end - 1:first_end])
+    assert [event for event, _ in events] == ['question']
+    assert events[0][1]['id'] == '1'
+
+
+def test_stream_parser_ignores_text_after_the_closing_tag():
+    parser = QuizStreamParser()
+    parser.feed('<test><question id="1"><text>Q</text></question></te')
+    parser.feed('st> trailing <unclosed')
+    assert parser.feed('more garbage') == []
+    assert parser.close() == []
+
+
+def test_stream_parser_rejects_malformed_xml():
+    parser = QuizStreamParser()
+    with pytest.raises(ET.ParseError):
+        parser.feed('<test><question><text>Q</question>')
+        parser.close()
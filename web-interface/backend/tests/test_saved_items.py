@@ -0,0 +1,66 @@
+import pytest
+
+from saved_items import QUIZZES, _iter_entries_after, _parse_cursor
+
+
+class FakeSortedSet:
+    """Just enough of ZREVRANGEBYSCORE for _iter_entries_after."""
+
+    def __init__(self, entries):
+        self.entries = entries # {key: score}
+
+    def zrevrangebyscore(self, name, max_score, min_score, start, num, withscores):
+        ordered = sorted(self.entries.items(), key=lambda item: (item[1], item[0]), reverse=True)
+        ordered = [(key, score) for key, score in ordered if max_score == '+inf' or score <= max_score]
+        return ordered[start:start + num]
+
+
+def test_parse_cursor():
+    assert _parse_cursor(QUIZZES, None) == ('+inf', None)
+    assert _parse_cursor(QUIZZES, '1700000000:42') == (1700000000, 'doc:brasov-tests:42')
+
+
+@pytest.mark.parametrize('cursor', ['abc', '1700000000', '1700000000:', '1700000000:x', 'x:42'])
+def test_parse_cursor_rejects_malformed(cursor):
+    with pytest.raises(ValueError):
+        _parse_cursor(QUIZZES, cursor)
+
+
+def test_entries_sharing_the_cursor_timestamp_are_not_skipped_or_repeated():
+    r = FakeSortedSet({'doc:brasov-tests:1': 10, 'doc:brasov-tests:2': 20, 'doc:brasov-tests:3': 20,
+                       'doc:brasov-tests:4': 20, 'doc:brasov-tests:5': 30})
+    first = list(_iter_entries_after(r, 'idx', '+inf', None, batch_size=2))[:2]
+    assert first == [('doc:brasov-tests:5', 30), ('doc:brasov-tests:4', 20)]
+
+    score, last_key = _parse_cursor(QUIZZES, '20:4')
+    rest = list(_iter_entries_after(r, 'idx', score, last_key, batch_size=2))
+    assert rest == [('doc:brasov-tests:3', 20), ('doc:brasov-tests:2', 20), ('doc:brasov-tests:1', 10)]
+
+
+def test_cursor_still_works_after_its_item_is_deleted():
+    r = FakeSortedSet({'doc:brasov-tests:1': 10, 'doc:brasov-tests:3': 20})
+    score, last_key = _parse_cursor(QUIZZES, '20:4')
+    assert list(_iter_entries_after(r, 'idx', score, last_key, batch_size=10)) == [
+        ('doc:brasov-tests:3', 20), ('doc:brasov-tests:1', 10)]
+
+
+def test_get_item_page_walks_every_item_once():
+    fakeredis = pytest.importorskip('fakeredis')
+    from saved_items import get_item_page, save_item
+
+    r = fakeredis.FakeRedis(decode_responses=True)
+    for i in range(7):
+        save_item(r, QUIZZES, {'topic': 'Algebra' if i % 2 else 'Geometrie', 'xml': '<question/>'},
+                  timestamp=1000 + i // 3)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = get_item_page(r, QUIZZES, cursor=cursor, limit=2)
+        seen += [item['key'] for item in page]
+        if cursor is None:
+            break
+    assert seen == [f'doc:brasov-tests:{i}' for i in range(7, 0, -1)]
+
+    page, cursor = get_item_page(r, QUIZZES, limit=10, topic=' algebra ')
+    assert [item['key'] for item in page] == ['doc:brasov-tests:6', 'doc:brasov-tests:4', 'doc:brasov-tests:2']
+    assert cursor is None
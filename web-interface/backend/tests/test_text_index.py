@@ -0,0 +1,65 @@
+import pytest
+
+from text_index import (
+    CODE_QUERY_KEYWORD_WEIGHT, RRF_K, BM25Index, fold_text, is_code_query, keyword_weight,
+    reciprocal_rank_fusion, tokenize,
+)
+
+
+def test_fold_and_tokenize():
+    assert fold_text('Ecuații Diferențiale') == 'ecuatii diferentiale'
+    assert tokenize('Teorema lui Lagrange și a lui Cauchy') == ['teorema', 'lui', 'lagrange', 'lui', 'cauchy']
+
+
+def test_rrf_scores_and_order():
+    fused = reciprocal_rank_fusion([['a', 'b', 'c'], ['c', 'a']], limit=10)
+    scores = dict(fused)
+    assert [key for key, _ in fused] == ['a', 'c', 'b']
+    assert scores['a'] == pytest.approx(1 / (RRF_K + 1) + 1 / (RRF_K + 2))
+    assert scores['b'] == pytest.approx(1 / (RRF_K + 2))
+
+
+def test_rrf_limit_and_empty_rankings():
+    assert reciprocal_rank_fusion([['a', 'b', 'c'], []], limit=2) == reciprocal_rank_fusion([['a', 'b', 'c']], limit=2)
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+def test_weighted_rrf_lets_the_keyword_ranking_win():
+    vector = ['v1', 'v2', 'v3']
+    keyword = ['k1', 'code-doc']
+    plain = [key for key, _ in reciprocal_rank_fusion([vector, keyword])]
+    assert plain.index('v1') < plain.index('code-doc')
+    weighted = [key for key, _ in reciprocal_rank_fusion([vector, keyword], weights=[1.0, CODE_QUERY_KEYWORD_WEIGHT])]
+    assert weighted[:2] == ['k1', 'code-doc']
+
+
+@pytest.mark.parametrize('query, is_code', [
+    ('MI00042', True),
+    ('cursul MI00042 de analiza', True),
+    ('ecuatii diferentiale', False),
+    ('capitolul 3', False), # A number on its own is not an identifier
+    ('', False),
+])
+def test_code_query_detection(query, is_code):
+    assert is_code_query(query) is is_code
+    assert keyword_weight(query) == (CODE_QUERY_KEYWORD_WEIGHT if is_code else 1.0)
+
+
+def test_bm25_finds_folded_terms_and_ranks_the_rarer_match_first():
+    index = BM25Index()
+    index.add('doc:1', 'Ecuații diferențiale de ordinul întâi')
+    index.add('doc:2', 'Ecuații algebrice și sisteme')
+    index.add('doc:3', 'Integrale definite')
+    assert [key for key, _ in index.search('ecuatii diferentiale')] == ['doc:1', 'doc:2']
+    assert index.search('topologie') == []
+
+
+def test_bm25_update_and_remove():
+    index = BM25Index()
+    index.add('doc:1', 'Integrale definite', sha='a')
+    assert index.add('doc:1', 'ignored', sha='a') is False # Same content hash: unchanged
+    index.add('doc:1', 'Serii de puteri', sha='b')
+    assert index.search('integrale') == []
+    assert [key for key, _ in index.search('serii')] == ['doc:1']
+    assert index.remove('doc:1') is True
+    assert len(index) == 0 and index.search('serii') == []
@@ -0,0 +1,170 @@
+"""Local keyword (BM25) index over the course documents, and rank fusion.
+
+Semantic search misses exact course codes, theorem names and terms typed
+without diacritics, so search also ranks documents by BM25 over an
+in-process inverted index. Text is folded (lowercased, diacritics stripped)
+before tokenizing, so 'ecuatii' matches 'Ecuații'. The index is built from
+Redis on first use and resynced whenever the corpus generation changes;
+it is small enough (postings of a course corpus) not to need persisting.
+
+Keyword and vector rankings are merged with reciprocal rank fusion, which
+only looks at ranks and so needs no calibration between the two scores.
+Equal weights let a vector ranking that misses an exact code push the one
+document holding it down, so queries containing an identifier (letters and
+digits, e.g. 'MI00042') weight the keyword ranking CODE_QUERY_KEYWORD_WEIGHT
+times higher.
+"""
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from content_index import iter_changed_documents
+from metrics import Histogram
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60 # Damping constant of reciprocal rank fusion; larger values flatten the top ranks
+CODE_QUERY_KEYWORD_WEIGHT = 4.0 # Keyword ranking weight for identifier-like queries (vector weight is 1)
+
+# Very common Romanian and English words that only add noise to the postings
+STOPWORDS = frozenset("""
+a al ale ai am ar are as au ca care ce cu cum da dar de deci din doar dupa e este fi fie iar in
+intr intre la le lor mai nu o ori pe pentru prin sa se si sau sunt un una unei unui
+an and are as at be by for from in is it of on or the to with
+""".split())
+
+KEYWORD_SEARCH_SECONDS = Histogram('keyword_search_seconds', 'BM25 keyword index query latency.')
+
+_TOKEN = re.compile(r'\w+')
+
+
+def _as_str(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def fold_text(text):
+    """Lowercases and strips diacritics ('Ecuații' -> 'ecuatii')."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """Folded word tokens of `text`, without stopwords."""
+    return [token for token in _TOKEN.findall(fold_text(text)) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Inverted index of document keys scored with Okapi BM25."""
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings = {} # term -> {key: term frequency}
+        self._terms = {} # key -> Counter of its terms, to undo them on update/remove
+        self._lengths = {} # key -> number of tokens
+        self._shas = {} # key -> content SHA-256 of the indexed text
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._terms)
+
+    def _remove(self, key):
+        terms = self._terms.pop(key, None)
+        if terms is None:
+            return False
+        for term in terms:
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(key)
+        self._shas.pop(key, None)
+        return True
+
+    def add(self, key, content, sha=None):
+        """Indexes (or re-indexes) a document; a no-op if its content is unchanged."""
+        key = _as_str(key)
+        content = _as_str(content)
+        if sha is not None and self._shas.get(key) == sha:
+            return False
+        terms = Counter(tokenize(content))
+        with self._lock:
+            self._remove(key)
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[key] = frequency
+            self._terms[key] = terms
+            self._lengths[key] = sum(terms.values())
+            self._total_length += self._lengths[key]
+            if sha is not None:
+                self._shas[key] = sha
+        return True
+
+    def remove(self, key):
+        with self._lock:
+            return self._remove(_as_str(key))
+
+    def sync(self, r, keys):
+        """Indexes new or changed documents among `keys` and drops the rest. Returns (added, removed)."""
+        keys = [_as_str(key) for key in keys]
+        added = 0
+        for key, content, sha in iter_changed_documents(r, keys, self._shas):
+            added += self.add(key, content, sha)
+        current = set(keys)
+        removed = [key for key in list(self._terms) if key not in current]
+        for key in removed:
+            self.remove(key)
+        return added, len(removed)
+
+    def search(self, text, limit=10):
+        """Returns up to `limit` (key, score) pairs, best first."""
+        started = time.perf_counter()
+        query_terms = set(tokenize(text))
+        scores = {}
+        with self._lock:
+            count = len(self._terms)
+            if not count or not query_terms:
+                return []
+            average_length = self._total_length / count
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[key] / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        results = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        KEYWORD_SEARCH_SECONDS.observe(time.perf_counter() - started)
+        return results
+
+
+def is_code_query(text):
+    """True if `text` contains an identifier-like token: letters and digits, like a course code."""
+    return any(
+        any(char.isdigit() for char in token) and any(char.isalpha() for char in token)
+        for token in _TOKEN.findall(text)
+    )
+
+
+def keyword_weight(text):
+    """Weight of the keyword ranking when fusing it with the vector ranking for query `text`."""
+    return CODE_QUERY_KEYWORD_WEIGHT if is_code_query(text) else 1.0
+
+
+def reciprocal_rank_fusion(rankings, limit=10, k=RRF_K, weights=None):
+    """Merges ranked key lists into one list of (key, score), best first.
+
+    Each key scores sum(weight / (k + rank)) over the rankings it appears in;
+    `weights` (parallel to `rankings`) defaults to 1 for every ranking.
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
@@ -0,0 +1,304 @@
+"""Local in-process vector index over the course documents.
+
+A fallback (or replacement) for the remote Flowise vector search: every
+document's content is embedded with a local embedder and kept as a row of a
+float32 matrix, searched brute force with one matrix-vector product (exact,
+and fast enough for a course corpus of a few tens of thousands of chunks).
+
+The matrix is persisted as a .npy file and loaded with mmap, so gunicorn
+workers share the pages through the OS cache. Incremental updates go to a
+small in-memory delta; replaced or deleted rows are masked
+until the next save() compacts them away. Writes are atomic: the vectors go
+to a new file and meta.json, which names the current file, is swapped in
+with os.replace. Saves and loads also take a flock on LOCK_FILE (exclusive
+and shared), so one worker's save never deletes the file another worker has
+just read from meta.json and is about to open.
+"""
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from content_index import content_sha256, iter_changed_documents
+from metrics import Histogram
+from text_index import tokenize
+
+SYNC_BATCH_SIZE = 200 # Documents embedded per call while syncing
+META_FILE = "meta.json"
+LOCK_FILE = ".lock"
+
+LOCAL_SEARCH_SECONDS = Histogram('local_vector_search_seconds', 'Local vector index query latency.')
+
+
+def _as_str(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class HashingEmbedder:
+    """Feature-hashed words and character trigrams; needs no model and is stable across processes."""
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        for word in tokenize(text):
+            yield word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text or ''):
+                digest = zlib.crc32(feature.encode('utf-8'))
+                # One bit of the hash picks the sign so collisions tend to cancel out
+                vectors[row, digest % self.dim] += weight if digest & 0x80000000 else -weight
+        # Sublinear term weighting, then unit length so dot product is cosine similarity
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return (vectors / norms).astype(np.float32)
+
+
+class SentenceTransformerEmbedder:
+    """Embeds with a local sentence-transformers model (optional dependency)."""
+
+    def __init__(self, model_name):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise RuntimeError("sentence-transformers is not installed; use the 'hashing' embedder "
+                               "or pip install sentence-transformers")
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_name}"
+
+    def embed(self, texts):
+        return self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def create_embedder(spec):
+    """Creates an embedder from a spec: 'hashing', 'hashing:<dim>' or 'sentence-transformers:<model>'."""
+    kind, _, arg = spec.partition(':')
+    if kind == 'hashing':
+        return HashingEmbedder(int(arg) if arg else 512)
+    if kind == 'sentence-transformers':
+        return SentenceTransformerEmbedder(arg or 'paraphrase-multilingual-MiniLM-L12-v2')
+    raise ValueError(f"Unknown embedder: {spec}")
+
+
+class LocalVectorIndex:
+    """Brute-force cosine index of document keys, with an mmap-loaded base and an in-memory delta."""
+
+    def __init__(self, directory, embedder):
+        self.directory = Path(directory)
+        self.embedder = embedder
+        self._lock = threading.RLock()
+        self._meta_mtime = None # meta.json as of the last load() or save() by this process
+        self._reset()
+
+    def _reset(self):
+        self._base = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._keys = [] # Row -> key, base rows first, then delta rows
+        self._delta = []
+        self._delta_matrix = None # Stacked delta, rebuilt lazily after changes
+        self._live = np.zeros(0, dtype=bool)
+        self._rows = {} # key -> row
+        self._shas = {} # key -> content SHA-256 of the embedded text
+        self.dirty = 0 # Changes since the last save
+
+    def __len__(self):
+        return len(self._rows)
+
+    # --- Persistence ---
+
+    @contextmanager
+    def _file_lock(self, shared):
+        """Holds a flock on the index directory, shared for readers and exclusive for save()."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / LOCK_FILE, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self):
+        """Loads the saved index (memory-mapped). Returns False if there is none for this embedder."""
+        meta_path = self.directory / META_FILE
+        if not meta_path.exists():
+            return False
+        with self._file_lock(shared=True):
+            meta_mtime = meta_path.stat().st_mtime_ns
+            meta = json.loads(meta_path.read_text())
+            if meta.get('embedder') != self.embedder.name:
+                print(f"Ignoring local vector index built with {meta.get('embedder')}, expected {self.embedder.name}")
+                return False
+            # Once mapped, the file may be unlinked by a later save
+            base = np.load(self.directory / meta['vectors'], mmap_mode='r')
+        with self._lock:
+            self._reset()
+            self._base = base
+            self._keys = list(meta['keys'])
+            self._live = np.ones(len(self._keys), dtype=bool)
+            self._rows = {key: row for row, key in enumerate(self._keys)}
+            self._shas = dict(zip(meta['keys'], meta['shas']))
+            self._meta_mtime = meta_mtime
+        return True
+
+    def changed_on_disk(self):
+        """True if another process saved the index since this one last loaded or saved it."""
+        try:
+            return (self.directory / META_FILE).stat().st_mtime_ns != self._meta_mtime
+        except FileNotFoundError:
+            return False
+
+    def save(self):
+        """Writes the live rows to a new vectors file, swaps meta.json and reopens the file with mmap."""
+        with self._lock:
+            live_rows = np.flatnonzero(self._live)
+            matrix = self._matrix()[live_rows] if len(live_rows) else self._base[:0]
+            keys = [self._keys[row] for row in live_rows]
+            shas = [self._shas[key] for key in keys]
+            dirty = self.dirty
+
+        vectors_name = f"vectors-{int(time.time())}-{uuid.uuid4().hex[:8]}.npy"
+        with self._file_lock(shared=False):
+            np.save(self.directory / vectors_name, np.ascontiguousarray(matrix, dtype=np.float32))
+            meta = {'embedder': self.embedder.name, 'dim': self.embedder.dim, 'vectors': vectors_name,
+                    'keys': keys, 'shas': shas}
+            tmp_meta = self.directory / f"{META_FILE}.{os.getpid()}.tmp"
+            tmp_meta.write_text(json.dumps(meta))
+            os.replace(tmp_meta, self.directory / META_FILE)
+            meta_mtime = (self.directory / META_FILE).stat().st_mtime_ns
+
+            # No loader is between reading meta.json and mapping its file while we hold
+            # the lock; files already mapped by other workers stay readable on POSIX
+            for path in self.directory.glob('vectors-*.npy'):
+                if path.name != vectors_name:
+                    path.unlink(missing_ok=True)
+
+            base = np.load(self.directory / vectors_name, mmap_mode='r')
+        with self._lock:
+            self._meta_mtime = meta_mtime
+            # Keep changes that arrived while writing
+            if self.dirty == dirty:
+                self._reset()
+                self._base = base
+                self._keys = keys
+                self._live = np.ones(len(keys), dtype=bool)
+                self._rows = {key: row for row, key in enumerate(keys)}
+                self._shas = dict(zip(keys, shas))
+            else:
+                self.dirty -= dirty
+        return len(keys)
+
+    # --- Updates ---
+
+    def _matrix(self):
+        if self._delta_matrix is None:
+            parts = [self._base] + ([np.vstack(self._delta)] if self._delta else [])
+            self._delta_matrix = np.concatenate(parts) if len(parts) > 1 else self._base
+        return self._delta_matrix
+
+    def _append(self, key, sha, vector):
+        previous = self._rows.get(key)
+        if previous is not None:
+            self._live[previous] = False
+        self._rows[key] = len(self._keys)
+        self._keys.append(key)
+        self._shas[key] = sha
+        self._delta.append(vector.reshape(1, -1))
+        self._live = np.append(self._live, True)
+        self._delta_matrix = None
+        self.dirty += 1
+
+    def add(self, key, content):
+        """Indexes (or re-indexes) a document; a no-op if its content is unchanged."""
+        key = _as_str(key)
+        sha = content_sha256(content)
+        if self._shas.get(key) == sha:
+            return False
+        vector = self.embedder.embed([_as_str(content)])[0]
+        with self._lock:
+            self._append(key, sha, vector)
+        return True
+
+    def add_many(self, documents):
+        """Indexes several (key, content) pairs with one embedding call."""
+        documents = [(_as_str(key), _as_str(content)) for key, content in documents]
+        documents = [(key, content) for key, content in documents if self._shas.get(key) != content_sha256(content)]
+        if not documents:
+            return 0
+        vectors = self.embedder.embed([content for _, content in documents])
+        with self._lock:
+            for (key, content), vector in zip(documents, vectors):
+                self._append(key, content_sha256(content), vector)
+        return len(documents)
+
+    def remove(self, key):
+        key = _as_str(key)
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is None:
+                return False
+            self._live[row] = False
+            self._shas.pop(key, None)
+            self.dirty += 1
+        return True
+
+    def sync(self, r, keys, batch_size=SYNC_BATCH_SIZE):
+        """Brings the index in line with the document `keys`: embeds new or changed ones, drops the rest.
+
+        Change detection uses the content-hash index, so only documents whose
+        content differs from what was embedded are read from Redis.
+        Returns (added, removed).
+        """
+        keys = [_as_str(key) for key in keys]
+        added = 0
+        batch = []
+        for key, content, _ in iter_changed_documents(r, keys, self._shas):
+            batch.append((key, content))
+            if len(batch) >= batch_size:
+                added += self.add_many(batch)
+                batch = []
+        if batch:
+            added += self.add_many(batch)
+
+        current = set(keys)
+        removed = [key for key in list(self._rows) if key not in current]
+        for key in removed:
+            self.remove(key)
+        return added, len(removed)
+
+    # --- Queries ---
+
+    def search(self, text, limit=10):
+        """Returns up to `limit` (key, score) pairs, best first."""
+        started = time.perf_counter()
+        query = self.embedder.embed([text])[0]
+        with self._lock:
+            matrix = self._matrix()
+            live = self._live
+            keys = self._keys
+        if not len(keys):
+            return []
+
+        scores = np.asarray(matrix @ query, dtype=np.float32)
+        scores[~live] = -np.inf
+        limit = min(limit, int(live.sum()))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        LOCAL_SEARCH_SECONDS.observe(time.perf_counter() - started)
+        return [(keys[row], float(scores[row])) for row in top]
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { Loader2, RefreshCw, ChevronLeft, ChevronRight, FileText, Clock, Calendar, Trash2, AlertCircle, Zap } from 'lucide-react';
 
@@ -8,6 +8,9 @@ interface Material {
   timestamp: number;
   name?: string;
   key?: string;
+  has_pdf?: boolean;
+  // True when `text` is only the listing preview and the full content must be fetched
+  truncated?: boolean;
 }
 
 interface SyncResultsDeletedKey {
@@ -33,6 +36,9 @@ interface SyncResults {
   named_keys: SyncResultsNamedKey[];
 }
 
+// Number of documents requested per page from /api/materials
+const PAGE_SIZE = 20;
+
 interface MaterialsListProps {
   onMaterialSelect?: (material: Material | null) => void;
   isStudentView?: boolean;
@@ -50,13 +56,19 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
   const [syncingName, setSyncingName] = useState<string | null>(null);
   const [syncingAll, setSyncingAll] = useState(false);
   const [syncResults, setSyncResults] = useState<any>({});
+  const [syncProgress, setSyncProgress] = useState<{ total: number; processed: number; already_named: number; deleted: number } | null>(null);
+  // pageCursors.current[i] is the cursor that loads page i + 1 (null for the first page)
+  const pageCursors = useRef<(number | null)[]>([null]);
+  const selectedKey = useRef<string | null>(null);
 
   const fetchMaterials = async (pageNum: number) => {
     try {
       setLoading(true);
       setError(null);
 
+      const cursor = pageCursors.current[pageNum - 1] ?? null;
       const response = await axios.get('http://localhost:5020/api/materials', {
+        params: { limit: PAGE_SIZE, ...(cursor !== null ? { cursor } : {}) },
         timeout: 10000
       });
 
@@ -72,12 +84,19 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
         timestamp: 0,
         name: doc.name || '',
         key: doc.id || '',
-        has_pdf: doc.has_pdf || false
+        has_pdf: doc.has_pdf || false,
+        truncated: doc.content_truncated || false
       }));
 
       setMaterials(mappedMaterials);
-      setTotalPages(1);
-      setPage(1);
+
+      // Remember where the next page starts so Next can fetch it
+      const nextCursor = response.data.next_cursor ?? null;
+      if (nextCursor !== null) {
+        pageCursors.current[pageNum] = nextCursor;
+      }
+      const total = response.data.total ?? documents.length;
+      setTotalPages(nextCursor !== null ? Math.max(pageNum + 1, Math.ceil(total / PAGE_SIZE)) : pageNum);
 
     } catch (err: any) {
       console.error('Error fetching materials:', err);
@@ -87,6 +106,34 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
     }
   };
 
+  // Listings only carry a content preview; the full text is fetched when a document is opened
+  const selectMaterial = async (material: Material) => {
+    selectedKey.current = material.key || null;
+    onMaterialSelect?.(material);
+
+    if (!material.truncated || !material.key) return;
+
+    try {
+      const response = await axios.get(
+        `http://localhost:5020/api/materials/${encodeURIComponent(material.key)}/content`,
+        { timeout: 10000 }
+      );
+      const fullText = response.data?.document?.content;
+      if (typeof fullText !== 'string') return;
+
+      const fullMaterial = { ...material, text: fullText, truncated: false };
+      setMaterials(prevMaterials =>
+        prevMaterials.map(m => (m.key === material.key ? fullMaterial : m))
+      );
+      // Ignore the response if another document was selected in the meantime
+      if (selectedKey.current === material.key) {
+        onMaterialSelect?.(fullMaterial);
+      }
+    } catch (err) {
+      console.error('Error fetching document content:', err);
+    }
+  };
+
   const syncDocumentName = async (key: string) => {
     try {
       setSyncingName(key);
@@ -144,10 +191,33 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
     }
   };
 
+  const waitForJob = async (jobId: string) => {
+    while (true) {
+      await new Promise(resolve => setTimeout(resolve, 1000));
+
+      const response = await axios.get(`http://localhost:5020/api/jobs/${jobId}`, { timeout: 10000 });
+      const job = response.data?.job;
+      if (!job) {
+        throw new Error('Server returned an invalid job status');
+      }
+
+      if (job.status === 'done') {
+        return job.result;
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Sync job failed');
+      }
+      if (job.progress) {
+        setSyncProgress(job.progress);
+      }
+    }
+  };
+
   const handleSyncAll = async () => {
     try {
       setSyncingAll(true);
       setSyncResults(null);
+      setSyncProgress(null);
       setError(null);
 
       // Add a timeout to avoid UI freezing
@@ -183,13 +253,15 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
       }
 
       if (success && response) {
-        setSyncResults(response.data.results);
+        // Naming runs as a background job on the server; poll it until it finishes
+        const results = await waitForJob(response.data.job_id);
+        setSyncResults(results);
 
         // Refresh materials to show new names and remove deleted items
         await fetchMaterials(page);
 
         // If there were more errors than successes, show a warning
-        const { named, errors } = response.data.results;
+        const { named, errors } = results;
         if (errors > named && errors > 0) {
           setError('Some documents could not be named. The AI name generator may be having issues.');
         }
@@ -237,9 +309,7 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
         const newActiveIndex = activeIndex >= materials.length - 1 ? materials.length - 2 : activeIndex;
         if (newActiveIndex >= 0) {
           setActiveIndex(newActiveIndex);
-          if (onMaterialSelect) {
-            onMaterialSelect(materials[newActiveIndex]);
-          }
+          selectMaterial(materials[newActiveIndex]);
         }
       }
 
@@ -260,7 +330,7 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
   useEffect(() => {
     if (materials.length > 0 && activeIndex === null) {
       setActiveIndex(0);
-      if (onMaterialSelect) onMaterialSelect(materials[0]);
+      selectMaterial(materials[0]);
     } else if (materials.length === 0) {
       setActiveIndex(null);
       if (onMaterialSelect) onMaterialSelect(null);
@@ -304,7 +374,7 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
     if (activeIndex === null) {
       // If no document is selected, select the first one
       setActiveIndex(0);
-      onMaterialSelect?.(materials[0]);
+      selectMaterial(materials[0]);
       return;
     }
 
@@ -316,7 +386,7 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
           // Select first item on next page after it loads
           setTimeout(() => {
             setActiveIndex(0);
-            if (materials.length > 0) onMaterialSelect?.(materials[0]);
+            if (materials.length > 0) selectMaterial(materials[0]);
           }, 500);
         }
         return;
@@ -325,7 +395,7 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
       // Otherwise select next item
       const nextIndex = activeIndex + 1;
       setActiveIndex(nextIndex);
-      onMaterialSelect?.(materials[nextIndex]);
+      selectMaterial(materials[nextIndex]);
     } else {
       // If at the beginning of the current page, go to previous page
       if (activeIndex === 0) {
@@ -335,7 +405,7 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
           setTimeout(() => {
             if (materials.length > 0) {
               setActiveIndex(materials.length - 1);
-              onMaterialSelect?.(materials[materials.length - 1]);
+              selectMaterial(materials[materials.length - 1]);
             }
           }, 500);
         }
@@ -345,7 +415,7 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
       // Otherwise select previous item
       const prevIndex = activeIndex - 1;
       setActiveIndex(prevIndex);
-      onMaterialSelect?.(materials[prevIndex]);
+      selectMaterial(materials[prevIndex]);
     }
   };
 
@@ -365,7 +435,9 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
               {syncingAll ? (
                 <>
                   <Loader2 className="w-4 h-4 mr-2 animate-spin" />
-                  Syncing...
+                  {syncProgress
+                    ? `Syncing ${syncProgress.processed + syncProgress.already_named + syncProgress.deleted}/${syncProgress.total}...`
+                    : 'Syncing...'}
                 </>
               ) : (
                 <>
@@ -524,7 +596,7 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
                 onClick={() => {
                   if (!deleteConfirmKey) {
                     setActiveIndex(index);
-                    if (onMaterialSelect) onMaterialSelect(material);
+                    selectMaterial(material);
                   }
                 }}
               >
@@ -562,7 +634,7 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
                     e.stopPropagation(); // Prevent event bubbling
                     if (!deleteConfirmKey) {
                       setActiveIndex(index);
-                      if (onMaterialSelect) onMaterialSelect(material);
+                      selectMaterial(material);
                     }
                   }}
                 >
@@ -616,7 +688,7 @@ export default function MaterialsList({ onMaterialSelect, isStudentView = false
                   onClick={() => {
                     if (!deleteConfirmKey) {
                       setActiveIndex(index);
-                      if (onMaterialSelect) onMaterialSelect(material);
+                      selectMaterial(material);
                     }
                   }}
                 >
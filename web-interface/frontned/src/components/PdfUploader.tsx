@@ -6,6 +6,9 @@ import * as pdfjsLib from 'pdfjs-dist';
 // Set the worker source for pdf.js using a CDN
 pdfjsLib.GlobalWorkerOptions.workerSrc = 'https://cdnjs.cloudflare.com/ajax/libs/pdf.js/2.16.105/pdf.worker.min.js';
 
+// Only the first pages are read in the browser, for the preview; the server extracts the whole PDF
+const PREVIEW_PAGES = 3;
+
 interface PdfUploaderProps {
   onUploadComplete?: () => void;
 }
@@ -13,8 +16,8 @@ interface PdfUploaderProps {
 export default function PdfUploader({ onUploadComplete }: PdfUploaderProps) {
   const [file, setFile] = useState<File | null>(null);
   const [extractedText, setExtractedText] = useState<string>('');
+  const [pageCount, setPageCount] = useState(0);
   const [title, setTitle] = useState<string>('');
-  const [aiGeneratedName, setAiGeneratedName] = useState<string>('');
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [uploadProgress, setUploadProgress] = useState(0);
@@ -60,80 +63,79 @@ export default function PdfUploader({ onUploadComplete }: PdfUploaderProps) {
     }
   };
 
-  const extractTextFromPdf = async (pdfFile: File): Promise<string> => {
+  const extractPreviewFromPdf = async (pdfFile: File): Promise<string> => {
     try {
       // Convert the PDF file to an ArrayBuffer
       const arrayBuffer = await pdfFile.arrayBuffer();
 
       // Load the PDF document
       const pdf = await pdfjsLib.getDocument({ data: arrayBuffer }).promise;
+      setPageCount(pdf.numPages);
 
-      let fullText = '';
-
-      // Extract text from each page with progress updates
-      const totalPages = pdf.numPages;
+      // Local extraction only feeds the preview; the server extracts and chunks the PDF itself
+      const pages: string[] = [];
+      const previewPages = Math.min(pdf.numPages, PREVIEW_PAGES);
 
-      for (let i = 1; i <= totalPages; i++) {
+      for (let i = 1; i <= previewPages; i++) {
         const page = await pdf.getPage(i);
         const textContent = await page.getTextContent();
         const pageText = textContent.items.map((item: any) => item.str).join(' ');
-        fullText += pageText + '\n\n';
+        pages.push(pageText);
 
         // Update progress percentage for extraction
-        setUploadProgress(Math.round((i / totalPages) * 100));
+        setUploadProgress(Math.round((i / previewPages) * 100));
       }
 
-      return fullText.trim();
+      return pages.join('\n\n').trim();
     } catch (error) {
       console.error('Error extracting text from PDF:', error);
       throw new Error('Failed to extract text from PDF');
     }
   };
 
-  const uploadToApi = async (text: string, title: string) => {
+  const uploadToApi = async (pdfFile: File, title: string) => {
     try {
       setUploadProgress(0);
 
-      // Convert the file to a base64 string if available
-      let pdfBase64: string | null = null;
-
-      if (file) {
-        const arrayBuffer = await file.arrayBuffer();
-        const bytes = new Uint8Array(arrayBuffer);
-        const binary = bytes.reduce((acc, byte) => acc + String.fromCharCode(byte), '');
-        pdfBase64 = btoa(binary);
-      }
+      // The server extracts, chunks and upserts the PDF in a background job
+      const formData = new FormData();
+      formData.append('pdf_file', pdfFile);
+      formData.append('title', title);
 
-      const response = await fetch('http://localhost:5020/api/materials/upload', {
+      const response = await fetch('http://localhost:5020/api/materials/upload-pdf', {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          text,
-          title,
-          pdf_data: pdfBase64 // Send the PDF binary data
-        }),
+        body: formData,
       });
 
       if (!response.ok) {
         throw new Error(`HTTP error! Status: ${response.status}`);
       }
 
-      setUploadProgress(100);
+      const { job_id: jobId } = await response.json();
 
-      const data = await response.json();
+      // Poll the job until ingestion finishes, showing page progress
+      while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const statusResponse = await axios.get(`http://localhost:5020/api/jobs/${jobId}`);
+        const job = statusResponse.data.job;
+        const progress = job.progress;
 
-      if (!data || !data.success) {
-        throw new Error('Invalid response from server');
-      }
+        if (progress && progress.pages_total) {
+          setUploadProgress(Math.round((progress.pages_done / progress.pages_total) * 100));
+        }
 
-      // Get the AI-generated name from the response
-      if (data && data.name) {
-        setAiGeneratedName(data.name);
-      }
+        if (job.status === 'failed') {
+          throw new Error(job.error || 'PDF ingestion failed');
+        }
 
-      return data;
+        if (job.status === 'done') {
+          setUploadProgress(100);
+          if (job.result.failed > 0) {
+            throw new Error(`${job.result.failed} chunks failed to upload`);
+          }
+          return job.result;
+        }
+      }
     } catch (error) {
       console.error('Error uploading to API:', error);
       throw error;
@@ -151,8 +153,8 @@ export default function PdfUploader({ onUploadComplete }: PdfUploaderProps) {
       setError(null);
       setUploadProgress(0);
 
-      // Extract text from PDF
-      const text = await extractTextFromPdf(file);
+      // Extract the first pages for the preview
+      const text = await extractPreviewFromPdf(file);
       setExtractedText(text);
       setStep('confirm');
     } catch (err) {
@@ -165,8 +167,8 @@ export default function PdfUploader({ onUploadComplete }: PdfUploaderProps) {
   };
 
   const handleConfirm = async () => {
-    if (!extractedText) {
-      setError('No text to upload');
+    if (!file) {
+      setError('No PDF to upload');
       return;
     }
 
@@ -176,7 +178,7 @@ export default function PdfUploader({ onUploadComplete }: PdfUploaderProps) {
       setStep('uploading');
 
       // Upload to API
-      await uploadToApi(extractedText, title);
+      await uploadToApi(file, title);
 
       // Show success state briefly
       setStep('success');
@@ -185,6 +187,7 @@ export default function PdfUploader({ onUploadComplete }: PdfUploaderProps) {
       setTimeout(() => {
         setFile(null);
         setExtractedText('');
+        setPageCount(0);
         setTitle('');
         if (fileInputRef.current) {
           fileInputRef.current.value = '';
@@ -211,6 +214,7 @@ export default function PdfUploader({ onUploadComplete }: PdfUploaderProps) {
   const handleCancel = () => {
     setFile(null);
     setExtractedText('');
+    setPageCount(0);
     setTitle('');
     if (fileInputRef.current) {
       fileInputRef.current.value = '';
@@ -271,12 +275,12 @@ export default function PdfUploader({ onUploadComplete }: PdfUploaderProps) {
             {loading ? (
               <>
                 <Loader2 className="w-5 h-5 mr-2 animate-spin" />
-                Extracting Text...
+                Reading Preview...
               </>
             ) : (
               <>
                 <FileText className="w-5 h-5 mr-2" />
-                Extract Text from PDF
+                Preview PDF
               </>
             )}
           </button>
@@ -309,10 +313,10 @@ export default function PdfUploader({ onUploadComplete }: PdfUploaderProps) {
           <div className="p-4 bg-gray-50 rounded">
             <h3 className="font-semibold mb-2">Extracted Text Preview:</h3>
             <div className="max-h-32 overflow-y-auto border p-2 rounded bg-white">
-              <p className="text-sm whitespace-pre-wrap line-clamp-6">{extractedText}</p>
+              <p className="text-sm whitespace-pre-wrap line-clamp-6">{extractedText || 'No text found on the first pages'}</p>
             </div>
             <p className="text-xs text-gray-500 mt-1">
-              {extractedText.length} characters extracted • {extractedText.split(/\s+/).length} words
+              First {Math.min(pageCount, PREVIEW_PAGES)} of {pageCount} pages • the full text is extracted on the server
             </p>
           </div>
 
@@ -371,11 +375,6 @@ export default function PdfUploader({ onUploadComplete }: PdfUploaderProps) {
         <div className="p-6 bg-green-50 rounded text-center">
           <Check className="w-10 h-10 mx-auto mb-3 text-green-500 p-1 bg-green-100 rounded-full" />
           <p className="text-green-700 font-medium">Document uploaded successfully!</p>
-          {aiGeneratedName && (
-            <p className="text-sm text-green-600 mt-1">
-              Generated name: <span className="font-medium">{aiGeneratedName}</span>
-            </p>
-          )}
         </div>
       )}
 
@@ -49,6 +49,20 @@ import * as pdfjsLib from 'pdfjs-dist';
 // Set the worker source for pdf.js using a CDN
 pdfjsLib.GlobalWorkerOptions.workerSrc = 'https://cdnjs.cloudflare.com/ajax/libs/pdf.js/2.16.105/pdf.worker.min.js';
 
+// Video processing runs as a background job on the video API; poll until it finishes
+const waitForVideoJob = async (jobId: string): Promise<string> => {
+  while (true) {
+    await new Promise(resolve => setTimeout(resolve, 2000));
+    const { data: job } = await axios.get(`http://localhost:8000/jobs/${jobId}`);
+    if (job.status === 'done') {
+      return job.response;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Video processing failed');
+    }
+  }
+};
+
 // Add at the top before imports
 declare global {
   interface Window {
@@ -81,8 +95,9 @@ interface Quiz {
   key: string;
   topic: string;
   timestamp: number;
-  xml: string;
+  xml?: string;
   questions?: QuizQuestion[];
+  question_count?: number;
 }
 
 interface StudentAnswer {
@@ -104,6 +119,7 @@ interface Homework {
   submissionInstructions: string;
   timestamp: number;
   xml: string;
+  question_count?: number;
 }
 
 interface GradeReport {
@@ -282,6 +298,7 @@ export default function StudentDashboard() {
   const [showAnswer, setShowAnswer] = useState(false);
   const [quizzes, setQuizzes] = useState<Quiz[]>([]);
   const [loadingQuizzes, setLoadingQuizzes] = useState(false);
+  const [quizzesCursor, setQuizzesCursor] = useState<string | null>(null);
   const [selectedQuiz, setSelectedQuiz] = useState<Quiz | null>(null);
   const [activeQuizStep, setActiveQuizStep] = useState<'list' | 'quiz' | 'results'>('list');
   const [studentAnswers, setStudentAnswers] = useState<StudentAnswer[]>([]);
@@ -300,6 +317,7 @@ export default function StudentDashboard() {
   // Assignment states
   const [assignments, setAssignments] = useState<Homework[]>([]);
   const [loadingAssignments, setLoadingAssignments] = useState(false);
+  const [assignmentsCursor, setAssignmentsCursor] = useState<string | null>(null);
   const [selectedAssignment, setSelectedAssignment] = useState<Homework | null>(null);
 
   // Assignment submission states
@@ -516,21 +534,17 @@ export default function StudentDashboard() {
     }
   }, [activeTab]);
 
-  const fetchQuizzes = async () => {
+  // Quiz summaries are listed a page at a time; the questions are loaded when a test is started
+  const fetchQuizzes = async (loadMore = false) => {
     try {
       setLoadingQuizzes(true);
-      const response = await axios.get('http://localhost:5020/api/quizzes');
+      const response = await axios.get('http://localhost:5020/api/quizzes', {
+        params: { cursor: loadMore ? quizzesCursor ?? undefined : undefined }
+      });
 
       if (response.data && response.data.success) {
-        // Parse the quizzes and their XML
-        const parsedQuizzes = response.data.quizzes.map((quiz: Quiz) => {
-          return {
-            ...quiz,
-            questions: parseQuizXml(quiz.xml)?.questions || []
-          };
-        });
-
-        setQuizzes(parsedQuizzes);
+        setQuizzes(loadMore ? [...quizzes, ...response.data.quizzes] : response.data.quizzes);
+        setQuizzesCursor(response.data.next_cursor);
       }
     } catch (error) {
       console.error('Error fetching quizzes:', error);
@@ -539,71 +553,21 @@ export default function StudentDashboard() {
     }
   };
 
-  const parseQuizXml = (xmlString: string): { topic: string; questions: QuizQuestion[] } | null => {
-    try {
-      // Extract the XML content using regex
-      const xmlPattern = /<test>[\s\S]*?<\/test>/;
-      const match = xmlString.match(xmlPattern);
-
-      if (!match) {
-        return null;
-      }
-
-      const cleanXml = match[0];
-      const parser = new DOMParser();
-      const xmlDoc = parser.parseFromString(cleanXml, 'application/xml');
-
-      // Check for parsing errors
-      if (xmlDoc.getElementsByTagName('parsererror').length > 0) {
-        return null;
+  const startQuiz = async (quiz: Quiz) => {
+    if (!quiz.questions) {
+      try {
+        const response = await axios.get(`http://localhost:5020/api/quizzes/${encodeURIComponent(quiz.key)}`);
+        if (!response.data || !response.data.success) {
+          throw new Error(response.data?.error || 'Failed to load test');
+        }
+        quiz = { ...quiz, questions: response.data.quiz.questions || [] };
+        setQuizzes(quizzes.map(q => q.key === quiz.key ? quiz : q));
+      } catch (error) {
+        console.error('Error loading quiz:', error);
+        return;
       }
-
-      // Extract topic
-      const topicElement = xmlDoc.querySelector('topic');
-      const topic = topicElement ? topicElement.textContent || '' : '';
-
-      // Extract questions
-      const questions: QuizQuestion[] = [];
-
-      const questionElements = xmlDoc.querySelectorAll('question');
-      questionElements.forEach((questionEl) => {
-        const questionData: QuizQuestion = {
-          id: questionEl.getAttribute('id') || '',
-          type: questionEl.getAttribute('type') || '',
-          text: '',
-          options: []
-        };
-
-        // Get question text
-        const textEl = questionEl.querySelector('text');
-        questionData.text = textEl ? textEl.textContent || '' : '';
-
-        // Get options
-        const optionElements = questionEl.querySelectorAll('option');
-        optionElements.forEach((optionEl) => {
-          const isCorrect = optionEl.getAttribute('correct') === 'true';
-          const optionText = optionEl.textContent || '';
-
-          questionData.options.push({
-            text: optionText,
-            correct: isCorrect
-          });
-        });
-
-        questions.push(questionData);
-      });
-
-      return {
-        topic,
-        questions
-      };
-    } catch (error) {
-      console.error('Error parsing quiz XML:', error);
-      return null;
     }
-  };
 
-  const startQuiz = (quiz: Quiz) => {
     setSelectedQuiz(quiz);
     setActiveQuizStep('quiz');
     setStudentAnswers([]);
@@ -673,21 +637,26 @@ export default function StudentDashboard() {
     }
   }, [activeTab]);
 
-  const fetchAssignments = async () => {
+  // Assignment summaries are listed a page at a time; the full XML is loaded when one is opened
+  const fetchAssignments = async (loadMore = false) => {
     try {
       setLoadingAssignments(true);
-      const response = await axios.get('http://localhost:5020/api/assignments');
+      const response = await axios.get('http://localhost:5020/api/assignments', {
+        params: { cursor: loadMore ? assignmentsCursor ?? undefined : undefined }
+      });
 
       if (response.data && response.data.success) {
-        // Parse the assignments and their XML
-        const parsedAssignments = response.data.assignments.map((assignment: any) => {
-          return {
-            ...assignment,
-            ...parseAssignmentXml(assignment.xml)
-          };
-        });
-
-        setAssignments(parsedAssignments);
+        const summaries = response.data.assignments.map((assignment: any) => ({
+          ...assignment,
+          title: assignment.title || assignment.topic,
+          description: assignment.description || '',
+          tasks: [],
+          submissionInstructions: '',
+          xml: ''
+        }));
+
+        setAssignments(loadMore ? [...assignments, ...summaries] : summaries);
+        setAssignmentsCursor(response.data.next_cursor);
       }
     } catch (error) {
       console.error('Error fetching assignments:', error);
@@ -696,6 +665,25 @@ export default function StudentDashboard() {
     }
   };
 
+  const openAssignment = async (assignment: Homework) => {
+    if (!assignment.xml) {
+      try {
+        const response = await axios.get(`http://localhost:5020/api/assignments/${encodeURIComponent(assignment.key)}`);
+        if (!response.data || !response.data.success) {
+          throw new Error(response.data?.error || 'Failed to load assignment');
+        }
+        const xml = response.data.assignment.xml;
+        assignment = { ...assignment, xml, ...parseAssignmentXml(xml) };
+        setAssignments(assignments.map(a => a.key === assignment.key ? assignment : a));
+      } catch (error) {
+        console.error('Error loading assignment:', error);
+        return;
+      }
+    }
+
+    setSelectedAssignment(assignment);
+  };
+
   const parseAssignmentXml = (xmlString: string): Partial<Homework> => {
     try {
       // Extract the XML content using regex
@@ -943,14 +931,15 @@ export default function StudentDashboard() {
         headers: {
           'Content-Type': 'application/json'
         },
-        timeout: 300000 // 5 minutes timeout
+        timeout: 60000
       });
 
       console.log('YouTube API response:', response.data);
+      const videoText = await waitForVideoJob(response.data.job_id);
 
       setVideoResponse({
         success: true,
-        response: response.data.response,
+        response: videoText,
         url: videoUrl,
         video_id: response.data.extracted_video_id
       });
@@ -1016,13 +1005,15 @@ export default function StudentDashboard() {
         formData,
         {
           headers: { 'Content-Type': 'multipart/form-data' },
-          timeout: 600000 // 10 minutes timeout for video processing
+          timeout: 300000 // 5 minutes for the upload itself; processing is polled below
         }
       );
 
+      const videoText = await waitForVideoJob(response.data.job_id);
+
       setVideoResponse({
         success: true,
-        response: response.data.response,
+        response: videoText,
         filename: videoFile.name,
         content_type: videoFile.type
       });
@@ -1400,7 +1391,7 @@ export default function StudentDashboard() {
                               <div className="flex text-sm text-gray-500">
                                 <div className="flex items-center mr-4">
                                   <ListChecks className="w-4 h-4 mr-1" />
-                                  <span>{assignment.tasks?.length || 0} tasks</span>
+                                  <span>{assignment.question_count ?? assignment.tasks?.length ?? 0} tasks</span>
                                 </div>
                                 <div className="flex items-center">
                                   <Calendar className="w-4 h-4 mr-1" />
@@ -1410,7 +1401,7 @@ export default function StudentDashboard() {
                             </div>
 
                             <Button
-                              onClick={() => setSelectedAssignment(assignment)}
+                              onClick={() => openAssignment(assignment)}
                               variant="outline"
                               className="mt-2"
                             >
@@ -1419,6 +1410,13 @@ export default function StudentDashboard() {
                           </div>
                         </div>
                       ))}
+                      {assignmentsCursor && (
+                        <div className="pt-4">
+                          <Button variant="outline" className="w-full" onClick={() => fetchAssignments(true)}>
+                            Load more
+                          </Button>
+                        </div>
+                      )}
                     </div>
                   )}
                 </div>
@@ -1659,7 +1657,7 @@ export default function StudentDashboard() {
                               <div className="flex text-sm text-gray-500 mt-2">
                                 <div className="flex items-center mr-4">
                                   <ListChecks className="w-4 h-4 mr-1" />
-                                  <span>{quiz.questions?.length || 0} questions</span>
+                                  <span>{quiz.question_count ?? quiz.questions?.length ?? 0} questions</span>
                                 </div>
                                 <div className="flex items-center">
                                   <Calendar className="w-4 h-4 mr-1" />
@@ -1678,6 +1676,13 @@ export default function StudentDashboard() {
                           </div>
                         </div>
                       ))}
+                      {quizzesCursor && (
+                        <div className="pt-4">
+                          <Button variant="outline" className="w-full" onClick={() => fetchQuizzes(true)}>
+                            Load more
+                          </Button>
+                        </div>
+                      )}
                     </div>
                   )}
                 </div>
@@ -45,6 +45,20 @@ import * as pdfjsLib from 'pdfjs-dist';
 // Set the worker source for pdf.js using a CDN
 pdfjsLib.GlobalWorkerOptions.workerSrc = 'https://cdnjs.cloudflare.com/ajax/libs/pdf.js/2.16.105/pdf.worker.min.js';
 
+// Video processing runs as a background job on the video API; poll until it finishes
+const waitForVideoJob = async (jobId: string): Promise<string> => {
+  while (true) {
+    await new Promise(resolve => setTimeout(resolve, 2000));
+    const { data: job } = await axios.get(`http://localhost:8000/jobs/${jobId}`);
+    if (job.status === 'done') {
+      return job.response;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Video processing failed');
+    }
+  }
+};
+
 // Add global declaration
 declare global {
   interface Window {
@@ -162,6 +176,7 @@ interface Quiz {
   topic: string;
   timestamp: number;
   questions: QuizQuestion[];
+  question_count?: number;
 }
 
 interface HomeworkTask {
@@ -178,6 +193,7 @@ interface Homework {
   submissionInstructions: string;
   timestamp: number;
   xml: string;
+  question_count?: number;
 }
 
 interface VideoResponse {
@@ -281,6 +297,7 @@ export default function TeacherDashboard() {
 
   // Add state for quizzes/tests from database
   const [loadingQuizzes, setLoadingQuizzes] = useState(false);
+  const [quizzesCursor, setQuizzesCursor] = useState<string | null>(null);
   const [showTestList, setShowTestList] = useState(false);
   const [deleteQuizLoading, setDeleteQuizLoading] = useState(false);
   const [deleteQuizError, setDeleteQuizError] = useState<string | null>(null);
@@ -288,6 +305,7 @@ export default function TeacherDashboard() {
   // Add assignment management states
   const [assignments, setAssignments] = useState<Homework[]>([]);
   const [loadingAssignments, setLoadingAssignments] = useState(false);
+  const [assignmentsCursor, setAssignmentsCursor] = useState<string | null>(null);
   const [showAssignmentList, setShowAssignmentList] = useState(false);
   const [selectedAssignmentView, setSelectedAssignmentView] = useState<Homework | null>(null);
   const [deleteAssignmentLoading, setDeleteAssignmentLoading] = useState(false);
@@ -369,8 +387,8 @@ export default function TeacherDashboard() {
         throw new Error('Please provide either a video URL or upload a video file.');
       }
 
-      // Extract the actual text content from the API response
-      const responseText = response.data.response || response.data;
+      // The API answers with a job id; the text arrives when the job is done
+      const responseText = await waitForVideoJob(response.data.job_id);
 
       setVideoResponse({
         success: true,
@@ -471,42 +489,60 @@ export default function TeacherDashboard() {
     setQuizLoading(true);
     setQuizError(null);
     setParsedQuiz(null);
+    setQuizXml('');
 
     try {
-      const response = await axios.post('https://flow.sprk.ro/api/v1/prediction/5d18b69b-b911-4a27-b2dc-2105fd9b42ef', {
-        question: quizTopic
-      }, {
+      // Questions arrive as NDJSON lines while the quiz is still being generated
+      const response = await fetch('http://localhost:5020/api/quizzes/generate', {
+        method: 'POST',
         headers: {
           'Content-Type': 'application/json'
-        }
+        },
+        body: JSON.stringify({ topic: quizTopic, stream: true })
       });
 
-      // Extract quiz data from response
-      const quizData = response.data;
-
-      if (!quizData) {
-        throw new Error('No data returned from quiz generator');
+      if (!response.ok || !response.body) {
+        throw new Error(`Quiz generator returned ${response.status}`);
       }
 
-      // Set the XML content
-      setQuizXml(quizData.text || quizData.response || '');
-
-      // Parse the XML to get quiz questions
-      const parsedData = parseQuizXml(quizData.text || quizData.response || '');
-
-      if (parsedData && parsedData.questions && parsedData.questions.length > 0) {
-        const newQuiz: Quiz = {
-          key: Date.now().toString(),
-          topic: quizTopic,
-          timestamp: Date.now(),
-          questions: parsedData.questions
-        };
+      const newQuiz: Quiz = {
+        key: Date.now().toString(),
+        topic: quizTopic,
+        timestamp: Date.now(),
+        questions: []
+      };
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+      let finished = false;
+
+      while (!finished) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+
+        const lines = buffered.split('\n');
+        buffered = lines.pop() || '';
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const message = JSON.parse(line);
+
+          if (message.type === 'question') {
+            newQuiz.questions = [...newQuiz.questions, message.question];
+            setParsedQuiz({ ...newQuiz });
+          } else if (message.type === 'done') {
+            setQuizXml(message.quizXml);
+            finished = true;
+          } else if (message.type === 'error') {
+            throw new Error(message.error);
+          }
+        }
+      }
 
-        setParsedQuiz(newQuiz);
-        setSaveSuccess(false);
-      } else {
+      if (newQuiz.questions.length === 0) {
         throw new Error('Failed to parse quiz data from response');
       }
+      setSaveSuccess(false);
     } catch (error) {
       console.error('Error generating quiz:', error);
       setQuizError(error instanceof Error ? error.message : 'An unknown error occurred');
@@ -515,71 +551,6 @@ export default function TeacherDashboard() {
     }
   };
 
-  // Function to parse quiz XML
-  const parseQuizXml = (xmlString: string): { topic: string; questions: QuizQuestion[] } | null => {
-    try {
-      // Extract the XML content using regex
-      const xmlPattern = /<test>[\s\S]*?<\/test>/;
-      const match = xmlString.match(xmlPattern);
-
-      if (!match) {
-        return null;
-      }
-
-      const cleanXml = match[0];
-      const parser = new DOMParser();
-      const xmlDoc = parser.parseFromString(cleanXml, 'application/xml');
-
-      // Check for parsing errors
-      if (xmlDoc.getElementsByTagName('parsererror').length > 0) {
-        return null;
-      }
-
-      // Extract topic
-      const topicElement = xmlDoc.querySelector('topic');
-      const topic = topicElement ? topicElement.textContent || '' : '';
-
-      // Extract questions
-      const questions: QuizQuestion[] = [];
-
-      const questionElements = xmlDoc.querySelectorAll('question');
-      questionElements.forEach((questionEl) => {
-        const questionData: QuizQuestion = {
-          id: questionEl.getAttribute('id') || '',
-          type: questionEl.getAttribute('type') || '',
-          text: '',
-          options: []
-        };
-
-        // Get question text
-        const textEl = questionEl.querySelector('text');
-        questionData.text = textEl ? textEl.textContent || '' : '';
-
-        // Get options
-        const optionElements = questionEl.querySelectorAll('option');
-        optionElements.forEach((optionEl) => {
-          const isCorrect = optionEl.getAttribute('correct') === 'true';
-          const optionText = optionEl.textContent || '';
-
-          questionData.options.push({
-            text: optionText,
-            correct: isCorrect
-          });
-        });
-
-        questions.push(questionData);
-      });
-
-      return {
-        topic,
-        questions
-      };
-    } catch (error) {
-      console.error('Error parsing quiz XML:', error);
-      return null;
-    }
-  };
-
   // Function to save quiz
   const handleSaveQuiz = async () => {
     if (!parsedQuiz || !quizXml) {
@@ -624,25 +595,23 @@ export default function TeacherDashboard() {
     }
   };
 
-  // Function to load quizzes
-  const loadQuizzes = async () => {
+  // Function to load quiz summaries, one page at a time (questions are loaded when a quiz is opened)
+  const loadQuizzes = async (loadMore = false) => {
     setLoadingQuizzes(true);
 
     try {
-      const response = await axios.get('http://localhost:5020/api/quizzes');
+      const response = await axios.get('http://localhost:5020/api/quizzes', {
+        params: { cursor: loadMore ? quizzesCursor ?? undefined : undefined }
+      });
 
       if (response.data && response.data.success) {
-        // Parse each quiz's XML to get the questions
-        const parsedQuizzes = response.data.quizzes.map((quiz: any) => {
-          const parsedData = parseQuizXml(quiz.xml);
-
-          return {
-            ...quiz,
-            questions: parsedData?.questions || []
-          };
-        });
+        const summaries = response.data.quizzes.map((quiz: any) => ({
+          ...quiz,
+          questions: []
+        }));
 
-        setQuizzes(parsedQuizzes);
+        setQuizzes(loadMore ? [...quizzes, ...summaries] : summaries);
+        setQuizzesCursor(response.data.next_cursor);
       } else {
         throw new Error(response.data?.error || 'Failed to load quizzes');
       }
@@ -654,6 +623,29 @@ export default function TeacherDashboard() {
     }
   };
 
+  // Function to open a saved quiz, fetching and parsing its XML on demand
+  const openQuiz = async (quiz: Quiz) => {
+    if (quiz.questions.length > 0) {
+      setSelectedQuizView(quiz);
+      return;
+    }
+
+    try {
+      const response = await axios.get(`http://localhost:5020/api/quizzes/${encodeURIComponent(quiz.key)}`);
+
+      if (response.data && response.data.success) {
+        const fullQuiz = { ...quiz, questions: response.data.quiz.questions || [] };
+        setQuizzes(quizzes.map(q => q.key === quiz.key ? fullQuiz : q));
+        setSelectedQuizView(fullQuiz);
+      } else {
+        throw new Error(response.data?.error || 'Failed to load quiz');
+      }
+    } catch (error) {
+      console.error('Error loading quiz:', error);
+      setQuizError(error instanceof Error ? error.message : 'An unknown error occurred');
+    }
+  };
+
   // Function to delete a quiz
   const handleDeleteQuiz = async (quizKey: string) => {
     if (!window.confirm('Are you sure you want to delete this quiz?')) {
@@ -861,28 +853,27 @@ export default function TeacherDashboard() {
     }
   };
 
-  // Function to load assignments
-  const loadAssignments = async () => {
+  // Function to load assignment summaries, one page at a time (details are loaded when one is opened)
+  const loadAssignments = async (loadMore = false) => {
     setLoadingAssignments(true);
 
     try {
-      const response = await axios.get('http://localhost:5020/api/assignments');
+      const response = await axios.get('http://localhost:5020/api/assignments', {
+        params: { cursor: loadMore ? assignmentsCursor ?? undefined : undefined }
+      });
 
       if (response.data && response.data.success) {
-        // Parse each assignment's XML to get the details
-        const parsedAssignments = response.data.assignments.map((assignment: any) => {
-          const parsedData = parseAssignmentXml(assignment.xml);
-
-          return {
-            ...assignment,
-            title: parsedData?.title || assignment.topic,
-            description: parsedData?.description || '',
-            tasks: parsedData?.tasks || [],
-            submissionInstructions: parsedData?.submissionInstructions || ''
-          };
-        });
-
-        setAssignments(parsedAssignments);
+        const summaries = response.data.assignments.map((assignment: any) => ({
+          ...assignment,
+          title: assignment.title || assignment.topic,
+          description: assignment.description || '',
+          tasks: [],
+          submissionInstructions: '',
+          xml: ''
+        }));
+
+        setAssignments(loadMore ? [...assignments, ...summaries] : summaries);
+        setAssignmentsCursor(response.data.next_cursor);
       } else {
         throw new Error(response.data?.error || 'Failed to load assignments');
       }
@@ -894,6 +885,38 @@ export default function TeacherDashboard() {
     }
   };
 
+  // Function to open a saved assignment, fetching and parsing its XML on demand
+  const openAssignment = async (assignment: Homework) => {
+    if (assignment.xml) {
+      setSelectedAssignmentView(assignment);
+      return;
+    }
+
+    try {
+      const response = await axios.get(`http://localhost:5020/api/assignments/${encodeURIComponent(assignment.key)}`);
+
+      if (response.data && response.data.success) {
+        const xml = response.data.assignment.xml;
+        const parsedData = parseAssignmentXml(xml);
+        const fullAssignment = {
+          ...assignment,
+          xml,
+          title: parsedData?.title || assignment.title,
+          description: parsedData?.description || assignment.description,
+          tasks: parsedData?.tasks || [],
+          submissionInstructions: parsedData?.submissionInstructions || ''
+        };
+        setAssignments(assignments.map(a => a.key === assignment.key ? fullAssignment : a));
+        setSelectedAssignmentView(fullAssignment);
+      } else {
+        throw new Error(response.data?.error || 'Failed to load assignment');
+      }
+    } catch (error) {
+      console.error('Error loading assignment:', error);
+      setAssignmentError(error instanceof Error ? error.message : 'An unknown error occurred');
+    }
+  };
+
   // Function to delete an assignment
   const handleDeleteAssignment = async (assignmentKey: string) => {
     if (!window.confirm('Are you sure you want to delete this assignment?')) {
@@ -1302,7 +1325,7 @@ export default function TeacherDashboard() {
                     <h4 className="text-sm font-medium">Your Assignments</h4>
                     <button
                       className="p-1 text-blue-500 hover:text-blue-700"
-                      onClick={loadAssignments}
+                      onClick={() => loadAssignments()}
                       disabled={loadingAssignments}
                     >
                       <RefreshCw className={`w-4 h-4 ${loadingAssignments ? 'animate-spin' : ''}`} />
@@ -1340,7 +1363,7 @@ export default function TeacherDashboard() {
                             <div className="flex gap-1">
                               <button
                                 className="p-1 text-blue-500 hover:text-blue-700"
-                                onClick={() => setSelectedAssignmentView(assignment)}
+                                onClick={() => openAssignment(assignment)}
                               >
                                 <Eye className="w-4 h-4" />
                               </button>
@@ -1354,6 +1377,16 @@ export default function TeacherDashboard() {
                           </div>
                         </div>
                       ))}
+                      {assignmentsCursor && (
+                        <Button
+                          variant="outline"
+                          className="w-full"
+                          onClick={() => loadAssignments(true)}
+                          disabled={loadingAssignments}
+                        >
+                          Load more
+                        </Button>
+                      )}
                     </div>
                   )}
                 </div>
@@ -1684,7 +1717,7 @@ export default function TeacherDashboard() {
                     <h4 className="text-sm font-medium">Your Tests</h4>
                     <button
                       className="p-1 text-blue-500 hover:text-blue-700"
-                      onClick={loadQuizzes}
+                      onClick={() => loadQuizzes()}
                       disabled={loadingQuizzes}
                     >
                       <RefreshCw className={`w-4 h-4 ${loadingQuizzes ? 'animate-spin' : ''}`} />
@@ -1718,7 +1751,7 @@ export default function TeacherDashboard() {
                               <div className="flex text-sm text-gray-500 mt-1">
                                 <div className="flex items-center mr-3">
                                   <ListChecks className="w-4 h-4 mr-1" />
-                                  <span>{quiz.questions?.length || 0} questions</span>
+                                  <span>{quiz.question_count ?? quiz.questions.length} questions</span>
                                 </div>
                                 <div className="flex items-center">
                                   <Calendar className="w-4 h-4 mr-1" />
@@ -1729,7 +1762,7 @@ export default function TeacherDashboard() {
                             <div className="flex gap-1">
                               <button
                                 className="p-1 text-blue-500 hover:text-blue-700"
-                                onClick={() => setSelectedQuizView(quiz)}
+                                onClick={() => openQuiz(quiz)}
                               >
                                 <Eye className="w-4 h-4" />
                               </button>
@@ -1743,6 +1776,16 @@ export default function TeacherDashboard() {
                           </div>
                         </div>
                       ))}
+                      {quizzesCursor && (
+                        <Button
+                          variant="outline"
+                          className="w-full"
+                          onClick={() => loadQuizzes(true)}
+                          disabled={loadingQuizzes}
+                        >
+                          Load more
+                        </Button>
+                      )}
                     </div>
                   )}
                 </div>